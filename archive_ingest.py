@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Hall Collins Listing Packet Combiner - Archive Ingest
+ZIP uploads turned into packet sources: nested archives are followed, PDFs
+are streamed out, JPGs are converted, and every member gets a report line
+"""
+
+import os
+import shutil
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import listing_render
+import packet_engine
+from resource_budget import Budget, BudgetExceeded
+
+# How many ZIPs deep nested archives are followed
+MAX_ARCHIVE_DEPTH = 4
+
+PDF_SUFFIXES = ('.pdf',)
+IMAGE_SUFFIXES = ('.jpg', '.jpeg')
+ARCHIVE_SUFFIXES = ('.zip',)
+
+
+def _member_kind(filename):
+    lower = filename.lower()
+    if lower.endswith(PDF_SUFFIXES):
+        return 'pdf'
+    if lower.endswith(IMAGE_SUFFIXES):
+        return 'jpg'
+    if lower.endswith(ARCHIVE_SUFFIXES):
+        return 'zip'
+    return None
+
+
+def _is_hidden(filename):
+    """macOS resource forks and dot files that archivers add alongside the real files"""
+    return filename.startswith('__MACOSX/') or os.path.basename(filename).startswith('.')
+
+
+def _spool_member(zip_ref, info, open_lock, max_size):
+    """Decompress one member into a rewound SpooledTemporaryFile, in chunks"""
+    spool = packet_engine.new_spool(max_size)
+    try:
+        # Opening bumps the archive's shared file refcount - not thread-safe
+        with open_lock:
+            member = zip_ref.open(info)
+        with member:
+            shutil.copyfileobj(member, spool, packet_engine.COPY_CHUNK_BYTES)
+        spool.seek(0)
+        return spool
+    except Exception:
+        spool.close()
+        raise
+
+
+def _extract_member(zip_ref, info, name, kind, open_lock, max_size, budget):
+    """Extract (and for JPGs, convert) one member. Runs on the ingest thread pool.
+
+    Returns:
+        tuple: (source dict or None, report dict)
+    """
+    start = time.perf_counter()
+    entry = {'name': name, 'kind': kind, 'status': 'ok', 'bytes_in': info.compress_size,
+             'bytes_out': 0, 'seconds': 0.0, 'error': None}
+    source = None
+    try:
+        if kind == 'jpg':
+            # Photos are converted whole - they are a few MB at most
+            with open_lock:
+                member = zip_ref.open(info)
+            with member:
+                jpg_bytes = member.read()
+            problems = []
+            converted = listing_render.convert_jpg_to_pdf(jpg_bytes, os.path.basename(name), warn=problems.append,
+                                                          budget=budget)
+            if not converted:
+                raise ValueError(problems[0] if problems else "could not convert image")
+            spool = packet_engine.new_spool(budget.spool_size(len(converted['content']), max_size))
+            spool.write(converted['content'])
+            spool.seek(0)
+            source = {'name': os.path.splitext(name)[0] + '.pdf', 'stream': spool, 'size': len(converted['content'])}
+        else:
+            spool = _spool_member(zip_ref, info, open_lock, budget.spool_size(info.file_size, max_size))
+            source = {'name': name, 'stream': spool, 'size': info.file_size}
+        entry['bytes_out'] = source['size']
+    except Exception as e:
+        entry['status'] = 'failed'
+        entry['error'] = str(e) or type(e).__name__
+    entry['seconds'] = time.perf_counter() - start
+    return source, entry
+
+
+def _walk(archive, prefix, depth, pool, max_size, max_depth, sources, members, budget, defer_pdfs=False):
+    """Queue every member of one archive on the pool, then collect them in archive
+    order - nested archives are walked in place of their member once spooled.
+    Each member's declared size is charged to the budget before it is touched;
+    zipfile never decompresses past that size, so a ZIP bomb stops here. A
+    nested archive's charge is given back once it is spooled, as its members
+    are then charged themselves."""
+    # Only a ZIP on disk can be reopened later; nested archives live in spools
+    defer_pdfs = defer_pdfs and isinstance(archive, (str, os.PathLike))
+    with zipfile.ZipFile(archive, 'r') as zip_ref:
+        open_lock = threading.Lock()
+        jobs = []
+        for info in zip_ref.infolist():
+            if info.is_dir() or _is_hidden(info.filename):
+                continue
+            name = prefix + info.filename
+            kind = _member_kind(info.filename)
+            if kind is None:
+                jobs.append((None, {'name': name, 'kind': 'other', 'status': 'skipped', 'bytes_in': info.compress_size,
+                                    'bytes_out': 0, 'seconds': 0.0, 'error': "not a PDF, JPG or ZIP"}))
+                continue
+            try:
+                budget.charge_decompressed(info.file_size, name)
+            except BudgetExceeded as e:
+                jobs.append((None, {'name': name, 'kind': kind, 'status': 'failed', 'bytes_in': info.compress_size,
+                                    'bytes_out': 0, 'seconds': 0.0, 'error': str(e)}))
+                continue
+            if kind == 'pdf' and defer_pdfs:
+                source = {'name': name, 'zip': os.fspath(archive), 'member': info.filename, 'size': info.file_size}
+                jobs.append((source, {'name': name, 'kind': kind, 'status': 'ok', 'bytes_in': info.compress_size,
+                                      'bytes_out': info.file_size, 'seconds': 0.0, 'error': None}))
+                continue
+            jobs.append(pool.submit(_extract_member, zip_ref, info, name, kind, open_lock, max_size, budget))
+
+        for job in jobs:
+            source, entry = job if isinstance(job, tuple) else job.result()
+            members.append(entry)
+            if source is None:
+                continue
+            if entry['kind'] != 'zip':
+                sources.append(source)
+                continue
+
+            # A nested archive: its documents take its place in the packet
+            nested = source['stream']
+            try:
+                if depth >= max_depth:
+                    raise ValueError(f"nested more than {max_depth} archives deep")
+                # Its members are charged as they are walked - counting the
+                # archive as well would spend the budget twice on the same bytes
+                budget.release_decompressed(source['size'])
+                _walk(nested, entry['name'] + '/', depth + 1, pool, max_size, max_depth, sources, members, budget)
+            except Exception as e:
+                entry['status'] = 'failed'
+                entry['error'] = str(e) or type(e).__name__
+            finally:
+                nested.close()
+
+
+def ingest_archive(archive, max_size=None, workers=None, max_depth=MAX_ARCHIVE_DEPTH, defer_pdfs=False, budget=None):
+    """Turn a ZIP into packet sources, following nested ZIPs and converting JPGs.
+
+    Members are decompressed on a thread pool (zlib releases the GIL), one
+    chunk at a time, into spooled temp files (packet_engine.new_spool) that
+    spill to disk past max_size, and come back in archive order with each
+    nested archive's documents where it stood.
+
+    Args:
+        archive: ZIP file path or seekable binary file-like object
+        max_size (int): Bytes of each document kept in memory before spilling
+            to disk (default packet_engine.SPOOL_MAX_BYTES)
+        workers (int): Decompression threads (default one per CPU); 1 extracts
+            one member at a time
+        max_depth (int): Nested archive levels followed
+        defer_pdfs (bool): When archive is a path, leave its own PDFs in the
+            archive as {'name', 'zip', 'member', 'size'} sources that
+            packet_engine opens at merge time, instead of spooling them now
+        budget (resource_budget.Budget): The job's caps - members past its
+            decompressed-bytes cap fail, and documents spill to disk once its
+            memory is used (default: a fresh Budget)
+
+    Returns:
+        tuple: (sources, members) - sources are {'name', 'stream', 'size'}
+               dicts (or deferred ZIP members) to close with
+               packet_engine.close_sources(); members has
+               one {'name', 'kind', 'status', 'bytes_in', 'bytes_out',
+               'seconds', 'error'} report per file in the archive, nested
+               ones named 'inner.zip/file.pdf'. Raises if the top-level
+               archive itself cannot be read.
+    """
+    max_size = max_size or packet_engine.SPOOL_MAX_BYTES
+    budget = budget or Budget()
+    sources, members = [], []
+    try:
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1, thread_name_prefix="zip-ingest") as pool:
+            _walk(archive, "", 1, pool, max_size, max_depth, sources, members, budget, defer_pdfs)
+    except Exception:
+        packet_engine.close_sources(sources)
+        raise
+    return sources, members
+
+
+def summarize(members):
+    """One line for logs and traces: what was extracted, converted, skipped or failed"""
+    counts = {}
+    for entry in members:
+        key = entry['status'] if entry['status'] != 'ok' else entry['kind']
+        counts[key] = counts.get(key, 0) + 1
+    labels = [('pdf', "PDFs"), ('jpg', "JPGs converted"), ('zip', "nested ZIPs"),
+              ('skipped', "skipped"), ('failed', "failed")]
+    parts = [f"{counts[key]} {label}" for key, label in labels if counts.get(key)]
+    return ", ".join(parts) or "empty archive"
+
+
+def format_report(members):
+    """Per-member report: status, kind, size, time and why anything failed or was skipped"""
+    lines = [f"{'Status':<8}{'Kind':<6}{'KB':>9}{'Time':>9}  Member"]
+    for entry in members:
+        line = (f"{entry['status'].upper():<8}{entry['kind']:<6}{entry['bytes_out'] / 1024:>9.0f}"
+                f"{entry['seconds']:>8.2f}s  {entry['name']}")
+        if entry['error']:
+            line += f" - {entry['error']}"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Hall Collins Listing Packet Combiner - Batch Builder
+Builds listing packets, cover pages and Instagram posts for many listings
+from a CSV or JSON manifest, without opening the desktop or web app
+
+Manifest rows (CSV columns or JSON object keys):
+    address    Full address, e.g. "12 Elm Street, Woodstock, VT"
+               (or give 'street' and 'city_state' separately)
+    photo      Property photo for the cover page and Instagram posts
+    files      PDFs, ZIPs and JPGs in packet order - a JSON list, or one
+               string separated by ';'
+    cover      Include the cover page (default: yes when a photo is given)
+    instagram  Create Instagram posts (default: yes when a photo is given)
+    compress   Compress the packet (default: yes)
+Relative paths are resolved against the manifest's folder.
+
+Usage:
+    python batch_packets.py listings.csv --output-dir packets --workers 4
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import archive_ingest
+import listing_render
+import packet_engine
+import packet_trace
+import resource_budget
+
+TRUE_VALUES = ("1", "true", "yes", "y")
+
+
+def load_manifest(manifest_path):
+    """Read listing rows from a CSV or JSON manifest.
+
+    Args:
+        manifest_path (str): .csv file with a header row, or .json file
+            holding a list of objects (or {"listings": [...]})
+
+    Returns:
+        list: One dict per listing with absolute paths and parsed options
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, newline='', encoding='utf-8-sig') as f:
+        if manifest_path.lower().endswith('.json'):
+            rows = json.load(f)
+            if isinstance(rows, dict):
+                rows = rows.get('listings', [])
+        else:
+            rows = list(csv.DictReader(f))
+
+    listings = []
+    for index, row in enumerate(rows, start=1):
+        street = (row.get('street') or '').strip()
+        city_state = (row.get('city_state') or '').strip()
+        if not street and row.get('address'):
+            street, city_state = listing_render.parse_address(row['address'].strip())
+
+        files = row.get('files') or []
+        if isinstance(files, str):
+            files = [part.strip() for part in files.split(';') if part.strip()]
+        photo = (row.get('photo') or '').strip() or None
+
+        listings.append({
+            'row': index,
+            'street': street,
+            'city_state': city_state,
+            'photo': os.path.join(base_dir, photo) if photo else None,
+            'files': [os.path.join(base_dir, path) for path in files],
+            'cover': _flag(row.get('cover'), default=bool(photo)),
+            'instagram': _flag(row.get('instagram'), default=bool(photo)),
+            'compress': _flag(row.get('compress'), default=True),
+        })
+    return listings
+
+
+def _flag(value, default):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _safe_name(text):
+    return "".join(ch for ch in text if ch.isalnum() or ch in (' ', '-', '_', ',', '.')).strip() or "Listing"
+
+
+def collect_sources(paths, warnings, trace, budget=None):
+    """Turn input paths into packet sources: PDFs as-is, ZIPs extracted (nested ZIPs
+    and JPGs included), JPGs converted - all within the listing's budget"""
+    sources = []
+    for path in paths:
+        name = os.path.basename(path)
+        lower = name.lower()
+        if not os.path.exists(path):
+            warnings.append(f"Input not found: {path}")
+        elif lower.endswith('.pdf'):
+            with trace.span('ingest', bytes_in=os.path.getsize(path), detail=name) as span:
+                sources.append({'name': name, 'path': path})
+                span.bytes_out = span.bytes_in
+        elif lower.endswith('.zip'):
+            with trace.span('zip extraction', bytes_in=os.path.getsize(path), detail=name) as span:
+                extracted, members = [], []
+                try:
+                    # Listings already run in parallel - one decompression thread each
+                    extracted, members = archive_ingest.ingest_archive(path, workers=1, budget=budget)
+                except Exception as e:
+                    warnings.append(f"Error extracting ZIP {name}: {e}")
+                span.bytes_out = sum(pdf['size'] for pdf in extracted)
+                span.detail = f"{name}: {archive_ingest.summarize(members)}"
+            for entry in members:
+                if entry['status'] == 'failed':
+                    warnings.append(f"Could not extract {name}/{entry['name']}: {entry['error']}")
+            sources.extend(extracted)
+        elif lower.endswith(('.jpg', '.jpeg')):
+            with trace.span('jpg conversion', bytes_in=os.path.getsize(path), detail=name) as span:
+                # Listings already run in parallel - convert in this process
+                converted = listing_render.convert_images([(name, path)], budget, workers=1)[0]
+                error = converted['pending'].exception()
+                span.bytes_out = 0 if error else len(converted['pending'].result()['content'])
+            if error:
+                warnings.append(f"Could not convert {name}: {error}")
+            else:
+                sources.append(converted)
+        else:
+            warnings.append(f"Skipping unsupported file: {name}")
+    return sources
+
+
+def build_listing(listing, output_dir, post_format=listing_render.DEFAULT_POST_ENCODER):
+    """Build one listing's packet and posts. Runs in a worker process.
+
+    Returns:
+        dict: 'row', 'street', 'packet' path (or None), 'instagram' paths,
+              'pages', 'seconds', 'warnings', 'error' (None on success), the
+              per-stage 'trace' and the resource 'budget' it used
+    """
+    start = time.perf_counter()
+    trace = packet_trace.PacketTrace(listing['street'])
+    budget = resource_budget.Budget()
+    warnings = []
+    result = {'row': listing['row'], 'street': listing['street'], 'packet': None,
+              'instagram': [], 'pages': 0, 'warnings': warnings, 'error': None}
+    cover_path = None
+    sources = []
+    try:
+        listing_dir = os.path.join(output_dir, _safe_name(listing['street'] or f"Listing {listing['row']}"))
+        os.makedirs(listing_dir, exist_ok=True)
+
+        # Decode the photo once for the cover page and every post
+        photo = None
+        if listing['photo'] and (listing['cover'] or listing['instagram']):
+            with trace.span('photo decode', bytes_in=os.path.getsize(listing['photo'])) as span:
+                with open(listing['photo'], 'rb') as f:
+                    photo = listing_render.PropertyPhoto(f.read(), budget=budget)
+                span.detail = f"decoded at {photo.decoded_size[0]}x{photo.decoded_size[1]}"
+
+        sources = collect_sources(listing['files'], warnings, trace, budget)
+        if listing['cover'] and photo:
+            cover_path = packet_engine.new_temp_path('_cover.pdf')
+            with trace.span('cover render') as span:
+                if listing_render.create_cover_page(photo, listing['street'], listing['city_state'],
+                                                    cover_path, warn=warnings.append):
+                    sources.insert(0, {'name': 'Cover Page', 'path': cover_path, 'cache': False})
+                    span.bytes_out = os.path.getsize(cover_path)
+
+        if sources:
+            filename = f"1) {listing['street']} - Packet.pdf" if listing['street'] else "1) Listing Packet.pdf"
+            packet_path = os.path.join(listing_dir, filename)
+            # Listings already run in parallel - keep each packet's own work in this process
+            with trace.span('merge', detail=f"{len(sources)} documents") as span:
+                summary = packet_engine.build_packet(sources, packet_path, compress_streams=listing['compress'],
+                                                     max_workers=1, budget=budget)
+                span.bytes_in = summary['input_bytes']
+                span.bytes_out = summary['bytes_written']
+            for name, error in summary['failed']:
+                warnings.append(f"Could not process {name}: {error}")
+            if summary['documents']:
+                if listing['compress']:
+                    with trace.span('compress', bytes_in=summary['bytes_written']) as span:
+                        report = packet_engine.compress_to_target(packet_path, packet_engine.DEFAULT_TARGET_SIZE_MB, streams_done=True)
+                        span.bytes_out = report['final_bytes']
+                result['packet'] = packet_path
+                result['pages'] = summary['pages']
+            elif os.path.exists(packet_path):
+                os.unlink(packet_path)
+
+        if listing['instagram'] and photo and listing['street']:
+            with trace.span('instagram render') as span:
+                posts = listing_render.create_instagram_posts(photo, listing['street'], listing['city_state'],
+                                                              warn=warnings.append, workers=1, encoder=post_format)
+                span.bytes_out = sum(len(post['data']) for post in posts)
+                span.detail = listing_render.format_encode_report(posts)
+            for post in posts:
+                stem, extension = os.path.splitext(post['name'])
+                post_path = os.path.join(listing_dir, _safe_name(stem) + extension)
+                with open(post_path, 'wb') as f:
+                    f.write(post['data'])
+                result['instagram'].append(post_path)
+
+        if not result['packet'] and not result['instagram']:
+            result['error'] = "Nothing was created - check the files and photo for this row"
+
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        packet_engine.close_sources(sources)
+        if cover_path and os.path.exists(cover_path):
+            os.unlink(cover_path)
+        result['seconds'] = time.perf_counter() - start
+        result['budget'] = budget.usage()
+        warnings.extend(result['budget']['notes'])
+        result['trace'] = trace.to_dict()
+        trace.save_to_trace_dir()
+    return result
+
+
+def run_batch(listings, output_dir, workers=None, post_format=listing_render.DEFAULT_POST_ENCODER):
+    """Build every listing across a process pool, reporting each as it finishes.
+
+    Returns:
+        list: build_listing results in manifest order
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    results = []
+    if workers == 1 or len(listings) == 1:
+        for listing in listings:
+            results.append(build_listing(listing, output_dir, post_format))
+            print_result(results[-1])
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(listings))) as pool:
+            futures = [pool.submit(build_listing, listing, output_dir, post_format) for listing in listings]
+            for future in as_completed(futures):
+                results.append(future.result())
+                print_result(results[-1])
+    return sorted(results, key=lambda result: result['row'])
+
+
+def print_result(result):
+    label = f"Row {result['row']} ({result['street'] or 'no address'})"
+    if result['error']:
+        print(f"FAILED  {label}: {result['error']}")
+    else:
+        print(f"OK      {label}: {result['pages']} pages, {len(result['instagram'])} posts in {result['seconds']:.1f}s")
+    for warning in result['warnings']:
+        print(f"        Warning: {warning}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build listing packets for every row of a CSV or JSON manifest")
+    parser.add_argument('manifest', help="CSV or JSON file with one listing per row")
+    parser.add_argument('--output-dir', default='packets', help="folder for the finished listings (default: packets)")
+    parser.add_argument('--workers', type=int, default=None, help="listings built in parallel (default: one per CPU)")
+    parser.add_argument('--post-format', choices=sorted(listing_render.POST_ENCODERS),
+                        default=listing_render.DEFAULT_POST_ENCODER,
+                        help=f"Instagram post image format (default: {listing_render.DEFAULT_POST_ENCODER})")
+    parser.add_argument('--report', help="also write the per-listing results to this JSON file")
+    args = parser.parse_args(argv)
+
+    listings = load_manifest(args.manifest)
+    if not listings:
+        print("No listings found in manifest")
+        return 1
+
+    start = time.perf_counter()
+    results = run_batch(listings, os.path.abspath(args.output_dir), args.workers, args.post_format)
+    failed = sum(1 for result in results if result['error'])
+    print(f"Built {len(results) - failed} of {len(results)} listings in {time.perf_counter() - start:.1f}s")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
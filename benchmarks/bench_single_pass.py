@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: two-pass merge-then-compress vs the single-pass packet pipeline
+
+The two-pass flow is the one both apps used before packet_engine: merge every
+document with PdfMerger, write the result, then parse it again with PdfReader
+to compress content streams. The single-pass flow compresses each page while
+it is copied into the output.
+
+Usage:
+    python benchmarks/bench_single_pass.py --documents 40 --pages 4
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import packet_engine
+from PyPDF2 import PdfMerger, PdfReader, PdfWriter
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+
+def make_text_pdf(path, pages):
+    """Write an uncompressed text-heavy PDF, like a scanned-to-text disclosure"""
+    c = canvas.Canvas(path, pagesize=letter, pageCompression=0)
+    for page in range(pages):
+        for line in range(70):
+            c.drawString(40, 760 - line * 10, f"Page {page + 1} line {line + 1} - seller disclosure boilerplate text")
+        c.showPage()
+    c.save()
+
+
+def two_pass(paths, output_path):
+    """The previous flow: PdfMerger to bytes, then re-parse to compress"""
+    merger = PdfMerger()
+    for path in paths:
+        with open(path, 'rb') as f:
+            merger.append(BytesIO(f.read()))
+    merged = BytesIO()
+    merger.write(merged)
+    merger.close()
+
+    reader = PdfReader(BytesIO(merged.getvalue()))
+    writer = PdfWriter()
+    for page in reader.pages:
+        page.compress_content_streams()
+        writer.add_page(page)
+    writer.add_metadata(reader.metadata)
+    with open(output_path, 'wb') as f:
+        writer.write(f)
+
+
+def single_pass(paths, output_path):
+    """packet_engine: compress while copying, write objects as they are reached"""
+    sources = [{'name': os.path.basename(path), 'path': path} for path in paths]
+    packet_engine.merge_to_file(sources, output_path, compress_streams=True)
+
+
+def measure(label, func, paths, output_path, repeat):
+    best_wall = None
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        func(paths, output_path)
+        wall = time.perf_counter() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        best_wall = wall if best_wall is None else min(best_wall, wall)
+    size = os.path.getsize(output_path)
+    print(f"{label:<12} {best_wall:8.3f} s   peak {peak / (1024 * 1024):7.1f} MB   output {size / (1024 * 1024):6.2f} MB")
+    return best_wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--documents', type=int, default=30, help="source PDFs per packet")
+    parser.add_argument('--pages', type=int, default=4, help="pages per source PDF")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per flow (best wall time is reported)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_single_pass_")
+    try:
+        paths = []
+        for index in range(args.documents):
+            path = os.path.join(work_dir, f"doc_{index:03d}.pdf")
+            make_text_pdf(path, args.pages)
+            paths.append(path)
+
+        print(f"{args.documents} documents x {args.pages} pages")
+        two = measure("two-pass", two_pass, paths, os.path.join(work_dir, "two_pass.pdf"), args.repeat)
+        one = measure("single-pass", single_pass, paths, os.path.join(work_dir, "single_pass.pdf"), args.repeat)
+        print(f"speedup      {two / one:8.2f} x")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: the packet pipeline on synthetic listings at several sizes
+
+Builds a synthetic corpus (text-heavy PDFs, scanned-image PDFs, ZIPs of mixed
+files, 24 MP JPEG photos) and times each stage both apps run:
+
+    create_packet          merge + compress, as the web app's create_packet does
+    compress_pdf           size governor on an image-heavy packet
+    create_cover_page      template, photo, logo and address
+    create_instagram_posts New Listing / Under Contract / Sold
+    extract_pdfs_from_zip  PDFs out of an uploaded ZIP
+    convert_jpg_to_pdf     a full-resolution photo to a PDF page
+    convert_images         a photo-heavy listing's JPGs converted and merged in order
+
+Every case runs in a fresh process so wall time, CPU time (including any
+worker processes it starts) and peak RSS belong to that case alone.
+
+Usage:
+    python benchmarks/bench_suite.py --sizes small,medium
+    python benchmarks/bench_suite.py --save-baseline benchmarks/baselines/laptop.json
+    python benchmarks/bench_suite.py --compare benchmarks/baselines/laptop.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Documents per corpus: text PDFs x pages, scanned PDFs x pages, photo megapixels
+SIZES = {
+    'small': {'text_docs': 4, 'text_pages': 3, 'scan_docs': 1, 'scan_pages': 2, 'photo_mp': 6},
+    'medium': {'text_docs': 12, 'text_pages': 5, 'scan_docs': 3, 'scan_pages': 3, 'photo_mp': 24},
+    'large': {'text_docs': 30, 'text_pages': 8, 'scan_docs': 6, 'scan_pages': 5, 'photo_mp': 24},
+}
+
+CASES = ['create_packet', 'compress_pdf', 'create_cover_page', 'create_instagram_posts',
+         'extract_pdfs_from_zip', 'convert_jpg_to_pdf', 'convert_images']
+
+# Photos in the convert_images case, as in a photo-heavy listing
+LISTING_PHOTOS = 40
+
+# A case is a regression when it is this much slower or hungrier than baseline
+DEFAULT_TOLERANCE = 1.25
+
+# How often the parent checks that a case's process is still alive
+POLL_SECONDS = 1.0
+
+
+def make_photo(path, megapixels):
+    """Write a noisy 3:2 JPEG so it compresses like a real camera photo"""
+    from PIL import Image
+
+    width = int((megapixels * 1_000_000 * 1.5) ** 0.5)
+    height = int(width / 1.5)
+    channels = [Image.effect_noise((width, height), sigma).point(lambda v, o=offset: min(255, v + o))
+                for sigma, offset in ((40, 20), (55, 40), (30, 60))]
+    Image.merge('RGB', channels).save(path, 'JPEG', quality=90)
+
+
+def make_text_pdf(path, pages):
+    """Write an uncompressed text-heavy PDF, like a disclosure form"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(path, pagesize=letter, pageCompression=0)
+    for page in range(pages):
+        for line in range(70):
+            c.drawString(40, 760 - line * 10, f"Page {page + 1} line {line + 1} - seller disclosure boilerplate text")
+        c.showPage()
+    c.save()
+
+
+def make_scanned_pdf(path, pages):
+    """Write a PDF of full-page 200 DPI greyscale scans"""
+    from PIL import Image
+
+    scans = [Image.effect_noise((1700, 2200), 25 + page).convert('RGB') for page in range(pages)]
+    scans[0].save(path, 'PDF', resolution=200, save_all=True, append_images=scans[1:], quality=85)
+
+
+def build_corpus(work_dir, size):
+    """Generate one size's input files and return their paths"""
+    spec = SIZES[size]
+    corpus_dir = os.path.join(work_dir, size)
+    os.makedirs(corpus_dir, exist_ok=True)
+
+    corpus = {'text': [], 'scanned': []}
+    for index in range(spec['text_docs']):
+        path = os.path.join(corpus_dir, f"text_{index:02d}.pdf")
+        make_text_pdf(path, spec['text_pages'])
+        corpus['text'].append(path)
+    for index in range(spec['scan_docs']):
+        path = os.path.join(corpus_dir, f"scan_{index:02d}.pdf")
+        make_scanned_pdf(path, spec['scan_pages'])
+        corpus['scanned'].append(path)
+
+    corpus['photo'] = os.path.join(corpus_dir, "photo.jpg")
+    make_photo(corpus['photo'], spec['photo_mp'])
+
+    # Mixed ZIP, as agents download them from transaction software
+    corpus['zip'] = os.path.join(corpus_dir, "documents.zip")
+    with zipfile.ZipFile(corpus['zip'], 'w', zipfile.ZIP_DEFLATED) as archive:
+        for path in corpus['text'] + corpus['scanned'] + [corpus['photo']]:
+            archive.write(path, os.path.join("Listing Documents", os.path.basename(path)))
+        archive.writestr("Listing Documents/notes.txt", "Showing instructions: call listing agent")
+    return corpus
+
+
+def run_case(case, corpus, scratch_dir):
+    """Run one pipeline stage once; returns (bytes_in, bytes_out)"""
+    import listing_render
+    import packet_engine
+
+    with open(corpus['photo'], 'rb') as f:
+        photo_bytes = f.read()
+    documents = corpus['text'] + corpus['scanned']
+    bytes_in = sum(os.path.getsize(path) for path in documents)
+
+    if case == 'create_packet':
+        output_path = os.path.join(scratch_dir, "packet.pdf")
+        sources = [{'name': os.path.basename(path), 'path': path} for path in documents]
+        packet_engine.build_packet(sources, output_path, compress_streams=True, use_cache=False)
+        packet_engine.compress_to_target(output_path, packet_engine.DEFAULT_TARGET_SIZE_MB, streams_done=True)
+        return bytes_in, os.path.getsize(output_path)
+
+    if case == 'compress_pdf':
+        # Aim well below the input so the governor reaches its image steps
+        output_path = os.path.join(scratch_dir, "scanned.pdf")
+        sources = [{'name': os.path.basename(path), 'path': path} for path in corpus['scanned']]
+        packet_engine.merge_to_file(sources, output_path)
+        bytes_in = os.path.getsize(output_path)
+        packet_engine.compress_to_target(output_path, bytes_in / (3 * 1024 * 1024))
+        return bytes_in, os.path.getsize(output_path)
+
+    if case == 'create_cover_page':
+        output_path = os.path.join(scratch_dir, "cover.pdf")
+        listing_render.create_cover_page(photo_bytes, "12 Elm Street", "Woodstock, VT", output_path, use_cache=False)
+        return len(photo_bytes), os.path.getsize(output_path)
+
+    if case == 'create_instagram_posts':
+        posts = listing_render.create_instagram_posts(photo_bytes, "12 Elm Street", "Woodstock, VT", use_cache=False)
+        return len(photo_bytes), sum(len(post['data']) for post in posts)
+
+    if case == 'extract_pdfs_from_zip':
+        extracted = listing_render.extract_pdfs_from_zip(corpus['zip'])
+        packet_engine.close_sources(extracted)
+        return os.path.getsize(corpus['zip']), sum(pdf['size'] for pdf in extracted)
+
+    if case == 'convert_jpg_to_pdf':
+        converted = listing_render.convert_jpg_to_pdf(photo_bytes, "photo.jpg")
+        return len(photo_bytes), len(converted['content'])
+
+    if case == 'convert_images':
+        output_path = os.path.join(scratch_dir, "photos.pdf")
+        sources = listing_render.convert_images([(f"photo_{index:02d}.jpg", photo_bytes)
+                                                 for index in range(LISTING_PHOTOS)])
+        packet_engine.merge_to_file(sources, output_path)
+        return len(photo_bytes) * LISTING_PHOTOS, os.path.getsize(output_path)
+
+    raise ValueError(f"Unknown case: {case}")
+
+
+def _peak_rss_mb(usage):
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return usage.ru_maxrss / divisor
+
+
+def _measure_in_child(case, corpus, scratch_dir, results):
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    try:
+        bytes_in, bytes_out = run_case(case, corpus, scratch_dir)
+    except Exception:
+        # Hand the failure to the parent rather than leaving it waiting
+        results.put({'error': traceback.format_exc()})
+        return
+    wall = time.perf_counter() - start_wall
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    results.put({
+        'wall_s': wall,
+        'cpu_s': time.process_time() - start_cpu + children.ru_utime + children.ru_stime,
+        'peak_rss_mb': max(_peak_rss_mb(resource.getrusage(resource.RUSAGE_SELF)), _peak_rss_mb(children)),
+        'bytes_in': bytes_in,
+        'bytes_out': bytes_out,
+    })
+
+
+def _wait_for_result(child, results):
+    """The child's result, or an error if it died without one (killed, out of memory)"""
+    while True:
+        try:
+            return results.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            if not child.is_alive():
+                # It may have put its result just before exiting
+                try:
+                    return results.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    return {'error': f"process exited with code {child.exitcode} without a result"}
+
+
+def measure(case, corpus, scratch_dir, repeat):
+    """Run a case in fresh processes; keep the best wall time and the worst peak RSS"""
+    context = multiprocessing.get_context('spawn')
+    best = None
+    for _ in range(repeat):
+        results = context.Queue()
+        child = context.Process(target=_measure_in_child, args=(case, corpus, scratch_dir, results))
+        child.start()
+        result = _wait_for_result(child, results)
+        child.join()
+        if 'error' in result:
+            raise RuntimeError(f"{case} failed:\n{result['error']}")
+        if best is None:
+            best = result
+        else:
+            best['peak_rss_mb'] = max(best['peak_rss_mb'], result['peak_rss_mb'])
+            if result['wall_s'] < best['wall_s']:
+                best.update(wall_s=result['wall_s'], cpu_s=result['cpu_s'])
+    return best
+
+
+def compare(results, baseline, tolerance):
+    """Print each case against the baseline; return the regressed case keys"""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get('results', {}).get(key)
+        if not previous:
+            continue
+        wall_ratio = result['wall_s'] / previous['wall_s'] if previous['wall_s'] else 1.0
+        rss_ratio = result['peak_rss_mb'] / previous['peak_rss_mb'] if previous['peak_rss_mb'] else 1.0
+        flag = ""
+        if wall_ratio > tolerance or rss_ratio > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"{key:<36} wall {wall_ratio:5.2f}x   peak RSS {rss_ratio:5.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='small,medium', help=f"comma-separated corpus sizes ({', '.join(SIZES)})")
+    parser.add_argument('--cases', default=','.join(CASES), help="comma-separated cases to run")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per case (best wall time is reported)")
+    parser.add_argument('--save-baseline', help="write results to this JSON file")
+    parser.add_argument('--compare', help="baseline JSON to check these results against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="wall time or peak RSS ratio that counts as a regression")
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    cases = [case.strip() for case in args.cases.split(',') if case.strip()]
+    work_dir = tempfile.mkdtemp(prefix="bench_suite_")
+    results = {}
+    failures = []
+    try:
+        for size in sizes:
+            print(f"Building {size} corpus...")
+            corpus = build_corpus(work_dir, size)
+            scratch_dir = os.path.join(work_dir, f"{size}_out")
+            os.makedirs(scratch_dir, exist_ok=True)
+            for case in cases:
+                try:
+                    result = measure(case, corpus, scratch_dir, args.repeat)
+                except RuntimeError as e:
+                    print(f"{case + '/' + size:<36} FAILED\n{e}")
+                    failures.append(f"{case}/{size}")
+                    continue
+                results[f"{case}/{size}"] = result
+                print(f"{case + '/' + size:<36} wall {result['wall_s']:7.3f} s   cpu {result['cpu_s']:7.3f} s   "
+                      f"peak RSS {result['peak_rss_mb']:7.1f} MB   "
+                      f"{result['bytes_in'] / (1024 * 1024):7.2f} MB → {result['bytes_out'] / (1024 * 1024):7.2f} MB")
+    finally:
+        shutil.rmtree(work_dir)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)",
+                'repeat': args.repeat,
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nAgainst {args.compare} ({baseline.get('machine', 'unknown machine')}):")
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
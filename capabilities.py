@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Hall Collins Listing Packet Combiner - Capabilities
+Deferred imports and background library detection so windows can open
+before reportlab, Pillow and PyPDF2 have finished loading
+"""
+
+import importlib.util
+import sys
+import threading
+import time
+
+
+def lazy_import(name):
+    """Return a module that is only really imported when first used.
+
+    Attribute access (``packet_engine.build_packet``) triggers the import,
+    so module-level ``import`` cost moves to the first call that needs it.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+class Capabilities:
+    """Optional-library checks run once on a background thread.
+
+    Each check is a callable that imports what it needs and returns True if
+    the feature can be used. Results resolve asynchronously; callers that
+    need an answer straight away call wait() (or available()), which blocks
+    only until the checks have finished.
+    """
+
+    def __init__(self, checks):
+        self.checks = checks
+        self.results = {}
+        self.errors = {}
+        self.timings = {}
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Begin detection in the background (safe to call more than once)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="capability-detection", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            for name, check in self.checks.items():
+                start = time.perf_counter()
+                try:
+                    self.results[name] = bool(check())
+                except Exception as e:
+                    self.results[name] = False
+                    self.errors[name] = str(e)
+                self.timings[name] = time.perf_counter() - start
+        finally:
+            self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until every check has run; starts detection if nobody has yet"""
+        self.start()
+        return self._done.wait(timeout)
+
+    def available(self, name):
+        self.wait()
+        return self.results.get(name, False)
+
+    def report(self):
+        """One line per check with its result and how long its imports took"""
+        lines = []
+        for name in self.checks:
+            if name not in self.timings:
+                lines.append(f"{name:<12} pending")
+                continue
+            status = "ok" if self.results.get(name) else f"unavailable ({self.errors.get(name, 'check failed')})"
+            lines.append(f"{name:<12} {self.timings[name] * 1000:7.1f} ms  {status}")
+        return "\n".join(lines)
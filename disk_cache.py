@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Hall Collins Listing Packet Combiner - Disk Cache
+Content-addressed, size-capped LRU cache of files shared by both apps
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+# Where cached files live unless HC_CACHE_DIR points somewhere else
+DEFAULT_CACHE_ROOT = os.environ.get(
+    'HC_CACHE_DIR',
+    os.path.join(os.path.expanduser("~"), ".cache", "hall_collins_listing_packets"),
+)
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def hash_stream(stream):
+    """SHA-256 hex digest of a seekable binary stream, leaving it rewound"""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_BYTES), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def hash_file(path):
+    """SHA-256 hex digest of a file on disk"""
+    with open(path, 'rb') as f:
+        return hash_stream(f)
+
+
+class DiskCache:
+    """Files on disk keyed by a hash of their inputs, evicted least recently used first.
+
+    Recency is tracked through each entry's modification time, which is
+    refreshed on every hit, so the cache survives restarts and can be shared
+    by several processes. Hit, miss and eviction counts are kept per process.
+    """
+
+    def __init__(self, cache_dir, max_bytes, suffix='.bin'):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts):
+        """Combine input hashes and processing options into one cache key"""
+        return hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + self.suffix)
+
+    def get(self, key):
+        """Return the cached file path for a key, or None on a miss"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put_file(self, key, source_path, evict=True):
+        """Copy a finished file into the cache and return its cached path.
+
+        Args:
+            key (str): Cache key from make_key
+            source_path (str): File to store
+            evict (bool): Trim the cache straight away. Callers still reading
+                other entries pass False and call evict() when they are done.
+        """
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copyfile(source_path, temp_path)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        if evict:
+            self.evict()
+        return path
+
+    def put_bytes(self, key, data, evict=True):
+        """Store bytes in the cache and return the cached path"""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        if evict:
+            self.evict()
+        return path
+
+    def _entries(self):
+        entries = []
+        for folder, _, files in os.walk(self.cache_dir):
+            for filename in files:
+                if not filename.endswith(self.suffix):
+                    continue
+                path = os.path.join(folder, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits its size cap"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+                self.evictions += 1
+            except OSError:
+                continue
+
+    def stats(self):
+        """Hit/miss/eviction counts for this process plus current disk usage"""
+        entries = self._entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Hall Collins Listing Packet Combiner - Font Registry
+One index of the installed font families per process, shared by the
+Instagram (Pillow) and cover page (ReportLab) renderers. Like fontconfig's
+cache, each font file's family and style come from its own name table, and
+the index is kept on disk so only new or changed files are read again
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+
+from disk_cache import DEFAULT_CACHE_ROOT
+
+# Searched once, in this order - earlier folders win when a family appears twice
+FONT_DIRS = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts"),
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.local/share/fonts"),
+    os.path.expanduser("~/.fonts"),
+    "/System/Library/Fonts",
+    "/Library/Fonts",
+    os.path.expanduser("~/Library/Fonts"),
+    os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), "Fonts"),
+]
+
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc')
+# Most faces read from one font collection (.ttc)
+MAX_COLLECTION_FACES = 16
+
+# Family and style of every font file read so far, by path, mtime and size
+INDEX_CACHE_PATH = os.path.join(DEFAULT_CACHE_ROOT, "font_index.json")
+# Bump when the way faces are read changes so the saved index is rebuilt
+INDEX_VERSION = 1
+
+# Trailing words in a font file name that name the style rather than the
+# family - used only when a file's name table can't be read
+STYLE_WORDS = ('regular', 'book', 'normal', 'medium', 'light', 'thin', 'black',
+               'semibold', 'bold', 'italic', 'oblique', 'bolditalic', 'boldoblique', 'condensed')
+REGULAR_STYLES = ('regular', 'roman', 'book', 'normal', '')
+
+# Families tried in order for Instagram post text
+INSTAGRAM_FAMILIES = (
+    "Cambria", "Georgia", "Times New Roman", "Lato", "Open Sans",
+    "Liberation Serif", "Libertinus Serif", "DejaVu Serif", "DejaVu Sans",
+    "Times", "Helvetica",
+)
+
+# ReportLab font names tried in order for cover page text. They are used
+# only if already registered with ReportLab - system copies are never
+# registered for covers - so covers draw in the built-in Times-Roman
+COVER_FAMILIES = ("PlayfairDisplay-Regular", "EBGaramond-Regular")
+COVER_FALLBACK = "Times-Roman"
+# Installed stand-ins for Times-Roman where Pillow draws the cover (previews)
+COVER_FALLBACK_FAMILIES = ("Times New Roman", "Liberation Serif", "Nimbus Roman", "DejaVu Serif")
+
+_lock = threading.RLock()
+
+# Held while drawing or measuring text with a shared font - one FreeType face
+# must not be used by two threads at once
+text_lock = threading.Lock()
+_index = None
+_faces = {}
+_pil_fonts = {}
+_reportlab_fonts = {}
+
+
+class FontFace:
+    """A font file (and face within it, for collections) chosen for a family"""
+
+    def __init__(self, family, style, path, index=0):
+        self.family = family
+        self.style = style
+        self.path = path
+        self.index = index
+
+    def __repr__(self):
+        return f"FontFace({self.family!r}, {self.style!r}, {self.path!r}, {self.index})"
+
+
+def _normalize(name):
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+
+def _split_style(stem):
+    """'LiberationSerif-Regular' -> ('liberationserif', 'regular')"""
+    tokens = [token for token in re.split(r'[-_ ]+', stem) if token]
+    style_tokens = []
+    while len(tokens) > 1 and _normalize(tokens[-1]) in STYLE_WORDS:
+        style_tokens.insert(0, _normalize(tokens.pop()))
+    return _normalize("".join(tokens)), "".join(style_tokens)
+
+
+def _read_faces(path):
+    """[family, style, index] for each face in a font file, from its name table.
+    Falls back to the file name when the file can't be read (or Pillow is missing)."""
+    faces = []
+    try:
+        from PIL import ImageFont
+
+        count = MAX_COLLECTION_FACES if path.lower().endswith('.ttc') else 1
+        for index in range(count):
+            try:
+                family, style = ImageFont.truetype(path, 10, index=index).getname()
+            except (OSError, ValueError):
+                break
+            if family:
+                faces.append([family, style or "", index])
+    except ImportError:
+        pass
+    if not faces:
+        family, style = _split_style(os.path.splitext(os.path.basename(path))[0])
+        faces.append([family, style, 0])
+    return faces
+
+
+def _load_saved_index():
+    try:
+        with open(INDEX_CACHE_PATH) as f:
+            saved = json.load(f)
+        if saved.get('version') == INDEX_VERSION:
+            return saved.get('files', {})
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {}
+
+
+def _save_index(files):
+    try:
+        os.makedirs(os.path.dirname(INDEX_CACHE_PATH), exist_ok=True)
+        temp_path = f"{INDEX_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'version': INDEX_VERSION, 'files': files}, f)
+        os.replace(temp_path, INDEX_CACHE_PATH)
+    except OSError as e:
+        print(f"DEBUG: Could not save font index: {e}")
+
+
+def font_index():
+    """Family -> {style: (path, face index)} for every font under FONT_DIRS, built once.
+
+    Families and styles are normalized ('Times New Roman' -> 'timesnewroman',
+    'Bold Italic' -> 'bolditalic'). Files whose mtime and size match the
+    saved index are not opened again.
+    """
+    global _index
+    with _lock:
+        if _index is not None:
+            return _index
+        saved = _load_saved_index()
+        files = {}
+        index = {}
+        for font_dir in FONT_DIRS:
+            if not os.path.isdir(font_dir):
+                continue
+            for folder, _, filenames in os.walk(font_dir):
+                for filename in sorted(filenames):
+                    if os.path.splitext(filename)[1].lower() not in FONT_EXTENSIONS:
+                        continue
+                    path = os.path.join(folder, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    known = saved.get(path)
+                    if known and known['mtime_ns'] == stat.st_mtime_ns and known['size'] == stat.st_size:
+                        faces = known['faces']
+                    else:
+                        faces = _read_faces(path)
+                    files[path] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'faces': faces}
+                    for family, style, face_index in faces:
+                        index.setdefault(_normalize(family), {}).setdefault(_normalize(style), (path, face_index))
+        if files != saved:
+            _save_index(files)
+        _index = index
+        return _index
+
+
+def find_face(families):
+    """First installed family in the preference list, in its regular style.
+
+    Returns:
+        FontFace or None: The chosen face (cached per preference list)
+    """
+    families = tuple(families)
+    with _lock:
+        if families in _faces:
+            return _faces[families]
+        index = font_index()
+        face = None
+        for family in families:
+            styles = index.get(_normalize(family))
+            if not styles:
+                continue
+            for style in REGULAR_STYLES:
+                if style in styles:
+                    path, face_index = styles[style]
+                    face = FontFace(family, style or 'regular', path, face_index)
+                    break
+            if face:
+                break
+        _faces[families] = face
+        return face
+
+
+def pil_font(families, size):
+    """Pillow font for the first available family, loaded once per size.
+
+    Returns:
+        tuple: (ImageFont, FontFace or None). Falls back to Pillow's default
+               font - face is None then.
+    """
+    from PIL import ImageFont
+
+    key = (tuple(families), size)
+    with _lock:
+        if key in _pil_fonts:
+            return _pil_fonts[key]
+        face = find_face(families)
+        font = None
+        if face:
+            try:
+                font = ImageFont.truetype(face.path, size, index=face.index)
+            except OSError as e:
+                print(f"DEBUG: Could not load {face.path}: {e}")
+                face = None
+        if font is None:
+            font = ImageFont.load_default()
+        _pil_fonts[key] = (font, face)
+        return _pil_fonts[key]
+
+
+def reportlab_font(families=COVER_FAMILIES, fallback=COVER_FALLBACK):
+    """First of the ReportLab font names already registered, else fallback.
+
+    Returns:
+        tuple: (font_name, None) - covers use ReportLab's own fonts, so
+               there is no system font file behind the name
+    """
+    key = (tuple(families), fallback)
+    with _lock:
+        if key in _reportlab_fonts:
+            return _reportlab_fonts[key]
+        from reportlab.pdfbase import pdfmetrics
+
+        registered = pdfmetrics.getRegisteredFontNames()
+        font_name = next((name for name in families if name in registered), fallback)
+        _reportlab_fonts[key] = (font_name, None)
+        return _reportlab_fonts[key]
+
+
+def describe(face, size=None):
+    """Human-readable description of a chosen face for logs and the web app"""
+    at_size = f" at {size}pt" if size else ""
+    if face is None:
+        return f"LAST RESORT: Basic default font{at_size} - no system fonts found"
+    where = " (macOS)" if sys.platform == 'darwin' and face.path.startswith('/System/Library/') else ""
+    return f"{face.family}{where}{at_size} - FOUND at {face.path}"
@@ -0,0 +1,1087 @@
+#!/usr/bin/env python3
+"""
+Hall Collins Listing Packet Combiner - Listing Rendering
+Cover pages, Instagram posts and file conversion without any GUI, shared by
+the web app and the batch command line tool
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from io import BytesIO
+
+import font_registry
+import render_cache
+import template_assets
+from resource_budget import Budget
+
+# Enhanced error handling for optional libraries
+PIL_AVAILABLE = False
+REPORTLAB_AVAILABLE = False
+
+try:
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+    from reportlab.lib.utils import ImageReader
+    from reportlab import rl_config
+    REPORTLAB_AVAILABLE = True
+except Exception:
+    REPORTLAB_AVAILABLE = False
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except Exception:
+    PIL_AVAILABLE = False
+
+COVER_AVAILABLE = REPORTLAB_AVAILABLE and PIL_AVAILABLE
+
+# Templates are found next to this file so the tools work from any directory
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+COVER_TEMPLATE_PATH = os.path.join(TEMPLATE_DIR, "1) HC -  Template Bottom Photo.png")
+LOGO_OVERLAY_PATH = os.path.join(TEMPLATE_DIR, "HC_Solid White Logo_Transparent Back.png")
+
+# Instagram post specifications
+POST_WIDTH = 1080  # pixels
+POST_HEIGHT = 1350  # pixels
+POST_PHOTO_WIDTH = 1080  # Match post width for proper aspect ratio
+POST_PHOTO_HEIGHT = int(1085.2)  # pixels - reduced by 5 pixels to avoid covering colored banner
+
+# Cover photo area - full page width, exactly 7.12" tall, embedded at up to 300 DPI
+COVER_PAGE_SIZE = (8.5 * 72, 11 * 72)  # letter, in points
+COVER_PHOTO_INCHES = (8.5, 7.12)
+COVER_PHOTO_DPI = 300
+
+# Logo overlay on the cover - centred, 8.625" wide, its centre 1" from the top
+LOGO_WIDTH_INCHES = 8.625
+
+# JPGs added to a packet become one letter page each (landscape for landscape
+# photos), embedded at no more than this many pixels per inch
+IMAGE_PAGE_INCHES = (8.5, 11)
+IMAGE_PDF_DPI = int(os.environ.get('HC_IMAGE_PDF_DPI', 150))
+IMAGE_PDF_QUALITY = 85
+# Threads converting JPGs for every packet in this process (default one per CPU)
+IMAGE_WORKERS = int(os.environ.get('HC_IMAGE_WORKERS', 0)) or os.cpu_count() or 1
+_conversion_pool = None
+_conversion_pool_lock = threading.Lock()
+
+# Preview sizes - small enough that a cover and three posts redraw between keystrokes
+PREVIEW_COVER_WIDTH = 340  # pixels across the 8.5" page (40 DPI)
+PREVIEW_POST_SCALE = 0.3  # of the post's full size
+
+# Bump when a renderer's output changes - only that renderer's cached
+# renders stop matching (see render_cache)
+COVER_RENDER_VERSION = 4
+POST_RENDER_VERSION = 2
+
+# Template file, post type, text alignment, x offset, y, text colour
+INSTAGRAM_TEMPLATES = [
+    (os.path.join(TEMPLATE_DIR, "Instagram New Post Template.png"), "New Listing", "centered_offset", 100, 1206, "white"),
+    (os.path.join(TEMPLATE_DIR, "Instagram Under Contract Post Template.png"), "Under Contract", "centered_offset", 100, 1206, "#173348"),
+    (os.path.join(TEMPLATE_DIR, "Instagram Sold Post Template.png"), "Sold", "centered_offset", 100, 1206, "#173348"),
+]
+
+# Social formats - canvas size, banner height and file name label. Each post
+# template ends in a 1080x265 banner (logo and heading) below the photo; other
+# formats reuse that banner, scaled to banner_height and centred on a strip of
+# its own background colour, with the photo filling the space above.
+TEMPLATE_BANNER_HEIGHT = POST_HEIGHT - POST_PHOTO_HEIGHT
+SOCIAL_FORMATS = {
+    'feed': {'label': "Instagram", 'size': (1080, 1350), 'banner_height': 265},  # 4:5
+    'story': {'label': "Instagram Story", 'size': (1080, 1920), 'banner_height': 265},  # 9:16
+    'square': {'label': "Instagram Square", 'size': (1080, 1080), 'banner_height': 265},  # 1:1
+    'facebook': {'label': "Facebook", 'size': (1200, 630), 'banner_height': 160},  # link image
+}
+
+
+def social_photo_size(social_format):
+    """(width, height) of the photo area in one of SOCIAL_FORMATS"""
+    width, height = SOCIAL_FORMATS[social_format]['size']
+    return width, height - SOCIAL_FORMATS[social_format]['banner_height']
+
+
+# Post encoders - Pillow format, file extension, MIME type and save options.
+# Instagram takes JPEG or PNG and re-encodes uploads as JPEG anyway, so a
+# progressive JPEG is the default: a fraction of the PNG's size and encode time.
+POST_ENCODERS = {
+    'jpeg': {'format': 'JPEG', 'extension': '.jpg', 'mime': 'image/jpeg',
+             'options': {'quality': 90, 'progressive': True, 'optimize': True}},
+    'png': {'format': 'PNG', 'extension': '.png', 'mime': 'image/png',
+            'options': {'optimize': True}},
+    'webp': {'format': 'WEBP', 'extension': '.webp', 'mime': 'image/webp',
+             'options': {'quality': 90, 'method': 4}},
+}
+DEFAULT_POST_ENCODER = 'jpeg'
+
+
+def print_warning(message):
+    """Default warning callback for callers without a UI"""
+    print(f"Warning: {message}")
+
+
+def parse_address(full_address):
+    """Parse full address into street address and city/state"""
+    parts = [part.strip() for part in full_address.split(',')]
+
+    if len(parts) >= 3:
+        street = parts[0]
+        city_state = f"{parts[1]}, {parts[2]}"
+    elif len(parts) == 2:
+        street = parts[0]
+        city_state = parts[1]
+    else:
+        words = full_address.split()
+        if len(words) >= 2:
+            street = ' '.join(words[:-1])
+            city_state = words[-1]
+        else:
+            street = full_address
+            city_state = ""
+
+    return street, city_state
+
+
+def crop_to_aspect(img, target_aspect):
+    """Centre-crop an image to the target width/height ratio"""
+    img_width, img_height = img.size
+    img_aspect = img_width / img_height
+
+    if img_aspect > target_aspect:
+        # Image is wider than target - crop the width
+        new_height = img_height
+        new_width = int(new_height * target_aspect)
+        left = (img_width - new_width) // 2
+        crop_box = (left, 0, left + new_width, new_height)
+    else:
+        # Image is taller than target - crop the height
+        new_width = img_width
+        new_height = int(new_width / target_aspect)
+        top = (img_height - new_height) // 2
+        crop_box = (0, top, new_width, top + new_height)
+
+    return img.crop(crop_box)
+
+
+class PropertyPhoto:
+    """The property photo decoded once, with the crop each renderer needs.
+
+    JPEGs are decoded at a reduced DCT scale (Pillow's draft mode) when that
+    still leaves enough pixels for the largest derivative, so a 24 MP camera
+    photo usually decodes at 1/2 or 1/4 size. Attributes:
+        instagram: RGB image, exactly POST_PHOTO_WIDTH x POST_PHOTO_HEIGHT
+        cover: RGB image at the cover photo area's aspect ratio, no larger
+            than COVER_PHOTO_DPI across it
+        cover_passthrough: True when the original JPEG already fits the
+            cover photo area and is embedded as-is (see cover_jpeg)
+    Crops for other photo areas (story, square, Facebook) come from fit();
+    pass their sizes as photo_sizes to build them in the same decode.
+    Photos over the budget's pixel or memory cap are decoded at a reduced
+    scale if JPEG and refused (BudgetExceeded) otherwise.
+    """
+
+    def __init__(self, photo_bytes, photo_sizes=(), budget=None):
+        self.photo_bytes = photo_bytes
+        self.budget = budget or Budget()
+        self._lock = threading.Lock()
+        self._fits = {}
+        self._previews = {}
+        self._cover_jpeg = None
+
+        cover_size = (int(COVER_PHOTO_INCHES[0] * COVER_PHOTO_DPI), int(COVER_PHOTO_INCHES[1] * COVER_PHOTO_DPI))
+        sizes = [(POST_PHOTO_WIDTH, POST_PHOTO_HEIGHT)] + [tuple(size) for size in photo_sizes]
+        img = self._decode(sizes + [cover_size])
+        self.original_size = self._original_size
+        self.decoded_size = img.size
+
+        # Crop and resize to exact specifications
+        for size in sizes:
+            self._fits[size] = crop_to_aspect(img, size[0] / size[1]).resize(size, Image.Resampling.LANCZOS)
+        self.instagram = self._fits[(POST_PHOTO_WIDTH, POST_PHOTO_HEIGHT)]
+
+        self.cover_passthrough = self._fits_cover(cover_size)
+        cover = crop_to_aspect(img, COVER_PHOTO_INCHES[0] / COVER_PHOTO_INCHES[1])
+        if cover.width > cover_size[0]:
+            cover = cover.resize(cover_size, Image.Resampling.LANCZOS)
+        self.cover = cover
+
+    def _decode(self, targets):
+        """Smallest decode that still covers every crop at full target resolution"""
+        img = Image.open(BytesIO(self.photo_bytes))
+        self._original_size = img.size
+        self._original_format = (img.format, img.mode)
+        limit = self.budget.image_scale(img.size, "Property photo", reducible=img.format == 'JPEG')
+        if img.format == 'JPEG':
+            scale = max(self._scale_needed(img.size, target) for target in targets)
+            if limit < 1 and limit <= scale:
+                # Over budget - decode at exactly the largest scale that fits
+                img.draft('RGB', (int(img.width * limit), int(img.height * limit)))
+            elif scale < 1:
+                img.draft('RGB', (int(img.width * scale) + 1, int(img.height * scale) + 1))
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        return img
+
+    def _fits_cover(self, cover_size):
+        """Whether the original JPEG already is the cover crop: RGB or greyscale,
+        the photo area's aspect ratio to within a pixel, and no more than
+        COVER_PHOTO_DPI across it
+        """
+        if self._original_format not in [('JPEG', 'RGB'), ('JPEG', 'L')]:
+            return False
+        width, height = self._original_size
+        target_aspect = COVER_PHOTO_INCHES[0] / COVER_PHOTO_INCHES[1]
+        return width <= cover_size[0] and abs(width - height * target_aspect) < 1
+
+    @staticmethod
+    def _scale_needed(size, target):
+        """Fraction of the full image needed for a centre crop to reach target pixels"""
+        width, height = size
+        target_aspect = target[0] / target[1]
+        crop_width = min(width, height * target_aspect)
+        return target[0] / crop_width
+
+    @property
+    def digest(self):
+        """SHA-256 of the photo file, for render cache keys"""
+        if not hasattr(self, '_digest'):
+            self._digest = render_cache.photo_digest(self.photo_bytes)
+        return self._digest
+
+    def fit(self, size):
+        """RGB centre crop resized to exactly size (width, height), built once per size"""
+        size = tuple(size)
+        with self._lock:
+            if size not in self._fits:
+                # Not requested up front - decode again just for this size
+                img = self._decode([size])
+                self._fits[size] = crop_to_aspect(img, size[0] / size[1]).resize(size, Image.Resampling.LANCZOS)
+            return self._fits[size]
+
+    def preview(self, size):
+        """Low-resolution centre crop at size (width, height), scaled down from
+        the closest crop already built - never decodes the photo again
+        """
+        size = tuple(size)
+        with self._lock:
+            if size not in self._previews:
+                aspect = size[0] / size[1]
+                source = min([self.cover, *self._fits.values()], key=lambda img: abs(img.width / img.height - aspect))
+                self._previews[size] = crop_to_aspect(source, aspect).resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+            return self._previews[size]
+
+    def cover_jpeg(self):
+        """The cover crop as JPEG bytes, encoded on first use.
+
+        A photo that already fits the cover photo area is returned unchanged,
+        so its DCT data is embedded without a decode/re-encode round trip.
+        """
+        if self.cover_passthrough:
+            return self.photo_bytes
+        if self._cover_jpeg is None:
+            buffer = BytesIO()
+            self.cover.save(buffer, 'JPEG', quality=95)
+            self._cover_jpeg = buffer.getvalue()
+        return self._cover_jpeg
+
+
+def prepare_photo(photo):
+    """PropertyPhoto for raw photo bytes; passes PropertyPhoto and None through"""
+    if not photo or isinstance(photo, PropertyPhoto):
+        return photo or None
+    return PropertyPhoto(photo)
+
+
+def _cover_cache_key(photo, street_address, city_state):
+    """Render cache key: photo, address, template and logo contents, font and layout"""
+    font_name, face = font_registry.reportlab_font()
+    return render_cache.make_key(
+        'cover', COVER_RENDER_VERSION, photo.digest if photo else render_cache.photo_digest(None),
+        [street_address, city_state], [COVER_TEMPLATE_PATH, LOGO_OVERLAY_PATH],
+        [render_cache.file_identity(face.path) if face else font_name],
+        [COVER_PHOTO_INCHES, COVER_PHOTO_DPI, LOGO_WIDTH_INCHES])
+
+
+def create_cover_page(photo, street_address, city_state, output_path, warn=print_warning, use_cache=True):
+    """Create custom cover page: template, cropped property photo, logo and address.
+
+    A cover rendered before from the same inputs is copied from the render
+    cache; covers drawn without any warnings are stored there.
+
+    Args:
+        photo (PropertyPhoto or bytes): Property photo, or None for the template alone
+        street_address (str): First address line
+        city_state (str): Second address line
+        output_path (str): Where to write the one-page PDF
+        warn (callable): Receives a message for each part that could not be drawn
+        use_cache (bool): Look up and store the cover in the render cache
+
+    Returns:
+        bool: True if the cover page was written
+    """
+    if not COVER_AVAILABLE:
+        return False
+
+    try:
+        photo = prepare_photo(photo)
+    except Exception as e:
+        warn(f"Could not add photo overlay: {e}")
+        photo = None
+
+    key = None
+    if use_cache:
+        key = _cover_cache_key(photo, street_address, city_state)
+        if render_cache.get_file(key, output_path):
+            return True
+
+    messages = []
+
+    def note(message):
+        messages.append(message)
+        warn(message)
+
+    created = _draw_cover_page(photo, street_address, city_state, output_path, note)
+    if created and key and not messages:
+        render_cache.put_file(key, output_path)
+    return created
+
+
+# ReportLab's ASCII85 setting is process-wide - held while a layer is drawn
+_binary_streams_lock = threading.Lock()
+
+
+def _layer_pdf(draw):
+    """One-page letter PDF (bytes) holding whatever draw(c) puts on the canvas.
+
+    Image streams are written binary: JPEG data goes in as its original DCT
+    bytes rather than ASCII85-wrapped, which would add a quarter to its size.
+    """
+    buffer = BytesIO()
+    with _binary_streams_lock:
+        use_a85 = rl_config.useA85
+        rl_config.useA85 = 0
+        try:
+            c = canvas.Canvas(buffer, pagesize=COVER_PAGE_SIZE)
+            draw(c)
+            c.save()
+        finally:
+            rl_config.useA85 = use_a85
+    return buffer.getvalue()
+
+
+def _draw_template_layer(c):
+    # Draw the complete template - covers entire page
+    c.drawImage(template_assets.page_reader(COVER_TEMPLATE_PATH), 0, 0,
+                width=COVER_PAGE_SIZE[0], height=COVER_PAGE_SIZE[1])
+
+
+def _draw_logo_layer(c):
+    # Size the logo 50% larger (5.75" * 1.5 = 8.625" wide), held at 300 DPI
+    page_width, page_height = COVER_PAGE_SIZE
+    logo_width = LOGO_WIDTH_INCHES * inch
+    logo_pixels_wide, logo_pixels_high = template_assets.image_size(LOGO_OVERLAY_PATH)
+    logo_height = logo_pixels_high * (logo_width / logo_pixels_wide)
+    logo = template_assets.overlay_reader(LOGO_OVERLAY_PATH, LOGO_WIDTH_INCHES, COVER_PHOTO_DPI)
+
+    # Position logo centered horizontally, with CENTER 1" from top
+    logo_x = (page_width - logo_width) / 2
+    logo_y = page_height - (1.0 * inch) - (logo_height / 2)
+    c.drawImage(logo, logo_x, logo_y, width=logo_width, height=logo_height, mask='auto')
+
+
+def cover_layers():
+    """The static cover layers - template base and logo overlay - as one-page PDFs.
+
+    Each is compiled once (and again only if its PNG changes), with its image
+    already compressed, and kept in memory and in the render cache - so a
+    cover only draws the photo and the address and stitches them between
+    these layers, even in a freshly started app.
+
+    Returns:
+        dict: 'template' and 'logo' PDF bytes (missing files are left out)
+    """
+    def compile_layer(name, draw):
+        def build(path):
+            key = render_cache.make_key('cover layer', COVER_RENDER_VERSION, "", [], [path], [],
+                                        [name, LOGO_WIDTH_INCHES, COVER_PHOTO_DPI])
+            layer = render_cache.get_bytes(key)
+            if layer is None:
+                layer = _layer_pdf(draw)
+                render_cache.put_bytes(key, layer)
+            return layer
+        return build
+
+    layers = {}
+    for name, path, draw in [('template', COVER_TEMPLATE_PATH, _draw_template_layer),
+                             ('logo', LOGO_OVERLAY_PATH, _draw_logo_layer)]:
+        if os.path.exists(path):
+            layers[name] = template_assets.cached('cover layer', path, (LOGO_WIDTH_INCHES, COVER_PHOTO_DPI),
+                                                  compile_layer(name, draw))
+    return layers
+
+
+def _draw_cover_page(photo, street_address, city_state, output_path, warn):
+    """Draw the cover page PDF (see create_cover_page).
+
+    Layers from the bottom: template, property photo, logo, address text.
+    The template and logo come precompiled from cover_layers(); only the
+    photo and text are drawn here, then the four pages are overlaid.
+    """
+    from PyPDF2 import PageObject, PdfReader, PdfWriter
+
+    try:
+        # Use standard letter size - 8.5" x 11"
+        page_width, page_height = COVER_PAGE_SIZE
+
+        # Static layers, compiled once per process
+        static_layers = {}
+        try:
+            static_layers = cover_layers()
+        except Exception as e:
+            warn(f"Could not prepare template and logo: {e}")
+        if 'template' not in static_layers and not os.path.exists(COVER_TEMPLATE_PATH):
+            warn(f"Template file not found: {COVER_TEMPLATE_PATH}")
+
+        # Add property photo overlay (covers the photo area of the template)
+        def draw_photo(c):
+            # Define target dimensions for photo area
+            target_width = COVER_PHOTO_INCHES[0] * inch  # Full page width
+            target_height = COVER_PHOTO_INCHES[1] * inch  # Exactly 7.12 inches tall
+
+            # Already cropped to the photo area's aspect ratio
+            cropped_photo = BytesIO(photo.cover_jpeg())
+
+            # Position for photo area
+            photo_x = 0  # Start at absolute left edge
+            photo_y = page_height - target_height  # Position from top: 11" - 7.12" = 3.88" from bottom
+
+            # Draw the properly cropped photo over the template
+            c.drawImage(ImageReader(cropped_photo), photo_x, photo_y, width=target_width, height=target_height)
+
+        photo_layer = None
+        if photo:
+            try:
+                photo_layer = _layer_pdf(draw_photo)
+            except Exception as e:
+                warn(f"Could not add photo overlay: {e}")
+
+        # Add address text overlays on the photo - street at 36pt, city/state at 24pt
+        def draw_text(c):
+            font_name, _ = font_registry.reportlab_font()
+            for text, font_size, text_y, label in [
+                (street_address, 36, 3.21 * inch, "street address"),
+                (city_state, 24, 2.58 * inch, "city/state"),
+            ]:
+                if not text:
+                    continue
+                try:
+                    c.setFont(font_name, font_size)
+                    c.setFillColor(colors.white)
+                    # Center the text on the photo - convert to uppercase
+                    text_upper = text.upper()
+                    text_width = c.stringWidth(text_upper, font_name, font_size)
+                    c.drawString((page_width - text_width) / 2, text_y, text_upper)
+                except Exception as text_e:
+                    warn(f"Could not add {label}: {text_e}")
+
+        text_layer = _layer_pdf(draw_text)
+
+        # Stack the layers on one page - image streams are copied, not re-encoded
+        page = PageObject.create_blank_page(width=page_width, height=page_height)
+        for name, layer in [('template base', static_layers.get('template')), ('photo overlay', photo_layer),
+                            ('logo overlay', static_layers.get('logo')), ('address text', text_layer)]:
+            if layer is None:
+                continue
+            try:
+                page.merge_page(PdfReader(BytesIO(layer)).pages[0])
+            except Exception as e:
+                warn(f"Could not add {name}: {e}")
+
+        # Save the PDF
+        writer = PdfWriter()
+        writer.add_page(page)
+        with open(output_path, 'wb') as f:
+            writer.write(f)
+        return True
+
+    except Exception as e:
+        warn(f"Error creating cover page: {e}")
+        return False
+
+
+def preview_cover(photo, street_address, city_state, width=PREVIEW_COVER_WIDTH, warn=print_warning):
+    """Small raster preview of the cover page with the same layout as create_cover_page.
+
+    Drawn with Pillow at width pixels across the page from the cached template,
+    logo and photo crop, in the same face the cover's address is set in (or a
+    Times-like stand-in for ReportLab's built-in Times-Roman).
+
+    Args:
+        photo (PropertyPhoto or bytes): Property photo, or None for the template alone
+        street_address (str): First address line
+        city_state (str): Second address line
+        width (int): Preview width in pixels
+        warn (callable): Receives a message for each part that could not be drawn
+
+    Returns:
+        Image or None: RGB PIL image of the page, None if Pillow is unavailable
+    """
+    if not PIL_AVAILABLE:
+        return None
+
+    from PIL import ImageDraw
+
+    # Pixels per inch at this width - every cover measurement is in inches or points
+    ppi = width / (COVER_PAGE_SIZE[0] / 72)
+    page_size = (width, round(COVER_PAGE_SIZE[1] / 72 * ppi))
+    preview = Image.new('RGB', page_size, 'white')
+
+    try:
+        photo = prepare_photo(photo)
+    except Exception as e:
+        warn(f"Could not add photo overlay: {e}")
+        photo = None
+
+    if os.path.exists(COVER_TEMPLATE_PATH):
+        try:
+            template = template_assets.template_image(COVER_TEMPLATE_PATH, page_size)
+            preview.paste(template, (0, 0), template)
+        except Exception as e:
+            warn(f"Could not add template base: {e}")
+    else:
+        warn(f"Template file not found: {COVER_TEMPLATE_PATH}")
+
+    if photo:
+        try:
+            preview.paste(photo.preview((width, round(COVER_PHOTO_INCHES[1] * ppi))), (0, 0))
+        except Exception as e:
+            warn(f"Could not add photo overlay: {e}")
+
+    if os.path.exists(LOGO_OVERLAY_PATH):
+        try:
+            # Same placement as the cover: 8.625" wide, centred, its centre 1" from the top
+            logo_pixels_wide, logo_pixels_high = template_assets.image_size(LOGO_OVERLAY_PATH)
+            logo_size = (round(LOGO_WIDTH_INCHES * ppi), round(logo_pixels_high * LOGO_WIDTH_INCHES * ppi / logo_pixels_wide))
+            logo = template_assets.template_image(LOGO_OVERLAY_PATH, logo_size)
+            preview.paste(logo, ((width - logo_size[0]) // 2, round(ppi - logo_size[1] / 2)), logo)
+        except Exception as e:
+            warn(f"Could not add logo overlay: {e}")
+
+    _, face = font_registry.reportlab_font()
+    families = (face.family,) if face else font_registry.COVER_FALLBACK_FAMILIES
+    for text, font_size, text_y, label in [
+        (street_address, 36, 3.21, "street address"),
+        (city_state, 24, 2.58, "city/state"),
+    ]:
+        if not text:
+            continue
+        try:
+            font, _ = font_registry.pil_font(families, round(font_size * ppi / 72))
+            with font_registry.text_lock:
+                # Centred on its baseline, text_y inches from the bottom of the page
+                ImageDraw.Draw(preview).text((width / 2, page_size[1] - text_y * ppi), text.upper(),
+                                             fill='white', font=font, anchor='ms')
+        except Exception as e:
+            warn(f"Could not add {label}: {e}")
+
+    return preview
+
+
+def load_instagram_fonts(scale=1.0):
+    """Street (65pt) and city/state (45pt) fonts for Instagram posts, from the font registry.
+
+    Args:
+        scale (float): Size multiplier for formats with a smaller banner
+
+    Returns:
+        tuple: (main_font, small_font, main_font_details, small_font_details)
+    """
+    main_size, small_size = round(65 * scale), round(45 * scale)
+    main_font, main_face = font_registry.pil_font(font_registry.INSTAGRAM_FAMILIES, main_size)
+    small_font, small_face = font_registry.pil_font(font_registry.INSTAGRAM_FAMILIES, small_size)
+    return main_font, small_font, font_registry.describe(main_face, main_size), font_registry.describe(small_face, small_size)
+
+
+def _text_x(draw, text, font, text_alignment, text_x, left=0, width=POST_WIDTH):
+    """Horizontal position for a line of post text within a banner at left, width wide"""
+    if text_alignment == "centered_offset":
+        # Center text with offset
+        text_width = draw.textbbox((0, 0), text, font=font)[2]
+        return left + (width // 2) - (text_width // 2) + text_x
+    if text_alignment == "centered":
+        # Center text perfectly
+        text_width = draw.textbbox((0, 0), text, font=font)[2]
+        return left + (width - text_width) // 2
+    # For other cases: use absolute positioning
+    return left + text_x
+
+
+def encode_image(img, encoder=DEFAULT_POST_ENCODER):
+    """Encode a finished post with one of POST_ENCODERS.
+
+    Returns:
+        tuple: (bytes, report) - report holds 'encoder', 'seconds' and 'bytes'
+    """
+    settings = POST_ENCODERS[encoder]
+    start = time.perf_counter()
+    output_buffer = BytesIO()
+    img.save(output_buffer, format=settings['format'], **settings['options'])
+    data = output_buffer.getvalue()
+    return data, {'encoder': encoder, 'seconds': time.perf_counter() - start, 'bytes': len(data)}
+
+
+def format_encode_report(posts):
+    """One line summing up how a set of posts was encoded, for logs and summaries"""
+    if not posts:
+        return "no posts encoded"
+    encoders = sorted({post['encode']['encoder'] for post in posts})
+    total_bytes = sum(post['encode']['bytes'] for post in posts)
+    total_seconds = sum(post['encode']['seconds'] for post in posts)
+    return (f"{'/'.join(name.upper() for name in encoders)}, {len(posts)} posts, "
+            f"{total_bytes / 1024:.0f} KB total, encoded in {total_seconds:.2f}s")
+
+
+def render_variants(render, specs, workers=None):
+    """Run render(spec) for every spec on a thread pool, results in spec order.
+
+    Pillow releases the GIL while compositing and encoding, so post variants
+    render side by side; adding a variant costs a core rather than wall time.
+
+    Args:
+        render (callable): Builds one variant from its spec
+        specs (list): One entry per variant
+        workers (int): Thread count (default one per variant, up to the CPU count);
+            1 renders in the calling thread
+
+    Returns:
+        list: render(spec) for each spec, in the order given
+    """
+    specs = list(specs)
+    workers = min(workers or os.cpu_count() or 1, len(specs))
+    if workers <= 1:
+        return [render(spec) for spec in specs]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="post-render") as pool:
+        return list(pool.map(render, specs))
+
+
+def _draw_post(spec, photo_image, street_address, city_state, fonts, size, banner_height, messages):
+    """Lay out one post: template (or its banner), photo above the banner, address.
+
+    Args:
+        spec (tuple): Template spec like INSTAGRAM_TEMPLATES entries
+        photo_image (Image): Photo already cropped to (width, height - banner_height), or None
+        fonts (tuple): load_instagram_fonts() result at this banner's scale
+        size (tuple): Post (width, height) in pixels
+        banner_height (int): Banner height in pixels - text is scaled to match
+        messages (list): Receives a message for each overlay that could not be drawn
+
+    Returns:
+        Image: The finished RGB post
+    """
+    from PIL import ImageDraw
+
+    template_file, post_type, text_alignment, text_x, text_y, text_color = spec
+    main_font, small_font = fonts[0], fonts[1]
+    width, height = size
+    banner_top = height - banner_height
+    scale = banner_height / TEMPLATE_BANNER_HEIGHT
+
+    # Create new image with the format's dimensions
+    instagram_post = Image.new('RGB', (width, height), 'white')
+
+    # Apply template as background - decoded and scaled once per process
+    if (width, height) == (POST_WIDTH, POST_HEIGHT):
+        template_img = template_assets.template_image(template_file, (POST_WIDTH, POST_HEIGHT))
+        instagram_post.paste(template_img, (0, 0), template_img)
+        banner_left, banner_width = 0, POST_WIDTH
+    else:
+        # Just the banner, on a full-width strip of its background colour
+        banner = template_assets.template_region(
+            template_file, (POST_WIDTH, POST_HEIGHT), (0, POST_PHOTO_HEIGHT, POST_WIDTH, POST_HEIGHT), scale)
+        instagram_post.paste(banner.getpixel((banner.width - 1, banner.height - 1))[:3], (0, banner_top, width, height))
+        banner_left, banner_width = (width - banner.width) // 2, banner.width
+        instagram_post.paste(banner, (banner_left, banner_top), banner)
+
+    # Overlay property photo, already cropped and resized to exact specifications
+    if photo_image:
+        # Paste photo at top center
+        instagram_post.paste(photo_image, (0, 0))
+
+    # Add address text overlay - uppercase for consistent branding.
+    # The fonts are shared by every thread, and FreeType faces are not
+    # safe to use concurrently, so text is drawn one post at a time.
+    if street_address:
+        try:
+            with font_registry.text_lock:
+                draw = ImageDraw.Draw(instagram_post)
+                street_address_upper = street_address.upper()
+                street_y = banner_top + round((text_y - POST_PHOTO_HEIGHT) * scale)
+                text_position = (_text_x(draw, street_address_upper, main_font, text_alignment, round(text_x * scale),
+                                         banner_left, banner_width), street_y)
+                draw.text(text_position, street_address_upper, fill=text_color, font=main_font)
+
+                # Add city/state below street address if available
+                if city_state:
+                    try:
+                        city_state_upper = city_state.upper()
+                        # 75px between lines keeps city/state close to the street
+                        city_position = (_text_x(draw, city_state_upper, small_font, text_alignment, round(text_x * scale),
+                                                 banner_left, banner_width), street_y + round(75 * scale))
+                        draw.text(city_position, city_state_upper, fill=text_color, font=small_font)
+                    except Exception as city_e:
+                        messages.append(f"Could not add city/state text: {city_e}")
+
+        except Exception as text_e:
+            messages.append(f"Could not add address text to {post_type}: {text_e}")
+
+    return instagram_post
+
+
+def _render_post(spec, photo, street_address, city_state, fonts, encoder, social_format='feed', use_cache=True):
+    """Build one post from its template spec in one of SOCIAL_FORMATS, or
+    fetch it from the render cache when the same inputs were rendered before.
+
+    Returns:
+        tuple: ({'name', 'data', 'type', 'format', 'mime', 'encode'} or None,
+        list of warning messages). Warnings are handed back rather than sent
+        to warn() because the callback (st.warning) must run on the caller's thread.
+    """
+    template_file, post_type = spec[0], spec[1]
+    main_font, small_font = fonts[0], fonts[1]
+    layout = SOCIAL_FORMATS[social_format]
+    width, height = layout['size']
+    messages = []
+    if not os.path.exists(template_file):
+        return None, [f"Template not found: {template_file}"]
+
+    def post(data, report):
+        return {
+            'name': f"{layout['label']} - {post_type} - {street_address}{POST_ENCODERS[encoder]['extension']}",
+            'data': data,
+            'type': post_type,
+            'format': social_format,
+            'mime': POST_ENCODERS[encoder]['mime'],
+            'encode': report,
+        }
+
+    key = None
+    if use_cache:
+        key = render_cache.make_key(
+            'post', POST_RENDER_VERSION, photo.digest if photo else render_cache.photo_digest(None),
+            [street_address, city_state], [template_file],
+            [render_cache.font_identity(main_font), render_cache.font_identity(small_font)],
+            [social_format, layout, spec[1:], encoder, POST_ENCODERS[encoder]['options']])
+        data = render_cache.get_bytes(key)
+        if data is not None:
+            return post(data, {'encoder': encoder, 'seconds': 0.0, 'bytes': len(data), 'cached': True}), []
+
+    try:
+        photo_image = photo.fit((width, height - layout['banner_height'])) if photo else None
+        instagram_post = _draw_post(spec, photo_image, street_address, city_state, fonts, (width, height),
+                                    layout['banner_height'], messages)
+
+        # Convert to bytes for download; keep posts that rendered cleanly
+        data, report = encode_image(instagram_post, encoder)
+        if key and not messages:
+            render_cache.put_bytes(key, data)
+
+        return post(data, report), messages
+
+    except Exception as e:
+        messages.append(f"Could not create {post_type} {layout['label']} post: {e}")
+        return None, messages
+
+
+def preview_posts(photo, street_address, city_state, social_format='feed', scale=PREVIEW_POST_SCALE,
+                  warn=print_warning, templates=None):
+    """Small raster previews of every post variant, laid out as create_social_posts does.
+
+    Everything is drawn at scale - templates, fonts and photo crops come from
+    the in-memory caches, and nothing is encoded - so previews can follow the
+    address as it is typed.
+
+    Args:
+        photo (PropertyPhoto or bytes): Property photo, or None for the templates alone
+        street_address (str): First address line
+        city_state (str): Second address line
+        social_format (str): Key of SOCIAL_FORMATS
+        scale (float): Fraction of the format's full size
+        warn (callable): Receives a message for each preview or overlay that failed
+        templates (list): Post specs like INSTAGRAM_TEMPLATES
+
+    Returns:
+        list: {'type', 'format', 'image'} dicts in template order - image is an RGB PIL image
+    """
+    if not PIL_AVAILABLE:
+        return []
+
+    previews = []
+    try:
+        photo = prepare_photo(photo)
+        layout = SOCIAL_FORMATS[social_format]
+        size = (round(layout['size'][0] * scale), round(layout['size'][1] * scale))
+        banner_height = round(layout['banner_height'] * scale)
+        fonts = load_instagram_fonts(banner_height / TEMPLATE_BANNER_HEIGHT)
+        photo_image = photo.preview((size[0], size[1] - banner_height)) if photo else None
+
+        for spec in templates or INSTAGRAM_TEMPLATES:
+            if not os.path.exists(spec[0]):
+                warn(f"Template not found: {spec[0]}")
+                continue
+            messages = []
+            try:
+                image = _draw_post(spec, photo_image, street_address, city_state, fonts, size, banner_height, messages)
+                previews.append({'type': spec[1], 'format': social_format, 'image': image})
+            except Exception as e:
+                messages.append(f"Could not preview {spec[1]} {layout['label']} post: {e}")
+            for message in messages:
+                warn(message)
+
+    except Exception as e:
+        warn(f"Error previewing posts: {e}")
+
+    return previews
+
+
+def create_social_posts(photo, street_address, city_state, formats=('feed',), warn=print_warning, fonts=None,
+                        templates=None, workers=None, encoder=DEFAULT_POST_ENCODER, use_cache=True):
+    """Create every post variant in every requested format from one decoded photo.
+
+    Args:
+        photo (PropertyPhoto or bytes): Property photo - decode it with
+            photo_sizes=[social_photo_size(f) for f in formats] to build every
+            crop in one pass
+        street_address (str): First address line
+        city_state (str): Second address line
+        formats (list): Keys of SOCIAL_FORMATS
+        warn (callable): Receives a message for each post or overlay that failed
+        fonts (tuple): load_instagram_fonts() result for the feed format;
+            other formats load theirs (cached) at their banner's scale
+        templates (list): Post specs like INSTAGRAM_TEMPLATES
+        workers (int): Render threads; 1 renders the posts one after another
+        encoder (str): Key of POST_ENCODERS
+        use_cache (bool): Reuse and store posts in the render cache
+
+    Returns:
+        list: Post dicts (see _render_post), format by format in template order
+    """
+    if not PIL_AVAILABLE:
+        return []
+
+    created_files = []
+
+    try:
+        # Decode the photo once; load each format's fonts once for all its posts
+        photo = prepare_photo(photo)
+        format_fonts = {}
+        for social_format in formats:
+            scale = SOCIAL_FORMATS[social_format]['banner_height'] / TEMPLATE_BANNER_HEIGHT
+            format_fonts[social_format] = fonts if fonts and scale == 1.0 else load_instagram_fonts(scale)
+
+        jobs = [(social_format, spec) for social_format in formats for spec in templates or INSTAGRAM_TEMPLATES]
+        results = render_variants(
+            lambda job: _render_post(job[1], photo, street_address, city_state, format_fonts[job[0]], encoder, job[0],
+                                     use_cache),
+            jobs, workers)
+        for post, messages in results:
+            for message in messages:
+                warn(message)
+            if post:
+                created_files.append(post)
+
+    except Exception as e:
+        warn(f"Error creating social posts: {e}")
+
+    return created_files
+
+
+def create_instagram_posts(photo, street_address, city_state, warn=print_warning, fonts=None,
+                           templates=None, workers=None, encoder=DEFAULT_POST_ENCODER, use_cache=True):
+    """Create the New Listing, Under Contract and Sold posts from the templates.
+
+    Posts are rendered concurrently (see render_variants) and returned in
+    template order.
+
+    Args:
+        photo (PropertyPhoto or bytes): Property photo
+        street_address (str): First address line
+        city_state (str): Second address line
+        warn (callable): Receives a message for each post or overlay that failed
+        fonts (tuple): Result of load_instagram_fonts(), loaded here if omitted
+        templates (list): Post specs like INSTAGRAM_TEMPLATES - add entries
+            for more variants such as Open House or Price Improved
+        workers (int): Render threads; 1 renders the posts one after another
+        encoder (str): Key of POST_ENCODERS - 'jpeg' (default), 'png' or 'webp'
+        use_cache (bool): Reuse and store posts in the render cache
+
+    Returns:
+        list: {'name', 'data', 'type', 'format', 'mime', 'encode'} dicts
+              holding the encoded image; 'encode' is encode_image's report
+    """
+    return create_social_posts(photo, street_address, city_state, ('feed',), warn=warn, fonts=fonts,
+                               templates=templates, workers=workers, encoder=encoder, use_cache=use_cache)
+
+
+def extract_pdfs_from_zip(zip_source, warn=print_warning, max_size=None, budget=None, report=None):
+    """Extract the documents in a ZIP archive into spooled temp files.
+
+    PDFs are streamed out in chunks, JPGs are converted to PDF and nested
+    ZIPs are followed (see archive_ingest.ingest_archive, which also returns
+    the per-member report). Close the returned streams with
+    packet_engine.close_sources() once the packet is merged.
+
+    Args:
+        zip_source: ZIP file path or seekable binary file-like object
+            (an upload, or BytesIO of the archive's bytes)
+        warn (callable): Receives a message for the archive or each member
+            that could not be read
+        max_size (int): Bytes of each document kept in memory before spilling
+            to disk (default packet_engine.SPOOL_MAX_BYTES, HC_SPOOL_MAX_MB)
+        budget (resource_budget.Budget): The job's caps (default: a fresh Budget)
+        report (list): If given, extended with archive_ingest's per-member
+            entries (see archive_ingest.format_report)
+
+    Returns:
+        list: Packet sources {'name', 'stream', 'size'} in archive order
+    """
+    import archive_ingest
+
+    try:
+        sources, members = archive_ingest.ingest_archive(zip_source, max_size, budget=budget)
+    except Exception as e:
+        warn(f"Error extracting ZIP: {e}")
+        return []
+    if report is not None:
+        report.extend(members)
+    for entry in members:
+        if entry['status'] == 'failed':
+            warn(f"Could not extract {entry['name']}: {entry['error']}")
+    return sources
+
+
+def image_page_pixels(size, dpi=IMAGE_PDF_DPI):
+    """Largest (width, height) an image needs to fill its letter page at dpi -
+    never more than the image has"""
+    width, height = size
+    page_width, page_height = IMAGE_PAGE_INCHES if width <= height else IMAGE_PAGE_INCHES[::-1]
+    scale = min(1.0, page_width * dpi / width, page_height * dpi / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def convert_jpg_to_pdf(jpg_bytes, filename, warn=print_warning, budget=None, dpi=IMAGE_PDF_DPI):
+    """Convert JPG to a one-page PDF source dict.
+
+    The image is sized to fit a letter page at no more than dpi: JPEGs are
+    decoded at the smallest DCT scale that still covers that (Pillow's draft
+    mode), then resampled down to it, so a 24 MP camera photo never decodes
+    or embeds at full resolution. Images over the budget's pixel or memory
+    cap are decoded smaller still (JPEG) or refused (default: a fresh Budget);
+    the decoded image's memory is given back once the page is written.
+    """
+    if not PIL_AVAILABLE:
+        return None
+
+    budget = budget or Budget()
+    limit = None
+    try:
+        # Create PDF from JPG
+        img = Image.open(BytesIO(jpg_bytes))
+        full_size = img.size
+        limit = budget.image_scale(full_size, filename, reducible=img.format == 'JPEG')
+        target = image_page_pixels(img.size, dpi)
+        if img.format == 'JPEG':
+            if limit < 1 and limit <= target[0] / img.width:
+                # Over budget - decode at exactly the largest scale that fits
+                img.draft('RGB', (int(img.width * limit), int(img.height * limit)))
+            elif target[0] < img.width:
+                img.draft('RGB', target)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        if img.width > target[0]:
+            img = img.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+        # Page size is the image at this resolution - it just fits the letter page
+        page_width, page_height = IMAGE_PAGE_INCHES if img.width <= img.height else IMAGE_PAGE_INCHES[::-1]
+        resolution = max(img.width / page_width, img.height / page_height)
+        pdf_bytes = BytesIO()
+        img.save(pdf_bytes, format='PDF', resolution=resolution, quality=IMAGE_PDF_QUALITY)
+
+        return {
+            'name': filename.replace('.jpg', '.pdf').replace('.jpeg', '.pdf'),
+            'content': pdf_bytes.getvalue()
+        }
+    except Exception as e:
+        warn(f"Error converting JPG to PDF: {e}")
+        return None
+    finally:
+        if limit is not None:
+            budget.release_image(full_size, limit)
+
+
+def conversion_pool():
+    """Thread pool shared by every JPG conversion in this process, created on first use"""
+    global _conversion_pool
+    with _conversion_pool_lock:
+        if _conversion_pool is None:
+            _conversion_pool = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="jpg-convert")
+        return _conversion_pool
+
+
+def _convert_image(filename, data, budget, dpi, trace=None):
+    """convert_jpg_to_pdf for one queued image, raising instead of warning.
+    Timed as a 'jpg conversion' span in trace, when given, on the thread doing the work."""
+    with (trace.span('jpg conversion', detail=filename) if trace else nullcontext()) as span:
+        if isinstance(data, (str, os.PathLike)):
+            with open(data, 'rb') as f:
+                data = f.read()
+        if span:
+            span.bytes_in = len(data)
+        if not PIL_AVAILABLE:
+            raise ValueError("Pillow is required to convert JPGs")
+        problems = []
+        converted = convert_jpg_to_pdf(data, filename, warn=problems.append, budget=budget, dpi=dpi)
+        if not converted:
+            raise ValueError(problems[0] if problems else "could not convert image")
+        if span:
+            span.bytes_out = len(converted['content'])
+        return converted
+
+
+def convert_images(images, budget=None, dpi=IMAGE_PDF_DPI, workers=None, trace=None):
+    """Start converting JPGs to one-page PDFs, in parallel, for merging in the order given.
+
+    Decoding, resampling and JPEG encoding release the GIL, so the images
+    convert on every core of the shared conversion_pool(). The sources come
+    back straight away: packet_engine.open_source waits on each one when the
+    merge reaches it, so the first pages are copied while later images are
+    still converting.
+
+    Args:
+        images (list): (filename, JPG bytes or path) pairs, in packet order
+        budget (resource_budget.Budget): The job's caps (default: a fresh Budget)
+        dpi (int): Most pixels per inch on the letter page
+        workers (int): 1 converts here, one at a time, before returning
+            (the batch tool already runs listings in parallel)
+        trace (packet_trace.PacketTrace): Records each conversion's own time
+            as it finishes - the merge waiting on it is timed separately
+
+    Returns:
+        list: {'name', 'pending'} packet sources - 'pending' is a Future of
+              the converted {'name', 'content'} source. A failed conversion
+              is reported by the merge like any unreadable document.
+    """
+    budget = budget or Budget()
+    sources = []
+    for filename, data in images:
+        if workers == 1:
+            pending = Future()
+            try:
+                pending.set_result(_convert_image(filename, data, budget, dpi, trace))
+            except Exception as e:
+                pending.set_exception(e)
+        else:
+            pending = conversion_pool().submit(_convert_image, filename, data, budget, dpi, trace)
+        sources.append({'name': os.path.splitext(filename)[0] + '.pdf', 'pending': pending})
+    return sources
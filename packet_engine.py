@@ -0,0 +1,1105 @@
+#!/usr/bin/env python3
+"""
+Hall Collins Listing Packet Combiner - Packet Engine
+Disk-backed PDF merging shared by the web and desktop apps
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import struct
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from disk_cache import DEFAULT_CACHE_ROOT, DiskCache, hash_stream
+from resource_budget import Budget, BudgetExceeded
+from PyPDF2 import PdfReader
+from PyPDF2.generic import (
+    ArrayObject,
+    ByteStringObject,
+    DictionaryObject,
+    EncodedStreamObject,
+    IndirectObject,
+    NameObject,
+    NullObject,
+    NumberObject,
+    StreamObject,
+    TextStringObject,
+)
+
+# Uploaded files and ZIP members smaller than this stay in RAM, anything
+# bigger spills to disk (HC_SPOOL_MAX_MB to override)
+SPOOL_MAX_BYTES = int(os.environ.get('HC_SPOOL_MAX_MB', 8)) * 1024 * 1024
+# Read/write granularity when copying inputs and outputs
+COPY_CHUNK_BYTES = 1024 * 1024
+
+# Below this many documents a process pool costs more to start than it saves
+PARALLEL_MIN_DOCUMENTS = 4
+
+# Bump when normalize_document's output changes so old cache entries are ignored
+NORMALIZE_VERSION = 2
+# Size cap for the normalized document cache
+DOCUMENT_CACHE_MB = int(os.environ.get('HC_DOCUMENT_CACHE_MB', 512))
+_document_cache = None
+
+# Escalating strategies the size governor tries, in order, until a packet fits
+COMPRESSION_STEPS = [
+    ('streams', {}),
+    ('jpeg', {'quality': 70}),
+    ('downsample', {'quality': 70, 'max_edge': 1600}),
+]
+DEFAULT_TARGET_SIZE_MB = 20
+
+# Stream filters PyPDF2 can undo to get at the pixels or JPEG data
+LOSSLESS_FILTERS = ("/FlateDecode", "/ASCII85Decode", "/ASCIIHexDecode", "/LZWDecode", "/RunLengthDecode")
+
+# Image references that must stay lossless
+MASK_KEYS = ("/SMask", "/Mask")
+
+# Page keys that point back into the source document's structure
+SKIPPED_PAGE_KEYS = ("/Parent", "/StructParents", "/B")
+
+
+def new_spool(max_size=SPOOL_MAX_BYTES):
+    """Empty temp file kept in memory up to max_size bytes - 0 goes straight to
+    disk (see resource_budget.Budget.spool_size)"""
+    if not max_size:
+        return tempfile.TemporaryFile(mode='w+b')
+    return tempfile.SpooledTemporaryFile(max_size=max_size, mode='w+b')
+
+
+def spool_stream(source, max_size=SPOOL_MAX_BYTES):
+    """Copy a file-like object into a spooled temp file in fixed-size chunks.
+
+    Args:
+        source: Readable binary file-like object (e.g. a Streamlit upload)
+        max_size (int): Bytes kept in memory before spilling to disk
+
+    Returns:
+        SpooledTemporaryFile: Rewound copy of the source
+    """
+    spool = new_spool(max_size)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    shutil.copyfileobj(source, spool, COPY_CHUNK_BYTES)
+    spool.seek(0)
+    return spool
+
+
+class ZipMemberWindow(io.RawIOBase):
+    """Seekable, read-only view of a stored (uncompressed) ZIP member, read in
+    place from the archive file - nothing is copied or buffered beyond reads"""
+
+    def __init__(self, archive_path, offset, size):
+        super().__init__()
+        self._file = open(archive_path, 'rb')
+        self._offset = offset
+        self._size = size
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            pos += self._pos
+        elif whence == io.SEEK_END:
+            pos += self._size
+        if pos < 0:
+            raise ValueError("negative seek position")
+        self._pos = pos
+        return pos
+
+    def readinto(self, buffer):
+        count = min(len(buffer), self._size - self._pos)
+        if count <= 0:
+            return 0
+        self._file.seek(self._offset + self._pos)
+        data = self._file.read(count)
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+def _stored_data_offset(archive_path, info):
+    """Where a member's data starts: after its local header, name and extra field"""
+    with open(archive_path, 'rb') as f:
+        f.seek(info.header_offset)
+        header = struct.unpack(zipfile.structFileHeader, f.read(zipfile.sizeFileHeader))
+    if header[0] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+    name_length, extra_length = header[10], header[11]
+    return info.header_offset + zipfile.sizeFileHeader + name_length + extra_length
+
+
+def open_zip_member(archive_path, member, max_size=SPOOL_MAX_BYTES):
+    """Seekable stream of one ZIP member, for PdfReader, without extracting it to a folder.
+
+    Stored members are read in place from the archive (ZipMemberWindow).
+    Compressed members can't be seeked, so they are decompressed into a
+    spooled temp file - in memory up to max_size, on disk beyond it.
+
+    Returns:
+        Binary stream - the caller closes it
+    """
+    with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+        info = zip_ref.getinfo(member)
+        if info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1:
+            return io.BufferedReader(ZipMemberWindow(archive_path, _stored_data_offset(archive_path, info), info.file_size))
+        spool = new_spool(max_size)
+        try:
+            with zip_ref.open(info) as source:
+                shutil.copyfileobj(source, spool, COPY_CHUNK_BYTES)
+        except Exception:
+            spool.close()
+            raise
+        spool.seek(0)
+        return spool
+
+
+def new_temp_path(suffix='.pdf'):
+    """Reserve a temp file path for packet output (replaces tempfile.mktemp)"""
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="listing_packet_")
+    os.close(fd)
+    return path
+
+
+def open_source(pdf_file):
+    """Open a packet source for reading.
+
+    Sources are dicts with a 'name' plus one of 'stream' (file-like),
+    'path' (file on disk), 'zip' and 'member' (a member of the ZIP at that
+    path, opened with open_zip_member), 'pending' (a Future of another
+    source, e.g. a JPG still converting - waited on here) or 'content' (bytes).
+
+    Returns:
+        tuple: (binary stream, True if the caller should close it)
+    """
+    if pdf_file.get('stream') is not None:
+        pdf_file['stream'].seek(0)
+        return pdf_file['stream'], False
+    if pdf_file.get('path'):
+        return open(pdf_file['path'], 'rb'), True
+    if pdf_file.get('zip'):
+        return open_zip_member(pdf_file['zip'], pdf_file['member']), True
+    if pdf_file.get('pending') is not None:
+        # Still converting on another thread - the merge waits only once it
+        # reaches this document, copying the ones before it meanwhile
+        return open_source(pdf_file['pending'].result())
+    return BytesIO(pdf_file['content']), True
+
+
+def stream_size(stream):
+    """Size in bytes of a seekable stream, leaving it rewound"""
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def close_sources(pdf_files):
+    """Close any spooled streams held by a list of packet sources, and cancel
+    conversions that have not started"""
+    for pdf_file in pdf_files:
+        if pdf_file.get('pending') is not None:
+            pdf_file['pending'].cancel()
+        stream = pdf_file.get('stream')
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+
+class PacketWriter:
+    """Write a merged PDF to an open file handle one object at a time.
+
+    Objects reachable from each source page are renumbered and written as
+    soon as they are reached, so only the document currently being copied is
+    held in memory no matter how many documents the packet contains. Streams
+    identical to one already written (shared fonts, logos, letterhead) are
+    referenced instead of copied. The page tree, xref table and trailer are
+    written by close().
+
+    Each document's outline (bookmarks), named destinations and form fields
+    come along with its pages, as they do with PyPDF2's PdfMerger: form
+    fields are the widgets already copied with the pages, renumbered, and
+    the outline and destinations - a few entries per document - are held
+    until close() writes them after the last page.
+    """
+
+    CATALOG_ID = 1
+    PAGES_ID = 2
+
+    def __init__(self, output_file, image_transform=None):
+        self.output_file = output_file
+        self.image_transform = image_transform
+        self.position = 0
+        self.offsets = {}
+        self.next_id = 3
+        self.page_ids = []
+        self.stream_digests = {}
+        self.duplicate_streams = 0
+        self.bytes_saved = 0
+        self._streams_in_progress = set()
+        # Document-level structure, written by close()
+        self.outline = []
+        self.named_dests = {}
+        self.catalog_dests = DictionaryObject()
+        self.form_fields = ArrayObject()
+        self.form_resources = DictionaryObject()
+        self.form_options = DictionaryObject()
+        self._write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def append(self, stream, compress_streams=False, budget=None):
+        """Copy every page of one PDF into the packet.
+
+        Args:
+            stream: Seekable binary stream holding the source PDF
+            compress_streams (bool): Flate-compress page content while copying
+            budget (resource_budget.Budget): Charged the page count before
+                anything is copied; raises BudgetExceeded when over
+
+        Returns:
+            int: Number of pages added
+        """
+        reader = PdfReader(stream)
+        if reader.is_encrypted:
+            reader.decrypt("")
+
+        pages = list(reader.pages)
+        if not pages:
+            raise ValueError("PDF has no pages")
+        if budget is not None:
+            budget.charge_pages(len(pages))
+
+        # Reserve page numbers up front so links between pages resolve
+        self._streams_in_progress = set()
+        remap = {}
+        page_ids = []
+        for page in pages:
+            page_id = self._allocate()
+            page_ids.append(page_id)
+            if page.indirect_reference is not None:
+                remap[page.indirect_reference.idnum] = page_id
+
+        for page, page_id in zip(pages, page_ids):
+            if compress_streams:
+                page.compress_content_streams()
+            page_dict = DictionaryObject()
+            for key, value in page.items():
+                if key in SKIPPED_PAGE_KEYS:
+                    continue
+                page_dict[NameObject(key)] = self._translate(value, remap)
+            page_dict[NameObject("/Parent")] = IndirectObject(self.PAGES_ID, 0, None)
+            self._write_object(page_id, page_dict)
+
+        # Bookmarks, destinations and form fields point at the pages just
+        # written; a malformed one loses only that structure, not the pages
+        try:
+            structure = self._copy_structure(reader.trailer["/Root"].get_object(), remap)
+        except Exception as e:
+            print(f"DEBUG: Could not copy bookmarks or form fields: {e}")
+            structure = None
+
+        # Only publish the pages once the whole document copied cleanly
+        self.page_ids.extend(page_ids)
+        if structure:
+            self._publish_structure(*structure)
+        return len(page_ids)
+
+    def close(self):
+        """Write the page tree, catalog, xref table and trailer"""
+        pages_dict = DictionaryObject()
+        pages_dict[NameObject("/Type")] = NameObject("/Pages")
+        pages_dict[NameObject("/Kids")] = ArrayObject(
+            [IndirectObject(page_id, 0, None) for page_id in self.page_ids]
+        )
+        pages_dict[NameObject("/Count")] = NumberObject(len(self.page_ids))
+        self._write_object(self.PAGES_ID, pages_dict)
+
+        catalog = DictionaryObject()
+        catalog[NameObject("/Type")] = NameObject("/Catalog")
+        catalog[NameObject("/Pages")] = IndirectObject(self.PAGES_ID, 0, None)
+        if self.outline:
+            catalog[NameObject("/Outlines")] = IndirectObject(self._write_outline_root(), 0, None)
+        if self.named_dests:
+            pairs = ArrayObject()
+            for name in sorted(self.named_dests):
+                pairs.extend(self.named_dests[name])
+            dests = DictionaryObject({NameObject("/Names"): pairs})
+            catalog[NameObject("/Names")] = DictionaryObject({NameObject("/Dests"): dests})
+        if self.catalog_dests:
+            catalog[NameObject("/Dests")] = self.catalog_dests
+        if self.form_fields:
+            acroform = DictionaryObject(self.form_options)
+            acroform[NameObject("/Fields")] = self.form_fields
+            if self.form_resources:
+                acroform[NameObject("/DR")] = self.form_resources
+            catalog[NameObject("/AcroForm")] = acroform
+        self._write_object(self.CATALOG_ID, catalog)
+
+        # Numbers reserved by documents that failed part way become free entries
+        xref_offset = self.position
+        lines = [f"xref\n0 {self.next_id}\n", "0000000000 65535 f \n"]
+        for object_id in range(1, self.next_id):
+            offset = self.offsets.get(object_id)
+            if offset is None:
+                lines.append("0000000000 65535 f \n")
+            else:
+                lines.append(f"{offset:010d} 00000 n \n")
+        lines.append(
+            f"trailer\n<< /Size {self.next_id} /Root {self.CATALOG_ID} 0 R >>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n"
+        )
+        self._write("".join(lines).encode())
+
+    def _copy_structure(self, catalog, remap):
+        """Translate one document's outline, named destinations and form fields.
+
+        Returns:
+            tuple: (outline items, named destinations, catalog destinations,
+                    form dict) - nothing is published until the caller does
+        """
+        outlines = catalog.get("/Outlines")
+        outline = self._copy_outline_items(outlines.get_object().get("/First"), remap, set()) if outlines else []
+
+        named_dests = {}
+        names = catalog.get("/Names")
+        if names and names.get_object().get("/Dests"):
+            for key, dest in _name_tree_items(names.get_object()["/Dests"], set()):
+                translated = self._translate_dest(dest, remap)
+                if translated is not None:
+                    named_dests[str(key)] = (key, translated)
+        catalog_dests = {}
+        if catalog.get("/Dests"):
+            for key, dest in catalog["/Dests"].get_object().items():
+                translated = self._translate_dest(dest, remap)
+                if translated is not None:
+                    catalog_dests[key] = translated
+
+        form = None
+        acroform = catalog.get("/AcroForm")
+        if acroform:
+            acroform = acroform.get_object()
+            # Widgets reached from the pages are already in remap, so a field
+            # and its widgets resolve to the objects written with the pages
+            fields = ArrayObject(self._translate(field, remap) for field in acroform.get("/Fields", []))
+            resources = self._translate(acroform["/DR"], remap) if acroform.get("/DR") else None
+            options = DictionaryObject()
+            for key in ("/DA", "/Q", "/NeedAppearances"):
+                if key in acroform:
+                    options[NameObject(key)] = self._translate(acroform[key], remap)
+            form = (fields, resources, options)
+        return outline, named_dests, catalog_dests, form
+
+    def _publish_structure(self, outline, named_dests, catalog_dests, form):
+        """Add a copied document's structure to the packet - the first
+        document to use a destination or resource name keeps it"""
+        self.outline.extend(outline)
+        for name, pair in named_dests.items():
+            self.named_dests.setdefault(name, pair)
+        for key, dest in catalog_dests.items():
+            self.catalog_dests.setdefault(NameObject(key), dest)
+        if form:
+            fields, resources, options = form
+            self.form_fields.extend(fields)
+            if resources:
+                resources = resources.get_object()
+                for category, entries in resources.items():
+                    entries = entries.get_object()
+                    merged = self.form_resources.setdefault(NameObject(category), DictionaryObject())
+                    if isinstance(entries, DictionaryObject):
+                        for name, value in entries.items():
+                            merged.setdefault(NameObject(name), value)
+            for key, value in options.items():
+                self.form_options.setdefault(NameObject(key), value)
+
+    def _copy_outline_items(self, item_ref, remap, seen):
+        """One level of a document's outline as plain dicts, children included.
+        Items whose destination is not a page of this document keep their title."""
+        items = []
+        while isinstance(item_ref, IndirectObject) and item_ref.idnum not in seen:
+            seen.add(item_ref.idnum)
+            item = item_ref.get_object()
+            entry = {'title': self._translate(item.get("/Title", TextStringObject("")), remap),
+                     'dest': None, 'action': None, 'open': item.get("/Count", 0) > 0,
+                     'children': self._copy_outline_items(item.get("/First"), remap, seen)}
+            if "/Dest" in item:
+                entry['dest'] = self._translate_dest(item["/Dest"], remap)
+            elif "/A" in item:
+                action = item["/A"].get_object()
+                if action.get("/S") == "/GoTo":
+                    dest = self._translate_dest(action.get("/D"), remap)
+                    if dest is not None:
+                        entry['action'] = DictionaryObject({NameObject("/S"): NameObject("/GoTo"),
+                                                            NameObject("/D"): dest})
+                elif action.get("/S") == "/URI":
+                    entry['action'] = self._translate(action, remap)
+            for key in ("/C", "/F"):
+                if key in item:
+                    entry[key] = self._translate(item[key], remap)
+            items.append(entry)
+            item_ref = item.get("/Next")
+        return items
+
+    def _translate_dest(self, dest, remap):
+        """A destination pointing at this document's copied pages, a name to
+        look up among the named destinations, or None when it points elsewhere"""
+        if dest is None:
+            return None
+        dest = dest.get_object()
+        if isinstance(dest, DictionaryObject):
+            dest = dest.get("/D")
+            dest = dest.get_object() if dest is not None else None
+        if isinstance(dest, ArrayObject) and dest:
+            page = dest[0]
+            if not isinstance(page, IndirectObject) or page.idnum not in remap:
+                return None
+            return ArrayObject([IndirectObject(remap[page.idnum], 0, None)]
+                               + [self._translate(value, remap) for value in dest[1:]])
+        if isinstance(dest, (NameObject, TextStringObject, ByteStringObject)):
+            return dest
+        return None
+
+    def _write_outline_root(self):
+        """Write the outline dictionary and every item under it; returns its number"""
+        root_id = self._allocate()
+        first, last, visible = self._write_outline_items(self.outline, root_id)
+        root = DictionaryObject({
+            NameObject("/Type"): NameObject("/Outlines"),
+            NameObject("/First"): IndirectObject(first, 0, None),
+            NameObject("/Last"): IndirectObject(last, 0, None),
+            NameObject("/Count"): NumberObject(visible),
+        })
+        self._write_object(root_id, root)
+        return root_id
+
+    def _write_outline_items(self, items, parent_id):
+        """Write sibling outline items linked to each other and their parent.
+
+        Returns:
+            tuple: (first item number, last item number, items visible under
+                   the parent - open children count their own)
+        """
+        ids = [self._allocate() for _ in items]
+        visible = len(items)
+        for index, (item, item_id) in enumerate(zip(items, ids)):
+            entry = DictionaryObject({
+                NameObject("/Title"): item['title'],
+                NameObject("/Parent"): IndirectObject(parent_id, 0, None),
+            })
+            if index > 0:
+                entry[NameObject("/Prev")] = IndirectObject(ids[index - 1], 0, None)
+            if index < len(ids) - 1:
+                entry[NameObject("/Next")] = IndirectObject(ids[index + 1], 0, None)
+            if item['dest'] is not None:
+                entry[NameObject("/Dest")] = item['dest']
+            elif item['action'] is not None:
+                entry[NameObject("/A")] = item['action']
+            for key in ("/C", "/F"):
+                if key in item:
+                    entry[NameObject(key)] = item[key]
+            if item['children']:
+                first, last, descendants = self._write_outline_items(item['children'], item_id)
+                entry[NameObject("/First")] = IndirectObject(first, 0, None)
+                entry[NameObject("/Last")] = IndirectObject(last, 0, None)
+                entry[NameObject("/Count")] = NumberObject(descendants if item['open'] else -descendants)
+                if item['open']:
+                    visible += descendants
+            self._write_object(item_id, entry)
+        return ids[0], ids[-1], visible
+
+    def _allocate(self):
+        object_id = self.next_id
+        self.next_id += 1
+        return object_id
+
+    def _write(self, data):
+        self.output_file.write(data)
+        self.position += len(data)
+
+    def _translate(self, value, remap, key=None):
+        """Rewrite references in a value so they point at packet objects"""
+        if isinstance(value, IndirectObject):
+            return IndirectObject(self._copy_indirect(value, remap, key), 0, None)
+        if isinstance(value, StreamObject):
+            # Streams must be indirect (e.g. freshly compressed /Contents)
+            return IndirectObject(self._store_stream(value, remap, key), 0, None)
+        if isinstance(value, DictionaryObject):
+            if value.get("/Type") == "/Pages":
+                return NullObject()
+            translated = DictionaryObject()
+            for item_key, item in value.items():
+                translated[NameObject(item_key)] = self._translate(item, remap, item_key)
+            return translated
+        if isinstance(value, ArrayObject):
+            return ArrayObject([self._translate(item, remap) for item in value])
+        return value
+
+    def _copy_indirect(self, reference, remap, key=None):
+        if reference.idnum in remap:
+            return remap[reference.idnum]
+
+        obj = reference.get_object()
+        if isinstance(obj, StreamObject):
+            if reference.idnum in self._streams_in_progress:
+                # A stream's own dictionary leads back to it - give up on sharing it
+                object_id = self._allocate()
+                remap[reference.idnum] = object_id
+                return object_id
+            self._streams_in_progress.add(reference.idnum)
+            try:
+                object_id = self._store_stream(obj, remap, key, reference.idnum)
+            finally:
+                self._streams_in_progress.discard(reference.idnum)
+            remap[reference.idnum] = object_id
+            return object_id
+
+        # Reserve the number before recursing so reference cycles terminate
+        object_id = self._allocate()
+        remap[reference.idnum] = object_id
+        if obj is None:
+            self._write_object(object_id, NullObject())
+        else:
+            self._write_object(object_id, self._translate(obj, remap))
+        return object_id
+
+    def _store_stream(self, stream_obj, remap, key=None, source_idnum=None):
+        """Write a stream, or point at an identical one already in the packet.
+
+        Streams are keyed by a hash of their data plus their translated
+        dictionary, so the same font file or logo embedded by several
+        documents from one brokerage is written once and shared.
+
+        Returns:
+            int: Object number holding the stream
+        """
+        # Soft masks stay lossless - only colour images go through the transform
+        if (self.image_transform is not None and key not in MASK_KEYS
+                and stream_obj.get("/Subtype") == "/Image"):
+            stream_obj = self.image_transform(stream_obj) or stream_obj
+
+        data = stream_obj._data
+        if isinstance(data, str):
+            data = data.encode('latin-1')
+
+        stream_dict = DictionaryObject()
+        for item_key, item in stream_obj.items():
+            if item_key == "/Length":
+                continue
+            stream_dict[NameObject(item_key)] = self._translate(item, remap, item_key)
+        stream_dict[NameObject("/Length")] = NumberObject(len(data))
+
+        # Already numbered because something inside the stream referred back to it
+        object_id = remap.get(source_idnum) if source_idnum is not None else None
+        if object_id is None:
+            digest = hashlib.sha256()
+            for item_key, item in sorted(stream_dict.items()):
+                digest.update(item_key.encode())
+                item_buffer = BytesIO()
+                item.write_to_stream(item_buffer, None)
+                digest.update(item_buffer.getvalue())
+            digest.update(data)
+            digest = digest.digest()
+
+            existing_id = self.stream_digests.get(digest)
+            if existing_id is not None:
+                self.duplicate_streams += 1
+                self.bytes_saved += len(data)
+                return existing_id
+            object_id = self._allocate()
+            self.stream_digests[digest] = object_id
+
+        buffer = BytesIO()
+        buffer.write(f"{object_id} 0 obj\n".encode())
+        stream_dict.write_to_stream(buffer, None)
+        buffer.write(b"\nstream\n")
+        buffer.write(data)
+        buffer.write(b"\nendstream\nendobj\n")
+        self.offsets[object_id] = self.position
+        self._write(buffer.getvalue())
+        return object_id
+
+    def _write_object(self, object_id, obj):
+        buffer = BytesIO()
+        buffer.write(f"{object_id} 0 obj\n".encode())
+        obj.write_to_stream(buffer, None)
+        buffer.write(b"\nendobj\n")
+        self.offsets[object_id] = self.position
+        self._write(buffer.getvalue())
+
+
+def _name_tree_items(node, seen):
+    """(key, value) pairs of a PDF name tree, in tree order"""
+    if isinstance(node, IndirectObject):
+        if node.idnum in seen:
+            return
+        seen.add(node.idnum)
+    node = node.get_object()
+    names = node.get("/Names")
+    if names:
+        names = names.get_object()
+        for index in range(0, len(names) - 1, 2):
+            yield names[index], names[index + 1]
+    for kid in node.get("/Kids", []):
+        yield from _name_tree_items(kid, seen)
+
+
+def merge_to_file(pdf_files, output_path, compress_streams=False, image_transform=None, budget=None):
+    """Merge packet sources into a PDF on disk without buffering the packet.
+
+    Args:
+        pdf_files (list): Source dicts (see open_source), in packet order
+        output_path (str): Destination PDF path
+        compress_streams (bool): Flate-compress page content while copying
+        image_transform (callable): Optional hook that may return a smaller
+            replacement for each image XObject (see recompress_image)
+        budget (resource_budget.Budget): Page cap for the packet - documents
+            that would go over it are refused and listed in 'failed'
+
+    Returns:
+        dict: 'documents' and 'pages' merged, 'failed' as (name, error)
+              pairs, 'input_bytes' read, 'bytes_written', and the
+              'duplicate_streams' shared instead of written again along with
+              the 'dedup_bytes_saved'
+    """
+    summary = {'documents': 0, 'pages': 0, 'failed': [], 'input_bytes': 0, 'bytes_written': 0,
+               'duplicate_streams': 0, 'dedup_bytes_saved': 0}
+
+    with open(output_path, 'wb') as output_file:
+        writer = PacketWriter(output_file, image_transform)
+        for pdf_file in pdf_files:
+            name = pdf_file.get('name', 'document')
+            stream, should_close = None, False
+            try:
+                stream, should_close = open_source(pdf_file)
+                summary['input_bytes'] += stream_size(stream)
+                summary['pages'] += writer.append(stream, compress_streams, budget)
+                summary['documents'] += 1
+                print(f"DEBUG: Merged {name}")
+            except Exception as e:
+                print(f"DEBUG: Failed to merge {name}: {e}")
+                summary['failed'].append((name, e))
+            finally:
+                if should_close:
+                    stream.close()
+        writer.close()
+        summary['bytes_written'] = writer.position
+        summary['duplicate_streams'] = writer.duplicate_streams
+        summary['dedup_bytes_saved'] = writer.bytes_saved
+
+    return summary
+
+
+def _image_mode(stream_obj):
+    """PIL mode matching an image XObject's colour space, or None if unsupported"""
+    colorspace = stream_obj.get("/ColorSpace")
+    if isinstance(colorspace, IndirectObject):
+        colorspace = colorspace.get_object()
+    if colorspace == "/DeviceRGB":
+        return 'RGB'
+    if colorspace == "/DeviceGray":
+        return 'L'
+    if isinstance(colorspace, ArrayObject) and len(colorspace) == 2 and colorspace[0] == "/ICCBased":
+        components = colorspace[1].get_object().get("/N")
+        return {3: 'RGB', 1: 'L'}.get(components)
+    return None
+
+
+def recompress_image(stream_obj, quality, max_edge=None):
+    """Re-encode an image XObject as JPEG, optionally downsampling it.
+
+    Only 8-bit RGB/grayscale images stored as JPEG or Flate are touched;
+    masks, CMYK, indexed and exotic encodings are left alone.
+
+    Args:
+        stream_obj: Image XObject from a PdfReader
+        quality (int): JPEG quality
+        max_edge (int): Longest side in pixels, None keeps the resolution
+
+    Returns:
+        StreamObject: Smaller replacement, or None to keep the original
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    try:
+        if stream_obj.get("/ImageMask") or "/Decode" in stream_obj:
+            return None
+        if stream_obj.get("/BitsPerComponent", 8) != 8:
+            return None
+        mode = _image_mode(stream_obj)
+        if mode is None:
+            return None
+
+        filters = stream_obj.get("/Filter", [])
+        if not isinstance(filters, ArrayObject):
+            filters = [filters]
+        filters = list(filters)
+        original_data = stream_obj._data
+
+        # Text/Flate wrappers are undone by get_data(); DCT data comes back as JPEG
+        if filters and filters[-1] == "/DCTDecode" and all(f in LOSSLESS_FILTERS for f in filters[:-1]):
+            img = Image.open(BytesIO(stream_obj.get_data()))
+            if max_edge:
+                img.draft(mode, (max_edge, max_edge))
+            if img.mode != mode:
+                return None
+        elif all(f in LOSSLESS_FILTERS for f in filters):
+            size = (int(stream_obj["/Width"]), int(stream_obj["/Height"]))
+            pixels = stream_obj.get_data()
+            if len(pixels) != size[0] * size[1] * len(mode):
+                return None
+            img = Image.frombytes(mode, size, pixels)
+        else:
+            return None
+
+        if max_edge and max(img.size) > max_edge:
+            img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+        output = BytesIO()
+        img.save(output, format='JPEG', quality=quality, optimize=True)
+        jpeg_data = output.getvalue()
+        if len(jpeg_data) >= len(original_data):
+            return None
+
+        replacement = EncodedStreamObject()
+        for key, value in stream_obj.items():
+            if key not in ("/Filter", "/DecodeParms", "/Length"):
+                replacement[NameObject(key)] = value
+        replacement[NameObject("/Filter")] = NameObject("/DCTDecode")
+        replacement[NameObject("/Width")] = NumberObject(img.width)
+        replacement[NameObject("/Height")] = NumberObject(img.height)
+        replacement._data = jpeg_data
+        return replacement
+    except Exception as e:
+        print(f"DEBUG: Keeping original image: {e}")
+        return None
+
+
+def _run_compression_step(pdf_path, output_path, step, options):
+    """Rewrite pdf_path into output_path using one governor strategy"""
+    source = [{'name': os.path.basename(pdf_path), 'path': pdf_path}]
+    if step == 'streams':
+        summary = merge_to_file(source, output_path, compress_streams=True)
+    else:
+        quality = options.get('quality', 70)
+        max_edge = options.get('max_edge')
+        summary = merge_to_file(
+            source, output_path,
+            image_transform=lambda stream_obj: recompress_image(stream_obj, quality, max_edge),
+        )
+    if summary['failed']:
+        raise ValueError(summary['failed'][0][1])
+
+
+def compress_to_target(pdf_path, target_size_mb=DEFAULT_TARGET_SIZE_MB, streams_done=False,
+                       steps=COMPRESSION_STEPS):
+    """Shrink a PDF in place, escalating through steps until it fits a budget.
+
+    The first step (stream recompression) always runs, unless the caller
+    already compressed content streams while merging (streams_done). Each
+    later step only runs while the file is still over target_size_mb, and a
+    step's output only replaces the file when it is smaller.
+
+    Returns:
+        dict: 'original_bytes', 'final_bytes', 'target_bytes', 'met',
+              'stopped_at' (last step run) and 'steps' - one
+              {'step', 'seconds', 'bytes'} record per step run
+    """
+    target_bytes = int(target_size_mb * 1024 * 1024)
+    current_size = os.path.getsize(pdf_path)
+    report = {
+        'original_bytes': current_size,
+        'final_bytes': current_size,
+        'target_bytes': target_bytes,
+        'met': current_size <= target_bytes,
+        'stopped_at': None,
+        'steps': [],
+    }
+
+    candidate_path = new_temp_path('_governed.pdf')
+    try:
+        for index, (step, options) in enumerate(steps):
+            if index > 0 and current_size <= target_bytes:
+                break
+
+            start = time.perf_counter()
+            if not (step == 'streams' and streams_done):
+                try:
+                    _run_compression_step(pdf_path, candidate_path, step, options)
+                    candidate_size = os.path.getsize(candidate_path)
+                    if candidate_size < current_size:
+                        os.replace(candidate_path, pdf_path)
+                        current_size = candidate_size
+                except Exception as e:
+                    print(f"DEBUG: Compression step {step} failed: {e}")
+            seconds = time.perf_counter() - start
+
+            report['steps'].append({'step': step, 'seconds': seconds, 'bytes': current_size})
+            report['stopped_at'] = step
+            print(f"DEBUG: Compression step {step}: {current_size / (1024 * 1024):.1f} MB in {seconds:.2f}s")
+    finally:
+        if os.path.exists(candidate_path):
+            os.unlink(candidate_path)
+
+    report['final_bytes'] = current_size
+    report['met'] = current_size <= target_bytes
+    return report
+
+
+def format_compression_report(report):
+    """One-line summary of a compress_to_target report for the UIs"""
+    steps = ", ".join(f"{entry['step']} {entry['seconds']:.1f}s" for entry in report['steps'])
+    return (f"{report['final_bytes'] / (1024 * 1024):.1f} MB of a {report['target_bytes'] / (1024 * 1024):.3g} MB budget"
+            f" - stopped at '{report['stopped_at']}' ({steps})")
+
+
+def normalize_document(job):
+    """Parse, validate and compress one source PDF into its own file.
+
+    Runs inside a worker process, so it takes and returns plain picklable
+    values.
+
+    Args:
+        job (tuple): (name, source path - or (ZIP path, member name) for a
+            document still inside its archive - output path, compress_streams,
+            most pages the document may have - None for no cap)
+
+    Returns:
+        dict: 'name', normalized 'path', 'pages', 'input_bytes', 'error'
+              (None on success) and 'refused' - the capped resource when the
+              document was over budget
+    """
+    name, source_path, output_path, compress_streams, max_pages = job
+    result = {'name': name, 'path': None, 'pages': 0, 'input_bytes': 0, 'error': None, 'refused': None}
+    try:
+        if isinstance(source_path, tuple):
+            source = open_zip_member(*source_path)
+        else:
+            source = open(source_path, 'rb')
+        with source, open(output_path, 'wb') as output_file:
+            result['input_bytes'] = stream_size(source)
+            writer = PacketWriter(output_file)
+            # Only the page cap applies here - the parent counts the refusal (so
+            # this budget stays out of the process-wide stats, even in-process),
+            # and the final merge refuses documents once the packet's pages run out
+            budget = Budget(max_pages=max_pages, track_stats=False) if max_pages else None
+            result['pages'] = writer.append(source, compress_streams, budget)
+            writer.close()
+        result['path'] = output_path
+    except BudgetExceeded as e:
+        result['error'] = str(e)
+        result['refused'] = e.resource
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def _materialize_source(pdf_file, work_dir, index):
+    """Return a path on disk for a source, copying streams or bytes out first.
+    ZIP members stay in their archive - the worker opens them itself."""
+    if pdf_file.get('path'):
+        return pdf_file['path']
+    if pdf_file.get('zip'):
+        return (pdf_file['zip'], pdf_file['member'])
+
+    path = os.path.join(work_dir, f"source_{index:04d}.pdf")
+    stream, should_close = open_source(pdf_file)
+    try:
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(stream, f, COPY_CHUNK_BYTES)
+    finally:
+        if should_close:
+            stream.close()
+    return path
+
+
+def preprocess_documents(pdf_files, work_dir, compress_streams=True, max_workers=None, max_pages=None):
+    """Normalize source PDFs, across a pool of worker processes when worthwhile.
+
+    Args:
+        pdf_files (list): Source dicts (see open_source), in packet order
+        work_dir (str): Directory for materialized and normalized files
+        compress_streams (bool): Flate-compress page content
+        max_workers (int): Pool size, defaults to the CPU count
+        max_pages (int): Refuse any one document with more pages than this
+
+    Returns:
+        list: One normalize_document result per source, in the original order
+    """
+    jobs = []
+    for index, pdf_file in enumerate(pdf_files):
+        name = pdf_file.get('name', 'document')
+        output_path = os.path.join(work_dir, f"normalized_{index:04d}.pdf")
+        try:
+            source_path = _materialize_source(pdf_file, work_dir, index)
+        except Exception as e:
+            print(f"DEBUG: Could not stage {name}: {e}")
+            source_path = os.path.join(work_dir, f"missing_{index:04d}.pdf")
+        jobs.append((name, source_path, output_path, compress_streams, max_pages))
+
+    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1 and len(jobs) >= PARALLEL_MIN_DOCUMENTS:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(normalize_document, jobs))
+        except Exception as e:
+            print(f"DEBUG: Process pool unavailable ({e}), normalizing in-process")
+
+    return [normalize_document(job) for job in jobs]
+
+
+def document_cache():
+    """Process-wide cache of normalized source documents, created on first use"""
+    global _document_cache
+    if _document_cache is None:
+        _document_cache = DiskCache(
+            os.path.join(DEFAULT_CACHE_ROOT, 'documents'),
+            DOCUMENT_CACHE_MB * 1024 * 1024,
+            suffix='.pdf',
+        )
+    return _document_cache
+
+
+def _cache_key(pdf_file, compress_streams):
+    """Return (cache key, size in bytes) for a source's content and options"""
+    if pdf_file.get('zip'):
+        # Hash a ZIP member as it decompresses - hashing needs no seekable copy
+        with zipfile.ZipFile(pdf_file['zip'], 'r') as zip_ref:
+            info = zip_ref.getinfo(pdf_file['member'])
+            with zip_ref.open(info) as member:
+                key = DiskCache.make_key(hash_stream(member), NORMALIZE_VERSION, compress_streams)
+        return key, info.file_size
+
+    stream, should_close = open_source(pdf_file)
+    try:
+        size = stream_size(stream)
+        key = DiskCache.make_key(hash_stream(stream), NORMALIZE_VERSION, compress_streams)
+    finally:
+        if should_close:
+            stream.close()
+    return key, size
+
+
+def _converted_size(pdf_file):
+    """Bytes of a finished 'pending' source, 0 if its conversion failed"""
+    future = pdf_file['pending']
+    if future.cancelled() or future.exception() is not None:
+        return 0
+    stream, should_close = open_source(future.result())
+    try:
+        return stream_size(stream)
+    finally:
+        if should_close:
+            stream.close()
+
+
+def build_packet(pdf_files, output_path, compress_streams=True, max_workers=None, use_cache=True, budget=None):
+    """Build a packet from normalized documents, reusing cached ones.
+
+    Each source is looked up in the document cache by the SHA-256 of its
+    bytes plus the processing options; hits skip parsing and compression
+    entirely. Misses are parsed, validated and compressed (in a process
+    pool when there are enough of them) and stored for next time. The final
+    merge only stitches the normalized files together in the order given.
+    Sources with 'cache': False (e.g. a freshly rendered cover) are never
+    stored, and 'pending' ones (JPGs still converting) are merged as they
+    finish, never hashed or cached. Documents that would take the packet past the budget's page cap
+    are refused before they are copied (default: a fresh Budget).
+
+    Returns:
+        dict: Same shape as merge_to_file's summary, with 'input_bytes'
+              counting the original sources plus 'cache_hits' and
+              'cache_misses' for this packet
+    """
+    cache = None
+    if use_cache:
+        try:
+            cache = document_cache()
+        except OSError as e:
+            print(f"DEBUG: Document cache unavailable: {e}")
+
+    budget = budget or Budget()
+    workers = max_workers or os.cpu_count() or 1
+    if cache is None and (workers < 2 or len(pdf_files) < PARALLEL_MIN_DOCUMENTS):
+        summary = merge_to_file(pdf_files, output_path, compress_streams, budget=budget)
+        summary['cache_hits'] = summary['cache_misses'] = 0
+        return summary
+
+    work_dir = tempfile.mkdtemp(prefix="listing_packet_work_")
+    try:
+        normalized = [None] * len(pdf_files)
+        failed = []
+        input_bytes = 0
+        cache_hits = 0
+        pending = []
+
+        for index, pdf_file in enumerate(pdf_files):
+            if pdf_file.get('pending') is not None:
+                # Still converting: it goes to the final merge untouched - not
+                # hashed, normalized or cached - which waits for it only in its turn
+                normalized[index] = pdf_file
+                continue
+            cache_key = None
+            if cache is not None and pdf_file.get('cache', True):
+                try:
+                    cache_key, size = _cache_key(pdf_file, compress_streams)
+                except Exception as e:
+                    failed.append((pdf_file.get('name', 'document'), e))
+                    continue
+                cached_path = cache.get(cache_key)
+                if cached_path:
+                    print(f"DEBUG: Cache hit for {pdf_file.get('name', 'document')}")
+                    normalized[index] = {'name': pdf_file.get('name', 'document'), 'path': cached_path}
+                    input_bytes += size
+                    cache_hits += 1
+                    continue
+            pending.append((index, cache_key, pdf_file))
+
+        results = preprocess_documents([pdf_file for _, _, pdf_file in pending],
+                                       work_dir, compress_streams, workers, budget.pages_left())
+        for (index, cache_key, _), result in zip(pending, results):
+            input_bytes += result['input_bytes']
+            if result['refused']:
+                budget.refused(result['refused'])
+            if result['error']:
+                print(f"DEBUG: Failed to normalize {result['name']}: {result['error']}")
+                failed.append((result['name'], result['error']))
+                continue
+            normalized[index] = {'name': result['name'], 'path': result['path']}
+            if cache_key:
+                try:
+                    cache.put_file(cache_key, result['path'], evict=False)
+                except OSError as e:
+                    print(f"DEBUG: Could not cache {result['name']}: {e}")
+
+        summary = merge_to_file([doc for doc in normalized if doc], output_path, budget=budget)
+        summary['failed'] = failed + summary['failed']
+        summary['input_bytes'] = input_bytes + sum(_converted_size(doc) for doc in normalized
+                                                   if doc and doc.get('pending') is not None)
+        summary['cache_hits'] = cache_hits
+        summary['cache_misses'] = sum(1 for _, cache_key, _ in pending if cache_key)
+        return summary
+    finally:
+        if cache is not None:
+            cache.evict()
+        shutil.rmtree(work_dir, ignore_errors=True)
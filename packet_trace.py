@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Hall Collins Listing Packet Combiner - Packet Trace
+Timing, byte counts and memory for each stage of building a packet
+"""
+
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# How often the memory sampler looks at the process's resident size
+SAMPLE_INTERVAL_SECONDS = 0.01
+
+# Set to a folder to have both apps write every trace there as JSON
+TRACE_DIR = os.environ.get('HC_TRACE_DIR')
+
+
+def current_rss_bytes():
+    """Resident memory of this process right now (high-water mark where unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is bytes on macOS and kilobytes on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Span:
+    """One timed stage. Set bytes_out (and bytes_in if unknown up front) inside the block."""
+
+    def __init__(self, name, bytes_in=0, detail=""):
+        self.name = name
+        self.bytes_in = bytes_in
+        self.bytes_out = 0
+        self.detail = detail
+        self.seconds = 0.0
+        self.peak_rss_bytes = 0
+        self.error = None
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'detail': self.detail,
+            'seconds': round(self.seconds, 4),
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'peak_rss_mb': round(self.peak_rss_bytes / (1024 * 1024), 1),
+            'error': self.error,
+        }
+
+
+class PacketTrace:
+    """Spans recorded while one packet (or set of posts) is built. Spans may
+    be opened on worker threads (JPG conversions) - they are appended as they close.
+
+    A background thread samples resident memory while any span is open, so
+    each span's peak covers its own work rather than the process lifetime.
+    Memory used inside worker processes is not included.
+    """
+
+    def __init__(self, label=""):
+        self.label = label
+        self.spans = []
+        self.started = time.time()
+        self._open = []
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    @contextmanager
+    def span(self, name, bytes_in=0, detail=""):
+        """Time a stage: ``with trace.span('merge', bytes_in=n) as span: ...``"""
+        span = Span(name, bytes_in, detail)
+        span.peak_rss_bytes = current_rss_bytes()
+        with self._lock:
+            self._open.append(span)
+            self._start_sampler()
+        start = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span.error = str(e)
+            raise
+        finally:
+            span.seconds = time.perf_counter() - start
+            span.peak_rss_bytes = max(span.peak_rss_bytes, current_rss_bytes())
+            with self._lock:
+                self._open.remove(span)
+                self.spans.append(span)
+
+    def _start_sampler(self):
+        if self._sampler is not None and self._sampler.is_alive():
+            return
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+
+    def _sample(self):
+        while True:
+            with self._lock:
+                if not self._open:
+                    self._sampler = None
+                    return
+                rss = current_rss_bytes()
+                for span in self._open:
+                    span.peak_rss_bytes = max(span.peak_rss_bytes, rss)
+            time.sleep(SAMPLE_INTERVAL_SECONDS)
+
+    def total_seconds(self):
+        return sum(span.seconds for span in self.spans)
+
+    def to_dict(self):
+        return {
+            'label': self.label,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'total_seconds': round(self.total_seconds(), 4),
+            'spans': [span.to_dict() for span in self.spans],
+        }
+
+    def rows(self):
+        """Display rows for the timing tables in both apps"""
+        return [{
+            'Stage': span.name + (f" ({span.detail})" if span.detail else ""),
+            'Time (s)': f"{span.seconds:.2f}",
+            'In (MB)': f"{span.bytes_in / (1024 * 1024):.2f}",
+            'Out (MB)': f"{span.bytes_out / (1024 * 1024):.2f}",
+            'Peak memory (MB)': f"{span.peak_rss_bytes / (1024 * 1024):.0f}",
+        } for span in self.spans]
+
+    def format_table(self):
+        """Plain-text timing table for logs and the desktop app"""
+        lines = [f"{'Stage':<34}{'Time':>8}{'In MB':>9}{'Out MB':>9}{'Peak MB':>9}"]
+        for span in self.spans:
+            name = span.name + (f" ({span.detail})" if span.detail else "")
+            if len(name) > 33:
+                name = name[:30] + "..."
+            lines.append(f"{name:<34}{span.seconds:>7.2f}s{span.bytes_in / (1024 * 1024):>9.2f}"
+                         f"{span.bytes_out / (1024 * 1024):>9.2f}{span.peak_rss_bytes / (1024 * 1024):>9.0f}")
+        lines.append(f"{'Total':<34}{self.total_seconds():>7.2f}s")
+        return "\n".join(lines)
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def write_json(self, path):
+        """Write the trace to a JSON file and return its path"""
+        with open(path, 'w') as f:
+            f.write(self.to_json())
+        return path
+
+    def save_to_trace_dir(self):
+        """Write the trace into HC_TRACE_DIR when it is set; returns the path or None"""
+        if not TRACE_DIR:
+            return None
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        safe_label = "".join(ch for ch in self.label if ch.isalnum() or ch in (' ', '-', '_')).strip() or "packet"
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))
+        return self.write_json(os.path.join(TRACE_DIR, f"{stamp} {safe_label}.json"))
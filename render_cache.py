@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Hall Collins Listing Packet Combiner - Render Cache
+Finished cover pages and social posts on disk, keyed by everything that
+decides how they look, so creating the same listing again costs a file copy
+"""
+
+import hashlib
+import os
+
+import template_assets
+from disk_cache import DEFAULT_CACHE_ROOT, DiskCache
+
+# Size cap for rendered covers and posts
+RENDER_CACHE_MB = int(os.environ.get('HC_RENDER_CACHE_MB', 256))
+_render_cache = None
+
+
+def render_cache():
+    """Process-wide cache of rendered covers and posts, created on first use"""
+    global _render_cache
+    if _render_cache is None:
+        _render_cache = DiskCache(
+            os.path.join(DEFAULT_CACHE_ROOT, 'renders'),
+            RENDER_CACHE_MB * 1024 * 1024,
+            suffix='.bin',
+        )
+    return _render_cache
+
+
+def photo_digest(photo_bytes):
+    """SHA-256 of the property photo's bytes"""
+    return hashlib.sha256(photo_bytes).hexdigest() if photo_bytes else "no photo"
+
+
+def normalize_text(text):
+    """Address text exactly as it is drawn - uppercased, spacing untouched, so
+    two addresses share a render only when they would look the same"""
+    return (text or "").upper()
+
+
+def file_identity(path):
+    """Name and content hash of a template, logo or font file"""
+    if not path or not os.path.exists(path):
+        return f"{path}=missing"
+    return f"{os.path.basename(path)}={template_assets.fingerprint(path)}"
+
+
+def font_identity(font):
+    """Which face at which size a Pillow font draws with"""
+    path = getattr(font, 'path', None)
+    if isinstance(path, str):
+        return f"{file_identity(path)}@{getattr(font, 'size', '')}"
+    # Pillow's built-in default font
+    return f"default {type(font).__name__}@{getattr(font, 'size', '')}"
+
+
+def make_key(kind, version, photo_hash, texts, files, fonts, options):
+    """Cache key for one rendered output.
+
+    Args:
+        kind (str): What is rendered ('cover', 'post')
+        version (int): That renderer's version - bump it when its output
+            changes and only that renderer's entries stop matching
+        photo_hash (str): photo_digest of the property photo
+        texts (list): Address lines, uppercased here as the renderers draw them
+        files (list): Template and overlay paths, identified by content
+        fonts (list): Font identities (font_identity or a built-in font name)
+        options (list): Anything else that changes the output (sizes, encoder)
+    """
+    return DiskCache.make_key(
+        kind, version, photo_hash,
+        *[normalize_text(text) for text in texts],
+        *[file_identity(path) for path in files],
+        *fonts,
+        *[repr(option) for option in options],
+    )
+
+
+def get_bytes(key):
+    """Cached bytes for a key, or None on a miss or if the cache is unavailable"""
+    try:
+        path = render_cache().get(key)
+        if path:
+            with open(path, 'rb') as f:
+                return f.read()
+    except OSError as e:
+        print(f"DEBUG: Render cache unavailable: {e}")
+    return None
+
+
+def put_bytes(key, data):
+    try:
+        render_cache().put_bytes(key, data)
+    except OSError as e:
+        print(f"DEBUG: Could not store render: {e}")
+
+
+def get_file(key, output_path):
+    """Copy a cached render to output_path; returns True on a hit"""
+    data = get_bytes(key)
+    if data is None:
+        return False
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    return True
+
+
+def put_file(key, path):
+    try:
+        render_cache().put_file(key, path)
+    except OSError as e:
+        print(f"DEBUG: Could not store render: {e}")
+
+
+def stats():
+    """Hit/miss/eviction counts for this process plus current disk usage"""
+    return render_cache().stats()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Hall Collins Listing Packet Combiner - Resource Budget
+Caps on how much work one job (a packet, an upload, a batch row) may do, so
+one oversized input can't exhaust a shared server: inputs over a cap are
+refused or downscaled before the expensive work starts, and every event is
+counted per process
+"""
+
+import os
+import threading
+
+MB = 1024 * 1024
+
+# Per-job caps - set any of them to 0 to turn that cap off
+MAX_DECOMPRESSED_MB = int(os.environ.get('HC_MAX_DECOMPRESSED_MB', 1024))
+MAX_PAGES = int(os.environ.get('HC_MAX_PAGES', 2000))
+MAX_IMAGE_MP = int(os.environ.get('HC_MAX_IMAGE_MP', 50))
+JOB_MEMORY_MB = int(os.environ.get('HC_JOB_MEMORY_MB', 512))
+
+# Bytes per pixel of a decoded RGB image
+RGB_BYTES = 3
+
+# Reduced scales a JPEG can be decoded at (DCT scaling in Pillow's draft mode)
+JPEG_SCALES = (1.0, 1 / 2, 1 / 4, 1 / 8)
+
+_lock = threading.Lock()
+_stats = {
+    'decompressed_refused': 0, 'pages_refused': 0, 'images_refused': 0,
+    'images_downscaled': 0, 'memory_spilled': 0,
+    # Largest single job or image seen, for sizing the server
+    'peak_decompressed_bytes': 0, 'peak_pages': 0, 'peak_image_pixels': 0, 'peak_memory_bytes': 0,
+}
+
+
+class BudgetExceeded(ValueError):
+    """An input was refused because it would take its job over a cap.
+
+    resource is 'decompressed', 'pages' or 'images'.
+    """
+
+    def __init__(self, resource, message):
+        super().__init__(message)
+        self.resource = resource
+
+
+def _count(event):
+    with _lock:
+        _stats[event] += 1
+
+
+def _peak(key, value):
+    with _lock:
+        _stats[key] = max(_stats[key], value)
+
+
+class Budget:
+    """Caps for one job and what it has used so far. Thread-safe.
+
+    Memory is the job's estimate of what it holds in RAM - decoded images
+    and documents spooled in memory - summed without release (except images
+    decoded only to convert them, see release_image), so it is an upper
+    bound on the job's peak rather than a measurement. Downscaled
+    images and documents spilled to disk are described in notes.
+    """
+
+    def __init__(self, max_decompressed_bytes=MAX_DECOMPRESSED_MB * MB, max_pages=MAX_PAGES,
+                 max_image_pixels=MAX_IMAGE_MP * 1000 * 1000, max_memory_bytes=JOB_MEMORY_MB * MB,
+                 track_stats=True):
+        self.max_decompressed_bytes = max_decompressed_bytes
+        self.max_pages = max_pages
+        self.max_image_pixels = max_image_pixels
+        self.max_memory_bytes = max_memory_bytes
+        self.decompressed_bytes = 0
+        self.pages = 0
+        self.memory_bytes = 0
+        self.notes = []
+        # False for a stand-in budget (a worker's page cap) whose parent job
+        # counts the refusal itself with refused()
+        self.track_stats = track_stats
+        self._lock = threading.Lock()
+
+    def _count(self, event):
+        if self.track_stats:
+            _count(event)
+
+    def _peak(self, key, value):
+        if self.track_stats:
+            _peak(key, value)
+
+    def charge_decompressed(self, nbytes, name):
+        """Count nbytes about to be decompressed from an archive, or refuse them"""
+        with self._lock:
+            if self.max_decompressed_bytes and self.decompressed_bytes + nbytes > self.max_decompressed_bytes:
+                self._count('decompressed_refused')
+                raise BudgetExceeded('decompressed', f"{name} would take this job past "
+                                     f"{self.max_decompressed_bytes / MB:.0f} MB decompressed")
+            self.decompressed_bytes += nbytes
+            self._peak('peak_decompressed_bytes', self.decompressed_bytes)
+
+    def release_decompressed(self, nbytes):
+        """Give back a charge for bytes whose contents are charged again on
+        their own - a nested archive, before its members are walked"""
+        with self._lock:
+            self.decompressed_bytes = max(self.decompressed_bytes - nbytes, 0)
+
+    def pages_left(self):
+        """Pages the job may still add, or None when pages are not capped"""
+        with self._lock:
+            return max(self.max_pages - self.pages, 0) if self.max_pages else None
+
+    def charge_pages(self, count):
+        """Count a document's pages before they are copied, or refuse the document"""
+        with self._lock:
+            if self.max_pages and self.pages + count > self.max_pages:
+                self._count('pages_refused')
+                raise BudgetExceeded('pages', f"{count} pages would take this job past {self.max_pages} pages")
+            self.pages += count
+            self._peak('peak_pages', self.pages)
+
+    def refused(self, resource):
+        """Count a refusal made elsewhere against this job's caps (by a worker's
+        track_stats=False budget, in or out of this process)"""
+        _count(f"{resource}_refused")
+
+    def image_scale(self, size, name, reducible=True):
+        """Largest decode scale that keeps an image within the pixel cap and the
+        memory left, charging the decoded size against the memory budget.
+
+        Args:
+            size (tuple): Full (width, height) from the image header
+            name (str): Image name for messages
+            reducible (bool): Whether it can be decoded at a reduced scale
+                (JPEGs can) - otherwise it is refused when over
+
+        Returns:
+            float: One of JPEG_SCALES - 1.0 means decode at full size
+        """
+        width, height = size
+        self._peak('peak_image_pixels', width * height)
+        with self._lock:
+            allowed = self.max_image_pixels or float('inf')
+            if self.max_memory_bytes:
+                allowed = min(allowed, (self.max_memory_bytes - self.memory_bytes) / RGB_BYTES)
+            scales = JPEG_SCALES if reducible else JPEG_SCALES[:1]
+            scale = next((scale for scale in scales if width * scale * height * scale <= allowed), None)
+            if scale is None:
+                self._count('images_refused')
+                raise BudgetExceeded('images', f"{name} is {width}x{height} ({width * height / 1e6:.0f} MP), "
+                                     f"too large to decode within this job's image and memory budget")
+            self.memory_bytes += int(width * scale) * int(height * scale) * RGB_BYTES
+            self._peak('peak_memory_bytes', self.memory_bytes)
+            if scale < 1:
+                self._count('images_downscaled')
+                self.notes.append(f"{name} ({width}x{height}) decoded at 1/{round(1 / scale)} size to stay within budget")
+            return scale
+
+    def release_image(self, size, scale):
+        """Give back what image_scale charged once the decoded image is freed"""
+        width, height = size
+        with self._lock:
+            self.memory_bytes = max(self.memory_bytes - int(width * scale) * int(height * scale) * RGB_BYTES, 0)
+
+    def spool_size(self, nbytes, max_size):
+        """In-memory limit for spooling a document of nbytes: max_size while the
+        job's memory budget allows, else 0 - straight to disk"""
+        if nbytes > max_size:
+            return max_size
+        with self._lock:
+            if self.max_memory_bytes and self.memory_bytes + nbytes > self.max_memory_bytes:
+                self._count('memory_spilled')
+                return 0
+            self.memory_bytes += nbytes
+            self._peak('peak_memory_bytes', self.memory_bytes)
+            return max_size
+
+    def usage(self):
+        """What this job used, for reports"""
+        with self._lock:
+            return {'decompressed_bytes': self.decompressed_bytes, 'pages': self.pages,
+                    'memory_bytes': self.memory_bytes, 'notes': list(self.notes)}
+
+
+def stats():
+    """Refusal, downscale and spill counts for this process, plus the largest job seen"""
+    with _lock:
+        return dict(_stats)
+
+
+def format_stats(counts=None):
+    """One line for the web sidebar and desktop log"""
+    counts = counts or stats()
+    refused = counts['decompressed_refused'] + counts['pages_refused'] + counts['images_refused']
+    return (f"{refused} refused • {counts['images_downscaled']} downscaled • {counts['memory_spilled']} spilled to disk • "
+            f"largest job {counts['peak_decompressed_bytes'] / MB:.0f} MB unzipped, {counts['peak_pages']} pages, "
+            f"{counts['peak_image_pixels'] / 1e6:.0f} MP image, ~{counts['peak_memory_bytes'] / MB:.0f} MB in memory")
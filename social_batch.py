@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Hall Collins Listing Packet Combiner - Social Batch Renderer
+Renders every post variant (New Listing, Under Contract, Sold) in several
+social formats for many listings at once, without opening either app
+
+Formats (see listing_render.SOCIAL_FORMATS):
+    feed       Instagram feed post, 1080x1350 (4:5)
+    story      Instagram story, 1080x1920 (9:16)
+    square     Instagram square post, 1080x1080 (1:1)
+    facebook   Facebook link image, 1200x630
+
+Takes the same CSV or JSON manifest as batch_packets.py; only 'address'
+(or 'street' and 'city_state') and 'photo' are used. Each photo is decoded
+once for every format, and each worker process loads fonts and templates
+once for all the listings it renders.
+
+Usage:
+    python social_batch.py listings.csv --formats feed,story,square,facebook --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import listing_render
+from batch_packets import _safe_name, load_manifest
+
+
+def render_listing(listing, output_dir, formats, encoder=listing_render.DEFAULT_POST_ENCODER):
+    """Render one listing's posts in every format. Runs in a worker process.
+
+    Returns:
+        dict: 'row', 'street', 'files' written, 'encode' summary, 'seconds',
+              'warnings' and 'error' (None on success)
+    """
+    start = time.perf_counter()
+    warnings = []
+    result = {'row': listing['row'], 'street': listing['street'], 'files': [], 'encode': "",
+              'warnings': warnings, 'error': None}
+    try:
+        if not listing['photo'] or not os.path.exists(listing['photo']):
+            raise ValueError(f"Photo not found: {listing['photo'] or 'none given'}")
+        if not listing['street']:
+            raise ValueError("No address given")
+
+        listing_dir = os.path.join(output_dir, _safe_name(listing['street']))
+        os.makedirs(listing_dir, exist_ok=True)
+
+        # One decode builds the photo crop for every format
+        with open(listing['photo'], 'rb') as f:
+            photo = listing_render.PropertyPhoto(
+                f.read(), photo_sizes=[listing_render.social_photo_size(name) for name in formats])
+
+        # Listings already run in parallel - keep each listing's posts in this process
+        posts = listing_render.create_social_posts(photo, listing['street'], listing['city_state'], formats,
+                                                   warn=warnings.append, workers=1, encoder=encoder)
+        for post in posts:
+            stem, extension = os.path.splitext(post['name'])
+            post_path = os.path.join(listing_dir, _safe_name(stem) + extension)
+            with open(post_path, 'wb') as f:
+                f.write(post['data'])
+            result['files'].append(post_path)
+        result['encode'] = listing_render.format_encode_report(posts)
+
+        if not posts:
+            result['error'] = "No posts were created - check the templates and photo for this row"
+
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_social_batch(listings, output_dir, formats, encoder=listing_render.DEFAULT_POST_ENCODER, workers=None):
+    """Render every listing across a process pool, reporting each as it finishes.
+
+    Returns:
+        list: render_listing results in manifest order
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    results = []
+    if workers == 1 or len(listings) == 1:
+        for listing in listings:
+            results.append(render_listing(listing, output_dir, formats, encoder))
+            print_result(results[-1])
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(listings))) as pool:
+            futures = [pool.submit(render_listing, listing, output_dir, formats, encoder) for listing in listings]
+            for future in as_completed(futures):
+                results.append(future.result())
+                print_result(results[-1])
+    return sorted(results, key=lambda result: result['row'])
+
+
+def print_result(result):
+    label = f"Row {result['row']} ({result['street'] or 'no address'})"
+    if result['error']:
+        print(f"FAILED  {label}: {result['error']}")
+    else:
+        print(f"OK      {label}: {result['encode']} in {result['seconds']:.1f}s")
+    for warning in result['warnings']:
+        print(f"        Warning: {warning}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render social posts in several formats for every row of a manifest")
+    parser.add_argument('manifest', help="CSV or JSON file with one listing per row")
+    parser.add_argument('--output-dir', default='social', help="folder for the finished posts (default: social)")
+    parser.add_argument('--formats', default=','.join(listing_render.SOCIAL_FORMATS),
+                        help=f"comma-separated formats (default: all - {', '.join(listing_render.SOCIAL_FORMATS)})")
+    parser.add_argument('--post-format', choices=sorted(listing_render.POST_ENCODERS),
+                        default=listing_render.DEFAULT_POST_ENCODER,
+                        help=f"image format (default: {listing_render.DEFAULT_POST_ENCODER})")
+    parser.add_argument('--workers', type=int, default=None, help="listings rendered in parallel (default: one per CPU)")
+    parser.add_argument('--report', help="also write the per-listing results to this JSON file")
+    args = parser.parse_args(argv)
+
+    formats = [name.strip() for name in args.formats.split(',') if name.strip()]
+    unknown = [name for name in formats if name not in listing_render.SOCIAL_FORMATS]
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(unknown)}")
+
+    listings = load_manifest(args.manifest)
+    if not listings:
+        print("No listings found in manifest")
+        return 1
+
+    start = time.perf_counter()
+    results = run_social_batch(listings, os.path.abspath(args.output_dir), formats, args.post_format, args.workers)
+    failed = sum(1 for result in results if result['error'])
+    posts = sum(len(result['files']) for result in results)
+    print(f"Rendered {posts} posts for {len(results) - failed} of {len(results)} listings "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
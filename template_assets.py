@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Hall Collins Listing Packet Combiner - Template Assets
+Decoded, pre-scaled template and overlay images kept in memory, so repeat
+renders in a long-running server or batch run do no template I/O or resampling
+"""
+
+import os
+import threading
+
+from disk_cache import hash_file
+
+_lock = threading.RLock()
+_fingerprints = {}
+_entries = {}
+_stats = {'hits': 0, 'misses': 0, 'reloads': 0}
+
+
+def fingerprint(path):
+    """SHA-256 of a template file, re-hashed only when its mtime or size changes"""
+    stat = os.stat(path)
+    with _lock:
+        known = _fingerprints.get(path)
+        if known and known[:2] == (stat.st_mtime_ns, stat.st_size):
+            return known[2]
+        digest = hash_file(path)
+        _fingerprints[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+
+def cached(kind, path, options, build):
+    """Value for (kind, path, options), rebuilt only when the file's contents change.
+
+    build(path) makes the value; other modules use this for assets derived
+    from a template file (the precompiled cover layers).
+    """
+    path = os.path.abspath(path)
+    digest = fingerprint(path)
+    key = (kind, path, options)
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry[0] == digest:
+            _stats['hits'] += 1
+            return entry[1]
+        _stats['reloads' if entry else 'misses'] += 1
+        value = build(path)
+        _entries[key] = (digest, value)
+        return value
+
+
+def template_image(path, size):
+    """RGBA template resized to size (width, height) with LANCZOS.
+
+    The same Image object is returned to every caller - paste from it or
+    copy() it, never draw on it.
+    """
+    def build(path):
+        from PIL import Image
+
+        with Image.open(path) as img:
+            img = img.convert('RGBA')
+        if img.size != tuple(size):
+            img = img.resize(tuple(size), Image.Resampling.LANCZOS)
+        return img
+
+    return cached('template', path, tuple(size), build)
+
+
+def template_region(path, size, box, scale=1.0):
+    """Part of a template scaled to size - box is (left, top, right, bottom) in
+    those coordinates - resized uniformly by scale. Shared like template_image.
+    """
+    def build(path):
+        from PIL import Image
+
+        region = template_image(path, size).crop(tuple(box))
+        if scale != 1.0:
+            region = region.resize((round(region.width * scale), round(region.height * scale)), Image.Resampling.LANCZOS)
+        return region
+
+    return cached('region', path, (tuple(size), tuple(box), scale), build)
+
+
+def image_size(path):
+    """(width, height) of an image file in pixels, read from its header once"""
+    def build(path):
+        from PIL import Image
+
+        with Image.open(path) as img:
+            return img.size
+
+    return cached('size', path, None, build)
+
+
+def overlay_reader(path, width_inches, dpi):
+    """ReportLab ImageReader of an overlay scaled to dpi at its drawn width.
+
+    Overlays larger than the page needs (the 8334 px logo) are downscaled once
+    and their pixel data and alpha mask are prepared up front, so drawing the
+    cached reader onto each new canvas skips decoding and resampling.
+    """
+    def build(path):
+        from PIL import Image
+        from reportlab.lib.utils import ImageReader
+
+        with Image.open(path) as img:
+            img = img.convert('RGBA')
+        target_width = int(width_inches * dpi)
+        if img.width > target_width:
+            img = img.resize((target_width, round(img.height * target_width / img.width)), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        reader = ImageReader(img)
+        reader.getRGBData()
+        return reader
+
+    return cached('overlay', path, (width_inches, dpi), build)
+
+
+def page_reader(path):
+    """ReportLab ImageReader of a full-page template at its own resolution"""
+    def build(path):
+        from PIL import Image
+        from reportlab.lib.utils import ImageReader
+
+        with Image.open(path) as img:
+            img.load()
+        reader = ImageReader(img)
+        reader.getRGBData()
+        return reader
+
+    return cached('page', path, None, build)
+
+
+def stats():
+    """Hit, miss and reload counts plus how many assets are held"""
+    with _lock:
+        return dict(_stats, entries=len(_entries))
+
+
+def clear():
+    """Drop every cached asset (they are reloaded on next use)"""
+    with _lock:
+        _fingerprints.clear()
+        _entries.clear()
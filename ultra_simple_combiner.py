@@ -3,111 +3,100 @@
 Ultra Simple PDF Combiner - No complex GUI updates
 """
 
+import time
+_STARTUP_START = time.perf_counter()
+
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import os
-import zipfile
-import tempfile
-import shutil
-from PyPDF2 import PdfMerger
-import PyPDF2
-
-def compress_pdf_desktop(pdf_path, target_size_mb=20):
-    """Compress PDF to reduce file size for desktop app"""
+import threading
+from capabilities import Capabilities, lazy_import
+
+# PyPDF2 comes in with packet_engine on first use, not before the window opens
+packet_engine = lazy_import('packet_engine')
+packet_trace = lazy_import('packet_trace')
+font_registry = lazy_import('font_registry')
+listing_render = lazy_import('listing_render')
+template_assets = lazy_import('template_assets')
+archive_ingest = lazy_import('archive_ingest')
+resource_budget = lazy_import('resource_budget')
+_MODULES_LOADED = time.perf_counter()
+
+def compress_pdf_desktop(pdf_path, target_size_mb=20, streams_done=False):
+    """Compress PDF in place for desktop app, escalating until it fits target_size_mb
+    
+    Runs stream recompression, then JPEG requality, then downsampling of
+    embedded images - stopping at the first step that meets the target.
+    Pass streams_done=True when content streams were compressed during the merge.
+    """
     try:
-        from PyPDF2 import PdfReader, PdfWriter
-        
-        # Read the PDF
-        reader = PdfReader(pdf_path)
-        writer = PdfWriter()
-        
-        # Add all pages with compression
-        for page in reader.pages:
-            # Compress page content
-            page.compress_content_streams()
-            writer.add_page(page)
+        report = packet_engine.compress_to_target(pdf_path, target_size_mb, streams_done=streams_done)
         
-        # Set compression level
-        writer.add_metadata(reader.metadata)
+        original_size_mb = report['original_bytes'] / (1024 * 1024)
+        compressed_size_mb = report['final_bytes'] / (1024 * 1024)
+        print(f"DEBUG: PDF Compression: {original_size_mb:.1f} MB → {compressed_size_mb:.1f} MB ({(1 - compressed_size_mb/original_size_mb)*100:.1f}% reduction)")
+        print(f"DEBUG: Size governor: {packet_engine.format_compression_report(report)}")
+        if not report['met']:
+            print(f"DEBUG: Packet is still over the {target_size_mb} MB target after every step")
         
-        # Create temporary compressed file
-        temp_path = pdf_path.replace('.pdf', '_compressed.pdf')
-        
-        # Write compressed PDF
-        with open(temp_path, 'wb') as output_file:
-            writer.write(output_file)
-        
-        # Check file sizes
-        original_size_mb = os.path.getsize(pdf_path) / (1024 * 1024)
-        compressed_size_mb = os.path.getsize(temp_path) / (1024 * 1024)
-        
-        # Replace original with compressed if it's smaller
-        if compressed_size_mb < original_size_mb:
-            os.replace(temp_path, pdf_path)
-            print(f"DEBUG: PDF Compression: {original_size_mb:.1f} MB → {compressed_size_mb:.1f} MB ({(1 - compressed_size_mb/original_size_mb)*100:.1f}% reduction)")
-            return True
-        else:
-            # Remove temp file if compression didn't help
-            os.unlink(temp_path)
-            print(f"DEBUG: Compression didn't reduce size, keeping original")
-            return False
+        return report['final_bytes'] < report['original_bytes']
         
     except Exception as e:
         print(f"DEBUG: Could not compress PDF: {e}. Using original file.")
-        # Clean up temp file if it exists
-        temp_path = pdf_path.replace('.pdf', '_compressed.pdf')
-        if os.path.exists(temp_path):
-            os.unlink(temp_path)
         return False
 
-# Additional imports for cover page with enhanced error handling
+# Optional libraries for cover pages and Instagram posts load on a background
+# thread so the window can open straight away - flags stay False until then
 COVER_AVAILABLE = False
 PIL_AVAILABLE = False
 REPORTLAB_AVAILABLE = False
 
-# Test ReportLab
-try:
+def load_reportlab():
+    """Import ReportLab for cover pages (runs on the detection thread)"""
+    global canvas, inch, colors, REPORTLAB_AVAILABLE
     from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import letter
     from reportlab.lib.units import inch
     from reportlab.lib import colors
-    
-    # Test functionality
-    import tempfile
-    test_path = tempfile.mktemp(suffix='.pdf')
-    test_canvas = canvas.Canvas(test_path)
-    test_canvas.save()
-    os.unlink(test_path)
-    
     REPORTLAB_AVAILABLE = True
-    print("DEBUG: ReportLab loaded and tested successfully")
-    
-except Exception as e:
-    print(f"DEBUG: ReportLab failed: {e}")
-    REPORTLAB_AVAILABLE = False
+    return True
 
-# Test PIL/Pillow
-try:
+def load_pillow():
+    """Import Pillow for photos, posts and the logo (runs on the detection thread)"""
+    global Image, ImageTk, PIL_AVAILABLE
     from PIL import Image, ImageTk
-    
-    # Test functionality
-    test_img = Image.new('RGB', (1, 1))
-    
     PIL_AVAILABLE = True
-    print("DEBUG: PIL/Pillow loaded and tested successfully")
-    
-except Exception as e:
-    print(f"DEBUG: PIL/Pillow failed: {e}")
-    PIL_AVAILABLE = False
+    return True
+
+def load_pypdf2():
+    """Warm up the PDF engine so the first packet doesn't pay for the import"""
+    return hasattr(packet_engine, 'build_packet')
+
+capabilities = Capabilities({
+    'ReportLab': load_reportlab,
+    'Pillow': load_pillow,
+    'PyPDF2': load_pypdf2,
+})
 
-# Final determination
-COVER_AVAILABLE = REPORTLAB_AVAILABLE and PIL_AVAILABLE
-print(f"DEBUG: Final status - ReportLab: {REPORTLAB_AVAILABLE}, PIL: {PIL_AVAILABLE}, Cover Available: {COVER_AVAILABLE}")
+def wait_for_libraries():
+    """Block until library detection has finished and set COVER_AVAILABLE"""
+    global COVER_AVAILABLE
+    capabilities.wait()
+    COVER_AVAILABLE = REPORTLAB_AVAILABLE and PIL_AVAILABLE
+    return COVER_AVAILABLE
 
-# Force the variables to be available globally
-globals()['COVER_AVAILABLE'] = COVER_AVAILABLE
-globals()['PIL_AVAILABLE'] = PIL_AVAILABLE
-globals()['REPORTLAB_AVAILABLE'] = REPORTLAB_AVAILABLE
+def print_startup_report(window_seconds):
+    """Show what startup cost - module imports, time to window, library detection"""
+    print(f"DEBUG: Startup report - modules imported in {(_MODULES_LOADED - _STARTUP_START) * 1000:.1f} ms, "
+          f"window shown after {window_seconds * 1000:.1f} ms")
+    for line in capabilities.report().splitlines():
+        print(f"DEBUG:   {line}")
+    print(f"DEBUG: Final status - ReportLab: {REPORTLAB_AVAILABLE}, PIL: {PIL_AVAILABLE}, Cover Available: {COVER_AVAILABLE}")
+
+# Instagram text uses Times New Roman, like the cover sheet
+INSTAGRAM_FAMILIES = ("Times New Roman", "Times")
+
+# Instagram post format - a key of listing_render.POST_ENCODERS ('jpeg', 'png' or 'webp')
+INSTAGRAM_ENCODER = os.environ.get('HC_INSTAGRAM_FORMAT', 'jpeg')
 
 def parse_address(full_address):
     """Parse full address into street address and city/state"""
@@ -130,125 +119,35 @@ def parse_address(full_address):
     
     return street, city_state
 
-def create_cover_page(template_path, photo_path, street_address, city_state, output_path):
-    """Create custom cover page by drawing everything from scratch - no template merging"""
+def load_property_photo(photo_path, budget=None):
+    """Decode the property photo once for the cover page and every Instagram post"""
+    with open(photo_path, 'rb') as f:
+        photo = listing_render.PropertyPhoto(f.read(), budget=budget)
+    print(f"DEBUG: Property photo {photo.original_size} decoded at {photo.decoded_size}")
+    return photo
+
+def create_cover_page(template_path, photo, street_address, city_state, output_path):
+    """Create custom cover page from the precompiled template and logo layers
+    
+    photo is a listing_render.PropertyPhoto, already cropped to the photo area.
+    Only the photo and address are drawn per cover (see listing_render.cover_layers).
+    """
     if not COVER_AVAILABLE:
         return False
         
-    try:
-        # Use standard letter size - 8.5" x 11"
-        page_width = 8.5 * inch
-        page_height = 11 * inch
-        
-        # Create the PDF directly without template merging
-        c = canvas.Canvas(output_path, pagesize=(page_width, page_height))
-        
-        # First, draw the Hall Collins template as the base (full page)
-        template_image_path = "templates/1) HC -  Template Bottom Photo.png"
-        if os.path.exists(template_image_path):
-            try:
-                # Draw the complete template first - covers entire page
-                c.drawImage(template_image_path, 0, 0, width=page_width, height=page_height)
-                print(f"DEBUG: Template base drawn - {page_width/inch:.2f}\" x {page_height/inch:.2f}\"")
-            except Exception as e:
-                print(f"Warning: Could not add template base: {e}")
-        else:
-            print(f"Warning: Template file not found: {template_image_path}")
-        
-        # Add property photo overlay (covers the photo area of the template)
-        if photo_path and os.path.exists(photo_path):
-            try:
-                # Cover exactly 7.12" from the top of the page (photo area only)
-                photo_width = page_width  # Full page width
-                photo_height = 7.12 * inch  # Exactly 7.12 inches tall
-                photo_x = 0  # Start at absolute left edge
-                photo_y = page_height - photo_height  # Position from top: 11" - 7.12" = 3.88" from bottom
-                
-                # Draw photo over the template - covers exactly 7.12" from top
-                c.drawImage(photo_path, photo_x, photo_y, width=photo_width, height=photo_height)
-                print(f"DEBUG: Photo overlay drawn at ({photo_x}, {photo_y}) - {photo_width/inch:.2f}\" x {photo_height/inch:.2f}\" (exactly 7.12\" tall)")
-                
-            except Exception as e:
-                print(f"Warning: Could not add photo overlay: {e}")
-        
-        # Add Hall Collins white logo overlay on the photo
-        logo_overlay_path = "templates/HC_Solid White Logo_Transparent Back.png"
-        if os.path.exists(logo_overlay_path):
-            try:
-                # Size the logo 50% larger (5.75" * 1.5 = 8.625" wide)
-                logo_width = 8.625 * inch
-                logo_img = Image.open(logo_overlay_path)
-                logo_height = logo_img.height * (logo_width / logo_img.width)
-                
-                # Position logo centered horizontally, with CENTER 1" from top
-                logo_x = (page_width - logo_width) / 2
-                logo_y = page_height - (1.0 * inch) - (logo_height / 2)
-                
-                c.drawImage(logo_overlay_path, logo_x, logo_y, width=logo_width, height=logo_height, mask='auto')
-                print(f"DEBUG: Logo added at ({logo_x}, {logo_y}) - {logo_width/inch:.2f}\" wide, center 1\" from top")
-                
-            except Exception as logo_e:
-                print(f"Warning: Could not add logo overlay: {logo_e}")
-        
-        # Add address text overlays on the photo
-        # Add address text overlays on the photo
-        if street_address:
-            try:
-                # Try fonts in order of preference - using regular (non-bold) fonts
-                font_name = "Times-Roman"
-                for font_option in ["PlayfairDisplay-Regular", "EBGaramond-Regular", "Times-Roman"]:
-                    try:
-                        c.setFont(font_option, 36)
-                        font_name = font_option
-                        break
-                    except:
-                        continue
-                
-                c.setFillColor(colors.white)
-                # Position street address text on the photo - convert to uppercase
-                street_address_upper = street_address.upper()
-                text_width = c.stringWidth(street_address_upper, font_name, 36)
-                x_position = (page_width - text_width) / 2
-                c.drawString(x_position, 3.21 * inch, street_address_upper)
-                print(f"DEBUG: Street address added with {font_name}")
-            except Exception as text_e:
-                print(f"Warning: Could not add street address: {text_e}")
-        
-        if city_state:
-            try:
-                # Try fonts in order of preference - using regular (non-bold) fonts  
-                font_name = "Times-Roman"
-                for font_option in ["PlayfairDisplay-Regular", "EBGaramond-Regular", "Times-Roman"]:
-                    try:
-                        c.setFont(font_option, 24)
-                        font_name = font_option
-                        break
-                    except:
-                        continue
-                
-                c.setFillColor(colors.white)
-                # Position city/state text on the photo - convert to uppercase
-                city_state_upper = city_state.upper()
-                text_width = c.stringWidth(city_state_upper, font_name, 24)
-                x_position = (page_width - text_width) / 2
-                c.drawString(x_position, 2.58 * inch, city_state_upper)
-                print(f"DEBUG: City/State added with {font_name}")
-            except Exception as text_e:
-                print(f"Warning: Could not add city/state: {text_e}")
-        
-        # Save the PDF directly - no template merging needed
-        c.save()
-        print("DEBUG: Cover page created directly without template merging")
-        return True
-            
-    except Exception as e:
-        print(f"Error creating cover page: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
+    start = time.perf_counter()
+    created = listing_render.create_cover_page(photo, street_address, city_state, output_path,
+                                               warn=lambda message: print(f"Warning: {message}"))
+    if created:
+        print(f"DEBUG: Cover page created in {time.perf_counter() - start:.2f}s - template cache {template_assets.stats()}")
+    return created
 
-def create_instagram_posts(photo_path, street_address, city_state, output_dir):
-    """Create 3 Instagram posts using template PNG files and property photo"""
+def create_instagram_posts(photo, street_address, city_state, output_dir):
+    """Create 3 Instagram posts using template PNG files and property photo
+    
+    photo is a listing_render.PropertyPhoto, decoded and cropped once for all
+    three posts. The posts render concurrently on a thread pool.
+    """
     if not COVER_AVAILABLE:
         return []
         
@@ -268,13 +167,15 @@ def create_instagram_posts(photo_path, street_address, city_state, output_dir):
     ]
     
     try:
-        # Import ImageDraw and ImageFont for text overlay
-        from PIL import ImageDraw, ImageFont
+        # Import ImageDraw for text overlay
+        from PIL import ImageDraw
         
-        for template_file, post_type, text_alignment, text_x, text_y, text_color in templates:
+        def render_post(template_spec):
+            """Build and save one post; runs on a render thread"""
+            template_file, post_type, text_alignment, text_x, text_y, text_color = template_spec
             if not os.path.exists(template_file):
                 print(f"Warning: Template not found: {template_file}")
-                continue
+                return None
                 
             try:
                 # Create new image with Instagram dimensions
@@ -283,18 +184,12 @@ def create_instagram_posts(photo_path, street_address, city_state, output_dir):
                 
                 # Load and apply template as BACKGROUND FIRST
                 if os.path.exists(template_file):
-                    template_img = Image.open(template_file)
-                    print(f"DEBUG: Loaded template {template_file}, original size: {template_img.size}, mode: {template_img.mode}")
-                    
-                    # Resize template to Instagram dimensions if needed
-                    template_img = template_img.resize((post_width, post_height), Image.Resampling.LANCZOS)
-                    print(f"DEBUG: Resized template to: {template_img.size}")
+                    # Decoded and resized to Instagram dimensions once per session
+                    template_img = template_assets.template_image(template_file, (post_width, post_height))
+                    print(f"DEBUG: Template {template_file} at {template_img.size} - cache {template_assets.stats()}")
                     
                     # Apply template as the base background
-                    if template_img.mode == 'RGBA':
-                        instagram_post.paste(template_img, (0, 0), template_img)
-                    else:
-                        instagram_post.paste(template_img, (0, 0))
+                    instagram_post.paste(template_img, (0, 0), template_img)
                     print(f"DEBUG: Template applied as background for {post_type}")
                     
                     # Save a debug version of the template background
@@ -306,33 +201,10 @@ def create_instagram_posts(photo_path, street_address, city_state, output_dir):
                     print(f"DEBUG: Template file not found: {template_file}")
                 
                 # NOW overlay property photo on top of template
-                if photo_path and os.path.exists(photo_path):
-                    print(f"DEBUG: Loading property photo from: {photo_path}")
-                    property_photo = Image.open(photo_path)
-                    print(f"DEBUG: Original property photo size: {property_photo.size}")
-                    
-                    # Calculate proper cropping to maintain aspect ratio and fit dimensions
-                    original_width, original_height = property_photo.size
-                    target_aspect = photo_width / photo_height
-                    original_aspect = original_width / original_height
-                    
-                    if original_aspect > target_aspect:
-                        # Photo is wider than needed, crop width
-                        new_height = original_height
-                        new_width = int(new_height * target_aspect)
-                        left = (original_width - new_width) // 2
-                        crop_box = (left, 0, left + new_width, new_height)
-                    else:
-                        # Photo is taller than needed, crop height
-                        new_width = original_width
-                        new_height = int(new_width / target_aspect)
-                        top = (original_height - new_height) // 2
-                        crop_box = (0, top, new_width, top + new_height)
-                    
-                    # Crop and resize to exact specifications
-                    property_photo = property_photo.crop(crop_box)
-                    property_photo = property_photo.resize((photo_width, photo_height), Image.Resampling.LANCZOS)
-                    print(f"DEBUG: Cropped and resized property photo to: {property_photo.size}")
+                if photo:
+                    # Already cropped and resized to exact specifications
+                    property_photo = photo.instagram
+                    print(f"DEBUG: Using decoded property photo: {property_photo.size}")
                     
                     # Paste photo at top-left (now it should fit perfectly)
                     photo_x = (post_width - photo_width) // 2  # Center horizontally
@@ -348,102 +220,90 @@ def create_instagram_posts(photo_path, street_address, city_state, output_dir):
                     print(f"DEBUG: Saved photo-over-template image: {debug_filename}")
                     
                 else:
-                    print(f"DEBUG: No property photo found or path invalid: {photo_path}")
-                    print(f"DEBUG: Photo exists: {os.path.exists(photo_path) if photo_path else 'No path provided'}")
+                    print("DEBUG: No property photo provided")
                 
                 # Add address text overlay with specific positioning and colors
-                if street_address:
-                    try:
-                        draw = ImageDraw.Draw(instagram_post)
+                # Fonts are shared by all render threads - draw text one post at a time
+                with font_registry.text_lock:
+                    if street_address:
+                        try:
+                            draw = ImageDraw.Draw(instagram_post)
                         
-                        # Load Times New Roman using the same reliable path as the cover sheet
-                        FONT_PATHS = [
-                            "/System/Library/Fonts/Supplemental/Times New Roman.ttf",
-                            "/System/Library/Fonts/Times.ttc",
-                        ]
-                        font = None
-                        for fp in FONT_PATHS:
-                            if os.path.exists(fp):
-                                try:
-                                    font = ImageFont.truetype(fp, 59)
-                                    break
-                                except:
-                                    continue
-                        if font is None:
-                            font = ImageFont.load_default()
+                            # Times New Roman to match the cover sheet, looked up once per process
+                            font, font_face = font_registry.pil_font(INSTAGRAM_FAMILIES, 59)
+                            print(f"DEBUG: Instagram font: {font_registry.describe(font_face, 59)}")
                         
-                        # Convert street address to uppercase for consistent branding
-                        street_address_upper = street_address.upper()
+                            # Convert street address to uppercase for consistent branding
+                            street_address_upper = street_address.upper()
                         
-                        # Calculate text positioning based on post type
-                        if text_alignment == "centered_offset":
-                            # For Under Contract: center text with offset
-                            text_width = draw.textbbox((0, 0), street_address_upper, font=font)[2]
-                            text_x_final = (post_width // 2) - (text_width // 2) + text_x  # Center and offset by text_x
-                        elif text_alignment == "centered":
-                            # For New Listing and Sold: center text perfectly
-                            text_width = draw.textbbox((0, 0), street_address_upper, font=font)[2]
-                            text_x_final = (post_width - text_width) // 2  # Perfect center
-                        else:
-                            # For other cases: use absolute positioning
-                            text_x_final = text_x
+                            # Calculate text positioning based on post type
+                            if text_alignment == "centered_offset":
+                                # For Under Contract: center text with offset
+                                text_width = draw.textbbox((0, 0), street_address_upper, font=font)[2]
+                                text_x_final = (post_width // 2) - (text_width // 2) + text_x  # Center and offset by text_x
+                            elif text_alignment == "centered":
+                                # For New Listing and Sold: center text perfectly
+                                text_width = draw.textbbox((0, 0), street_address_upper, font=font)[2]
+                                text_x_final = (post_width - text_width) // 2  # Perfect center
+                            else:
+                                # For other cases: use absolute positioning
+                                text_x_final = text_x
                         
-                        text_position = (text_x_final, text_y)
+                            text_position = (text_x_final, text_y)
                         
-                        # Add street address text with specified color
-                        draw.text(text_position, street_address_upper, fill=text_color, font=font)
-                        print(f"DEBUG: Added street address '{street_address_upper}' at {text_position} for {post_type} in color {text_color}")
+                            # Add street address text with specified color
+                            draw.text(text_position, street_address_upper, fill=text_color, font=font)
+                            print(f"DEBUG: Added street address '{street_address_upper}' at {text_position} for {post_type} in color {text_color}")
                         
-                        # Add city/state below street address if available
-                        if city_state:
-                            try:
-                                # Use smaller font for city/state - same reliable path
-                                small_font = None
-                                for fp in FONT_PATHS:
-                                    if os.path.exists(fp):
-                                        try:
-                                            small_font = ImageFont.truetype(fp, 40)
-                                            break
-                                        except:
-                                            continue
-                                if small_font is None:
-                                    small_font = font  # Use same font if others fail
+                            # Add city/state below street address if available
+                            if city_state:
+                                try:
+                                    # Use smaller font for city/state - same family
+                                    small_font, small_face = font_registry.pil_font(INSTAGRAM_FAMILIES, 40)
+                                    if small_face is None:
+                                        small_font = font  # Use same font if others fail
                                 
-                                # Convert city/state to uppercase for consistent branding
-                                city_state_upper = city_state.upper()
+                                    # Convert city/state to uppercase for consistent branding
+                                    city_state_upper = city_state.upper()
                                 
-                                # Position city/state below street address with same alignment
-                                if text_alignment == "centered_offset":
-                                    city_text_width = draw.textbbox((0, 0), city_state_upper, font=small_font)[2]
-                                    city_x_final = (post_width // 2) - (city_text_width // 2) + text_x
-                                elif text_alignment == "centered":
-                                    city_text_width = draw.textbbox((0, 0), city_state_upper, font=small_font)[2]
-                                    city_x_final = (post_width - city_text_width) // 2  # Perfect center
-                                else:
-                                    city_x_final = text_x
+                                    # Position city/state below street address with same alignment
+                                    if text_alignment == "centered_offset":
+                                        city_text_width = draw.textbbox((0, 0), city_state_upper, font=small_font)[2]
+                                        city_x_final = (post_width // 2) - (city_text_width // 2) + text_x
+                                    elif text_alignment == "centered":
+                                        city_text_width = draw.textbbox((0, 0), city_state_upper, font=small_font)[2]
+                                        city_x_final = (post_width - city_text_width) // 2  # Perfect center
+                                    else:
+                                        city_x_final = text_x
                                 
-                                city_position = (city_x_final, text_y + 60)
-                                draw.text(city_position, city_state_upper, fill=text_color, font=small_font)
-                                print(f"DEBUG: Added city/state '{city_state_upper}' at {city_position} for {post_type} in color {text_color}")
-                            except Exception as city_e:
-                                print(f"Warning: Could not add city/state text: {city_e}")
+                                    city_position = (city_x_final, text_y + 60)
+                                    draw.text(city_position, city_state_upper, fill=text_color, font=small_font)
+                                    print(f"DEBUG: Added city/state '{city_state_upper}' at {city_position} for {post_type} in color {text_color}")
+                                except Exception as city_e:
+                                    print(f"Warning: Could not add city/state text: {city_e}")
                         
-                    except Exception as text_e:
-                        print(f"Warning: Could not add address text to {post_type}: {text_e}")
+                        except Exception as text_e:
+                            print(f"Warning: Could not add address text to {post_type}: {text_e}")
                 
                 # Create filename
                 safe_street = "".join(c for c in street_address if c.isalnum() or c in (' ', '-', '_')).strip()
-                filename = f"{safe_street} - {post_type} - Instagram.png"
+                filename = f"{safe_street} - {post_type} - Instagram{listing_render.POST_ENCODERS[INSTAGRAM_ENCODER]['extension']}"
                 output_path = os.path.join(output_dir, filename)
                 
                 # Save Instagram post
-                instagram_post.save(output_path, 'PNG', quality=95)
-                created_files.append(output_path)
-                print(f"DEBUG: Created Instagram post: {filename}")
+                data, report = listing_render.encode_image(instagram_post, INSTAGRAM_ENCODER)
+                with open(output_path, 'wb') as post_file:
+                    post_file.write(data)
+                print(f"DEBUG: Created Instagram post: {filename} - {report['bytes'] / 1024:.0f} KB "
+                      f"{report['encoder']} in {report['seconds']:.2f}s")
+                return output_path
                 
             except Exception as e:
                 print(f"Warning: Could not create {post_type} Instagram post: {e}")
-                continue
+                return None
+        
+        # All variants render side by side; files come back in template order
+        created_files = [path for path in listing_render.render_variants(render_post, templates) if path]
                 
     except Exception as e:
         print(f"Error creating Instagram posts: {e}")
@@ -454,7 +314,7 @@ def create_instagram_posts(photo_path, street_address, city_state, output_dir):
 
 def select_cover_photo():
     """Select a photo for the cover page"""
-    if not COVER_AVAILABLE:
+    if not wait_for_libraries():
         messagebox.showwarning("Libraries Required", 
                              "Cover page features require additional libraries.\n\n" + 
                              "To enable these features:\n" +
@@ -496,6 +356,7 @@ def select_cover_photo():
             print("DEBUG: Auto-enabled Instagram posts checkbox")
         
         print(f"DEBUG: Cover photo selected: {file_path}")
+        schedule_preview()
     else:
         # Reset button text based on availability
         if COVER_AVAILABLE:
@@ -503,33 +364,6 @@ def select_cover_photo():
         else:
             cover_photo_btn.config(text="📸 Select Property Photo (install libraries first)")
 
-def convert_jpg_to_pdf(jpg_path, output_path):
-    """Convert JPG file to PDF"""
-    if not PIL_AVAILABLE:
-        return False
-        
-    try:
-        from PIL import Image
-        
-        # Open and convert JPG to PDF
-        img = Image.open(jpg_path)
-        
-        # Convert RGBA to RGB if necessary (PDF doesn't support transparency)
-        if img.mode in ('RGBA', 'LA'):
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Save as PDF
-        img.save(output_path, 'PDF', quality=95)
-        return True
-        
-    except Exception as e:
-        print(f"Error converting JPG to PDF: {e}")
-        return False
-
 def get_recent_downloads():
     """Get recent PDF, ZIP, and JPG files from Downloads folder"""
     try:
@@ -542,6 +376,9 @@ def get_recent_downloads():
         files = []
         
         for filename in os.listdir(downloads_path):
+            # Instagram posts this app saved as JPEG are outputs, not packet documents
+            if " - Instagram." in filename:
+                continue
             if filename.lower().endswith(supported_extensions):
                 filepath = os.path.join(downloads_path, filename)
                 if os.path.isfile(filepath):
@@ -562,6 +399,9 @@ def process_files_from_paths(file_paths):
     if not file_paths:
         return
     
+    # JPG conversion needs Pillow - make sure detection has finished
+    wait_for_libraries()
+    
     print(f"DEBUG: Processing {len(file_paths)} files")
     
     # Show processing status
@@ -571,13 +411,13 @@ def process_files_from_paths(file_paths):
     # Clear and process files immediately
     file_listbox.delete(0, tk.END)
     
-    global all_pdf_paths, temp_dir
-    all_pdf_paths = []
-    
-    # Create temp directory if needed
-    if temp_dir and os.path.exists(temp_dir):
-        shutil.rmtree(temp_dir)
-    temp_dir = tempfile.mkdtemp(prefix="listing_packet_")
+    global all_pdf_sources, ingest_trace, ingest_budget
+    packet_engine.close_sources(all_pdf_sources)
+    all_pdf_sources = []
+    ingest_trace = packet_trace.PacketTrace()
+    # What these files may unzip and hold in memory - pages and the photo are
+    # charged per packet, so creating again from the same files starts afresh
+    ingest_budget = resource_budget.Budget()
     
     print("DEBUG: Processing files...")
     
@@ -595,51 +435,53 @@ def process_files_from_paths(file_paths):
         if file_path.lower().endswith('.zip'):
             # Process ZIP file
             try:
-                extracted_pdfs = simple_extract_zip(file_path, temp_dir)
-                if extracted_pdfs:
-                    file_listbox.insert(tk.END, f"📁 {file_name} ({len(extracted_pdfs)} PDFs)")
-                    all_pdf_paths.extend(extracted_pdfs)
-                    for pdf_path in extracted_pdfs:
-                        pdf_name = os.path.basename(pdf_path)
+                with ingest_trace.span('zip extraction', bytes_in=os.path.getsize(file_path), detail=file_name) as span:
+                    zip_sources, members = simple_extract_zip(file_path)
+                    span.bytes_out = sum(source['size'] for source in zip_sources)
+                    span.detail = f"{file_name}: {archive_ingest.summarize(members)}"
+                if zip_sources:
+                    file_listbox.insert(tk.END, f"📁 {file_name} ({len(zip_sources)} PDFs)")
+                    all_pdf_sources.extend(zip_sources)
+                    for source in zip_sources:
+                        pdf_name = os.path.basename(source['name'])
                         file_listbox.insert(tk.END, f"   📄 {pdf_name}")
                 else:
                     file_listbox.insert(tk.END, f"⚠️ {file_name} (no PDFs)")
+                for entry in members:
+                    if entry['status'] == 'failed':
+                        file_listbox.insert(tk.END, f"   ❌ {entry['name']} ({entry['error']})")
             except Exception as e:
                 print(f"DEBUG: ZIP error: {str(e)}")
                 file_listbox.insert(tk.END, f"❌ {file_name} (ZIP error)")
                 
         elif file_path.lower().endswith('.pdf'):
-            # Regular PDF
-            file_listbox.insert(tk.END, f"📄 {file_name}")
-            all_pdf_paths.append(file_path)
+            # Regular PDF - read straight from where it is at merge time
+            with ingest_trace.span('ingest', bytes_in=os.path.getsize(file_path), detail=file_name) as span:
+                file_listbox.insert(tk.END, f"📄 {file_name}")
+                all_pdf_sources.append({'name': file_name, 'path': file_path})
+                span.bytes_out = span.bytes_in
             
         elif file_path.lower().endswith(('.jpg', '.jpeg')):
-            # Convert JPG to PDF
-            try:
-                if PIL_AVAILABLE:
-                    # Create temp PDF from JPG
-                    jpg_pdf_path = os.path.join(temp_dir, f"{os.path.splitext(file_name)[0]}.pdf")
-                    if convert_jpg_to_pdf(file_path, jpg_pdf_path):
-                        file_listbox.insert(tk.END, f"📷➡️📄 {file_name} (converted)")
-                        all_pdf_paths.append(jpg_pdf_path)
-                    else:
-                        file_listbox.insert(tk.END, f"❌ {file_name} (conversion failed)")
-                else:
-                    file_listbox.insert(tk.END, f"❌ {file_name} (PIL required for JPG)")
-            except Exception as e:
-                print(f"DEBUG: JPG conversion error: {str(e)}")
-                file_listbox.insert(tk.END, f"❌ {file_name} (JPG error)")
+            # Convert JPG to a PDF page on the conversion threads - the rest of
+            # the files load meanwhile, and the merge takes it in selection order
+            if PIL_AVAILABLE:
+                # Each conversion records its own span in ingest_trace as it finishes
+                all_pdf_sources.extend(listing_render.convert_images([(file_name, file_path)], ingest_budget,
+                                                                     trace=ingest_trace))
+                file_listbox.insert(tk.END, f"📷➡️📄 {file_name} (converting)")
+            else:
+                file_listbox.insert(tk.END, f"❌ {file_name} (PIL required for JPG)")
                 
         else:
             file_listbox.insert(tk.END, f"❌ {file_name} (unsupported)")
     
     # Update status
-    if all_pdf_paths:
-        status_label.config(text=f"Ready! {len(all_pdf_paths)} PDFs loaded", fg="green")
+    if all_pdf_sources:
+        status_label.config(text=f"Ready! {len(all_pdf_sources)} PDFs loaded", fg="green")
     else:
         status_label.config(text="No PDFs found", fg="red")
         
-    print(f"DEBUG: Processing complete. {len(all_pdf_paths)} PDFs ready")
+    print(f"DEBUG: Processing complete. {len(all_pdf_sources)} PDFs ready")
 
 def on_recent_file_select(event):
     """Handle selection from recent downloads listbox"""
@@ -724,32 +566,28 @@ def select_and_process_files():
         print(f"DEBUG: Error in file selection: {str(e)}")
         status_label.config(text=f"Error: {str(e)}", fg="red")
 
-def simple_extract_zip(zip_path, temp_dir):
-    """Simple ZIP extraction without complex logging"""
-    pdf_files = []
+def simple_extract_zip(zip_path):
+    """Read a ZIP's documents as packet sources - nothing is extracted to a folder
     
-    try:
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            for file_name in zip_ref.namelist():
-                if (file_name.lower().endswith('.pdf') and 
-                    not file_name.startswith('__MACOSX/') and
-                    not file_name.startswith('.')):
-                    
-                    zip_ref.extract(file_name, temp_dir)
-                    extracted_path = os.path.join(temp_dir, file_name)
-                    if os.path.exists(extracted_path):
-                        pdf_files.append(extracted_path)
-    except:
-        pass  # Silently fail for now
-        
-    return pdf_files
+    The archive's own PDFs stay in it and are read straight from their member
+    at merge time; nested ZIPs are followed and JPGs converted to PDF in
+    memory. Returns (packet sources in archive order, per-member report). An
+    archive that can't be opened raises; members that fail are reported and
+    skipped.
+    """
+    sources, members = archive_ingest.ingest_archive(zip_path, defer_pdfs=True, budget=ingest_budget)
+    print(f"DEBUG: {os.path.basename(zip_path)}: {archive_ingest.summarize(members)}")
+    print(archive_ingest.format_report(members))
+    return sources, members
 
 def create_packet():
     """Create the final PDF packet with optional cover page and Instagram posts"""
-    if not all_pdf_paths:
+    if not all_pdf_sources:
         messagebox.showerror("Error", "Please select PDF or ZIP files first!")
         return
     
+    wait_for_libraries()
+    
     street_address = street_entry.get().strip()
     city_state = city_state_entry.get().strip()
     
@@ -782,12 +620,25 @@ def create_packet():
             output_filename = "Listing Packet.pdf"
         output_path = os.path.join(os.path.expanduser("~/Downloads"), output_filename)
         
-        # Create PDF merger
-        merger = PdfMerger()
-        combined_count = 0
+        trace = packet_trace.PacketTrace(street_address)
+        
+        # Decode the property photo once for the cover page and every post
+        budget = resource_budget.Budget()
+        property_photo = None
+        if (include_cover or include_instagram) and cover_photo_path and COVER_AVAILABLE:
+            with trace.span('photo decode', bytes_in=os.path.getsize(cover_photo_path)) as span:
+                try:
+                    property_photo = load_property_photo(cover_photo_path, budget)
+                    span.detail = f"decoded at {property_photo.decoded_size[0]}x{property_photo.decoded_size[1]}"
+                except Exception as photo_error:
+                    print(f"Warning: Could not read property photo: {photo_error}")
+        
+        # Collect the packet sources in order - cover page first
+        packet_sources = []
+        cover_path = None
         
         # Add cover page if requested
-        if include_cover and cover_photo_path and COVER_AVAILABLE:
+        if include_cover and property_photo:
             print("DEBUG: Creating cover page...")
             print(f"DEBUG: Cover photo path: {cover_photo_path}")
             print(f"DEBUG: Street: {street_address}")
@@ -795,43 +646,45 @@ def create_packet():
             
             # The create_cover_page function creates the PDF directly from PNG templates
             # No PDF template file is needed - it uses the PNG templates in the templates folder
-            cover_path = tempfile.mktemp(suffix='_cover.pdf')
+            cover_path = packet_engine.new_temp_path('_cover.pdf')
             print(f"DEBUG: Creating cover page at: {cover_path}")
             
             # Pass None as template_path since create_cover_page uses PNG templates directly
-            if create_cover_page(None, cover_photo_path, street_address, city_state, cover_path):
-                try:
-                    with open(cover_path, 'rb') as f:
-                        merger.append(f)
-                    combined_count += 1
-                    print("DEBUG: Cover page added successfully to merger")
-                    os.unlink(cover_path)
-                except Exception as e:
-                    print(f"DEBUG: Error adding cover page to merger: {e}")
+            with trace.span('cover render') as span:
+                cover_created = create_cover_page(None, property_photo, street_address, city_state, cover_path)
+                span.bytes_out = os.path.getsize(cover_path) if cover_created else 0
+            if cover_created:
+                packet_sources.append({'name': 'Cover Page', 'path': cover_path, 'cache': False})
             else:
                 print("DEBUG: Cover page creation failed")
         
         # Add listing PDFs
-        for pdf_path in all_pdf_paths:
-            try:
-                print(f"DEBUG: Attempting to add PDF: {os.path.basename(pdf_path)}")
-                with open(pdf_path, 'rb') as f:
-                    merger.append(f)
-                    combined_count += 1
-                    print(f"DEBUG: Successfully added: {os.path.basename(pdf_path)}")
-            except Exception as e:
-                print(f"DEBUG: Failed to add {os.path.basename(pdf_path)}: {e}")
-                continue  # Skip problematic files
-        
-        if combined_count == 0:
-            messagebox.showerror("Error", "No PDF files could be processed!")
-            return
+        packet_sources.extend(all_pdf_sources)
         
-        print(f"DEBUG: Attempting to write final PDF with {combined_count} pages/files")
+        # Merge and compress straight into Downloads - each document is
+        # parsed and compressed by its own worker process, then the results
+        # are stitched together in the order the files were selected
+        print(f"DEBUG: Attempting to write final PDF from {len(packet_sources)} files")
+        combined_count = 0
+        streams_done = False
+        dedup_saved = 0
         try:
-            with open(output_path, 'wb') as output_file:
-                merger.write(output_file)
-            print("DEBUG: PDF write successful")
+            with trace.span('merge', detail=f"{len(packet_sources)} documents") as span:
+                summary = packet_engine.build_packet(packet_sources, output_path, compress_streams=True, budget=budget)
+                span.bytes_in = summary['input_bytes']
+                span.bytes_out = summary['bytes_written']
+            combined_count = summary['documents']
+            streams_done = True
+            print(f"DEBUG: PDF write successful - {summary['pages']} pages, "
+                  f"{summary['input_bytes'] / (1024 * 1024):.1f} MB → {summary['bytes_written'] / (1024 * 1024):.1f} MB")
+            print(f"DEBUG: Document cache - {summary['cache_hits']} reused, {summary['cache_misses']} processed, "
+                  f"totals {packet_engine.document_cache().stats()}")
+            print(f"DEBUG: Shared resources - {summary['duplicate_streams']} duplicate streams, "
+                  f"{summary['dedup_bytes_saved'] / (1024 * 1024):.1f} MB saved")
+            for note in ingest_budget.notes + budget.notes:
+                print(f"DEBUG: {note}")
+            print(f"DEBUG: Resource budget - {resource_budget.format_stats()}")
+            dedup_saved = summary['dedup_bytes_saved']
         except Exception as write_error:
             print(f"DEBUG: PDF write failed: {write_error}")
             # Try alternative approach with PdfWriter
@@ -840,41 +693,57 @@ def create_packet():
                 from PyPDF2 import PdfWriter, PdfReader
                 writer = PdfWriter()
                 
-                # Re-add cover page if it exists
-                if include_cover and cover_photo_path and COVER_AVAILABLE:
-                    cover_path = tempfile.mktemp(suffix='_cover.pdf')
-                    if create_cover_page(None, cover_photo_path, street_address, city_state, cover_path):
-                        cover_reader = PdfReader(cover_path)
-                        for page in cover_reader.pages:
-                            writer.add_page(page)
-                        os.unlink(cover_path)
-                
-                # Re-add PDF files one by one
-                for pdf_path in all_pdf_paths:
-                    try:
-                        reader = PdfReader(pdf_path)
-                        for page in reader.pages:
-                            writer.add_page(page)
-                    except Exception as pdf_error:
-                        print(f"DEBUG: Skipping problematic PDF {os.path.basename(pdf_path)}: {pdf_error}")
-                        continue
-                
-                with open(output_path, 'wb') as output_file:
-                    writer.write(output_file)
+                # Re-add PDF files one by one - sources may be paths, ZIP members,
+                # spools, bytes or JPGs still converting, so open them the way
+                # the merge does. Streams stay open until the writer is done
+                # reading pages from them.
+                opened = []
+                try:
+                    for packet_source in packet_sources:
+                        try:
+                            stream, should_close = packet_engine.open_source(packet_source)
+                            if should_close:
+                                opened.append(stream)
+                            reader = PdfReader(stream)
+                            for page in reader.pages:
+                                writer.add_page(page)
+                            combined_count += 1
+                        except Exception as pdf_error:
+                            print(f"DEBUG: Skipping problematic PDF {packet_source['name']}: {pdf_error}")
+                            continue
+                    
+                    with open(output_path, 'wb') as output_file:
+                        writer.write(output_file)
+                finally:
+                    for stream in opened:
+                        stream.close()
                 print("DEBUG: Alternative PDF creation successful")
                 
             except Exception as alt_error:
                 raise Exception(f"Both PDF creation methods failed. Original error: {write_error}. Alternative error: {alt_error}")
+        finally:
+            if cover_path and os.path.exists(cover_path):
+                os.unlink(cover_path)
+            # Stages from loading the files lead this packet's trace - taken
+            # after the merge, which waited for any JPG still converting
+            if ingest_trace:
+                trace.spans[:0] = ingest_trace.spans
         
-        merger.close()
+        if combined_count == 0:
+            if os.path.exists(output_path):
+                os.unlink(output_path)
+            messagebox.showerror("Error", "No PDF files could be processed!")
+            return
         
-        # Compress PDF to reduce file size
-        print("DEBUG: Attempting PDF compression...")
-        compress_pdf_desktop(output_path)
+        # Bring the packet under the size budget (escalates only if needed)
+        print("DEBUG: Checking packet size budget...")
+        with trace.span('compress', bytes_in=os.path.getsize(output_path)) as span:
+            compress_pdf_desktop(output_path, streams_done=streams_done)
+            span.bytes_out = os.path.getsize(output_path)
         
         # Create Instagram posts if requested
         instagram_files = []
-        if include_instagram and cover_photo_path and COVER_AVAILABLE:
+        if include_instagram and property_photo:
             print("DEBUG: Creating Instagram posts...")
             print(f"DEBUG: Instagram photo path: {cover_photo_path}")
             print(f"DEBUG: Instagram street: {street_address}")
@@ -882,7 +751,10 @@ def create_packet():
             print(f"DEBUG: Photo exists: {os.path.exists(cover_photo_path) if cover_photo_path else 'No path'}")
             downloads_dir = os.path.expanduser("~/Downloads")
             print(f"DEBUG: Downloads directory: {downloads_dir}")
-            instagram_files = create_instagram_posts(cover_photo_path, street_address, city_state, downloads_dir)
+            with trace.span('instagram render') as span:
+                instagram_files = create_instagram_posts(property_photo, street_address, city_state, downloads_dir)
+                span.bytes_out = sum(os.path.getsize(path) for path in instagram_files)
+                span.detail = f"{len(instagram_files)} posts"
             print(f"DEBUG: Instagram posts created: {len(instagram_files)} files")
         elif include_instagram:
             print(f"DEBUG: Instagram requested but requirements not met:")
@@ -890,12 +762,10 @@ def create_packet():
             print(f"DEBUG: cover_photo_path: {cover_photo_path}")
             print(f"DEBUG: COVER_AVAILABLE: {COVER_AVAILABLE}")
         
-        # Cleanup
-        if temp_dir and os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-        
         # Success message
         success_msg = f"Created: {output_filename}\nCombined {combined_count} PDFs\nSaved to Downloads folder"
+        if dedup_saved:
+            success_msg += f"\nShared fonts/images saved {dedup_saved / (1024 * 1024):.1f} MB"
         if include_cover and cover_photo_path and street_address:
             success_msg += f"\n\nIncludes custom cover page:\n• {street_address}"
             if city_state:
@@ -907,6 +777,12 @@ def create_packet():
                 filename = os.path.basename(file_path)
                 success_msg += f"• {filename}\n"
         
+        print(f"DEBUG: Packet timing:\n{trace.format_table()}")
+        trace_path = trace.save_to_trace_dir()
+        if trace_path:
+            print(f"DEBUG: Trace written to {trace_path}")
+        show_trace(trace)
+        
         messagebox.showinfo("Success!", success_msg)
         status_label.config(text=f"Success! Created {output_filename}" + (f" + {len(instagram_files)} Instagram posts" if instagram_files else ""), fg="green")
         
@@ -923,293 +799,444 @@ def create_packet():
         messagebox.showerror("Error", error_msg)
         print(f"DEBUG: Error in create_packet: {str(e)}")
 
+def show_trace(trace):
+    """Put a packet's timing table in the collapsible timing panel"""
+    global last_trace
+    last_trace = trace
+    timing_text.config(state='normal')
+    timing_text.delete('1.0', tk.END)
+    timing_text.insert(tk.END, trace.format_table())
+    timing_text.config(state='disabled')
+    timing_toggle_btn.config(state='normal')
+
+def toggle_timing():
+    """Expand or collapse the timing panel"""
+    if timing_frame.winfo_ismapped():
+        timing_frame.pack_forget()
+        timing_toggle_btn.config(text="▶ Timing Details")
+    else:
+        timing_frame.pack(pady=(0, 10), fill='x', padx=20, after=timing_toggle_btn)
+        timing_toggle_btn.config(text="▼ Timing Details")
+
+def save_trace_json():
+    """Save the last packet's trace as JSON"""
+    if not last_trace:
+        return
+    path = filedialog.asksaveasfilename(
+        title="Save Timing Trace",
+        defaultextension=".json",
+        initialfile=f"{last_trace.label or 'Listing Packet'} - trace.json",
+        filetypes=[("JSON files", "*.json")],
+        parent=root
+    )
+    if path:
+        last_trace.write_json(path)
+        print(f"DEBUG: Trace saved to {path}")
+
+def render_previews(photo_path, street_address, city_state, include_cover, include_instagram):
+    """Low-resolution cover and post previews as (caption, PIL image) pairs
+    
+    Runs off the Tk thread. The photo is decoded once per file; templates,
+    logo and fonts come from the shared in-memory caches.
+    """
+    global preview_photo
+    if preview_photo is None or preview_photo[0] != photo_path:
+        preview_photo = (photo_path, load_property_photo(photo_path))
+    photo = preview_photo[1]
+    
+    warn = lambda message: print(f"Warning: {message}")
+    images = []
+    if include_cover:
+        cover = listing_render.preview_cover(photo, street_address, city_state, warn=warn)
+        if cover:
+            images.append(("Cover Page", cover))
+    if include_instagram:
+        for preview in listing_render.preview_posts(photo, street_address, city_state, warn=warn):
+            images.append((preview['type'], preview['image']))
+    return images
+
+def schedule_preview(event=None):
+    """Redraw the preview once typing pauses for PREVIEW_DELAY_MS"""
+    if preview_state['job']:
+        root.after_cancel(preview_state['job'])
+    preview_state['job'] = root.after(PREVIEW_DELAY_MS, start_preview)
+
+def start_preview():
+    """Render the preview on a worker thread and poll for it, like the library check"""
+    preview_state['job'] = None
+    include_cover = bool(cover_var.get())
+    include_instagram = bool(instagram_var.get())
+    if not (COVER_AVAILABLE and cover_photo_path and (include_cover or include_instagram)):
+        preview_frame.pack_forget()
+        return
+    
+    # Only the newest preview is shown - an older one still rendering is dropped
+    preview_state['generation'] += 1
+    generation = preview_state['generation']
+    args = (cover_photo_path, street_entry.get().strip(), city_state_entry.get().strip(), include_cover, include_instagram)
+    result = {}
+    
+    def work():
+        start = time.perf_counter()
+        try:
+            result['images'] = render_previews(*args)
+        except Exception as e:
+            result['error'] = str(e)
+        result['seconds'] = time.perf_counter() - start
+    
+    worker = threading.Thread(target=work, name="preview", daemon=True)
+    worker.start()
+    
+    def poll():
+        if worker.is_alive():
+            root.after(25, poll)
+        elif generation == preview_state['generation']:
+            show_preview(result)
+    root.after(25, poll)
+
+def show_preview(result):
+    """Put rendered previews in the preview panel as thumbnails"""
+    for child in preview_images_frame.winfo_children():
+        child.destroy()
+    if 'error' in result:
+        print(f"DEBUG: Preview failed: {result['error']}")
+        preview_status.config(text=f"Preview unavailable: {result['error']}", fg='red')
+    else:
+        for caption, image in result['images']:
+            thumbnail = image.copy()
+            thumbnail.thumbnail(PREVIEW_THUMBNAIL_SIZE)
+            photo_image = ImageTk.PhotoImage(thumbnail)
+            label = tk.Label(preview_images_frame, image=photo_image, text=caption, compound='top',
+                             font=('System', 9), bg='#f0f0f0')
+            label.image = photo_image  # Keep a reference so Tk does not drop the image
+            label.pack(side='left', padx=4)
+        preview_status.config(text=f"Preview drawn in {result['seconds'] * 1000:.0f} ms - check the crop and that the address fits",
+                              fg='#666')
+    if not preview_frame.winfo_ismapped():
+        preview_frame.pack(pady=(0, 10), fill='x', padx=20, before=create_btn)
+
 # Initialize
-all_pdf_paths = []
-temp_dir = None
+all_pdf_sources = []
 cover_photo_path = None
+ingest_trace = None
+ingest_budget = None
+last_trace = None
+preview_photo = None  # (path, PropertyPhoto) decoded for previews
+preview_state = {'job': None, 'generation': 0}
+PREVIEW_DELAY_MS = 300  # typing pause before the preview redraws
+PREVIEW_THUMBNAIL_SIZE = (200, 180)
+
+# The window is only built when run as a script - worker processes used for
+# packet building re-import this module and must not open a second window
+if __name__ == "__main__":
+    # Start loading reportlab / Pillow / PyPDF2 while the window is built
+    capabilities.start()
+
+    # Create simple window
+    root = tk.Tk()
+    root.title("Hall Collins Listing Packet Combiner")
+    root.geometry("600x600")  # Made taller for logo
+    root.configure(bg='#f0f0f0')
+
+    # Create main frame with scrollbar
+    main_canvas = tk.Canvas(root, bg='#f0f0f0')
+    scrollbar = tk.Scrollbar(root, orient="vertical", command=main_canvas.yview)
+    scrollable_frame = tk.Frame(main_canvas, bg='#f0f0f0')
 
-# Create simple window
-root = tk.Tk()
-root.title("Hall Collins Listing Packet Combiner")
-root.geometry("600x600")  # Made taller for logo
-root.configure(bg='#f0f0f0')
-
-# Create main frame with scrollbar
-main_canvas = tk.Canvas(root, bg='#f0f0f0')
-scrollbar = tk.Scrollbar(root, orient="vertical", command=main_canvas.yview)
-scrollable_frame = tk.Frame(main_canvas, bg='#f0f0f0')
-
-scrollable_frame.bind(
-    "<Configure>",
-    lambda e: main_canvas.configure(scrollregion=main_canvas.bbox("all"))
-)
-
-main_canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-main_canvas.configure(yscrollcommand=scrollbar.set)
-
-# Pack the canvas and scrollbar
-main_canvas.pack(side="left", fill="both", expand=True)
-scrollbar.pack(side="right", fill="y")
-
-# Bind mousewheel to canvas for smooth scrolling with macOS native support
-def _on_mousewheel(event):
-    # Handle different platforms and scroll directions properly
-    if event.delta:
-        # Windows and macOS - use delta value directly
-        delta = event.delta
-        # Normalize delta for consistent scrolling speed
-        if abs(delta) > 100:
-            delta = delta // abs(delta) * 3  # Reduce sensitivity for large deltas
+    scrollable_frame.bind(
+        "<Configure>",
+        lambda e: main_canvas.configure(scrollregion=main_canvas.bbox("all"))
+    )
+
+    main_canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
+    main_canvas.configure(yscrollcommand=scrollbar.set)
+
+    # Pack the canvas and scrollbar
+    main_canvas.pack(side="left", fill="both", expand=True)
+    scrollbar.pack(side="right", fill="y")
+
+    # Bind mousewheel to canvas for smooth scrolling with macOS native support
+    def _on_mousewheel(event):
+        # Handle different platforms and scroll directions properly
+        if event.delta:
+            # Windows and macOS - use delta value directly
+            delta = event.delta
+            # Normalize delta for consistent scrolling speed
+            if abs(delta) > 100:
+                delta = delta // abs(delta) * 3  # Reduce sensitivity for large deltas
+            else:
+                delta = delta // 40  # Standard sensitivity
+            main_canvas.yview_scroll(-delta, "units")
         else:
-            delta = delta // 40  # Standard sensitivity
-        main_canvas.yview_scroll(-delta, "units")
-    else:
-        # Linux - use event.num
-        if event.num == 4:
-            main_canvas.yview_scroll(-1, "units")
-        elif event.num == 5:
-            main_canvas.yview_scroll(1, "units")
-
-# Bind scrolling events for all platforms with native behavior
-main_canvas.bind_all("<MouseWheel>", _on_mousewheel)  # Windows & macOS
-main_canvas.bind_all("<Button-4>", _on_mousewheel)    # Linux scroll up
-main_canvas.bind_all("<Button-5>", _on_mousewheel)    # Linux scroll down
-
-# Also bind to the scrollable frame for better coverage
-scrollable_frame.bind_all("<MouseWheel>", _on_mousewheel)
-scrollable_frame.bind_all("<Button-4>", _on_mousewheel)
-scrollable_frame.bind_all("<Button-5>", _on_mousewheel)
-
-# Hall Collins Logo - Enhanced loading with fallback
-logo_loaded = False
-print(f"DEBUG: Starting logo loading - PIL_AVAILABLE: {PIL_AVAILABLE}")
-
-try:
-    if PIL_AVAILABLE:  # Only try if PIL is available
-        logo_path = "templates/hall_collins_logo.png"
-        logo_full_path = os.path.join(os.getcwd(), logo_path)
-        
-        print(f"DEBUG: Looking for logo at: {logo_full_path}")
-        print(f"DEBUG: Logo exists: {os.path.exists(logo_full_path)}")
-        
-        if os.path.exists(logo_full_path):
-            print("DEBUG: Attempting to load logo image...")
-            # Load and resize logo
-            logo_image = Image.open(logo_full_path)
-            print("DEBUG: Logo image opened successfully")
+            # Linux - use event.num
+            if event.num == 4:
+                main_canvas.yview_scroll(-1, "units")
+            elif event.num == 5:
+                main_canvas.yview_scroll(1, "units")
+
+    # Bind scrolling events for all platforms with native behavior
+    main_canvas.bind_all("<MouseWheel>", _on_mousewheel)  # Windows & macOS
+    main_canvas.bind_all("<Button-4>", _on_mousewheel)    # Linux scroll up
+    main_canvas.bind_all("<Button-5>", _on_mousewheel)    # Linux scroll down
+
+    # Also bind to the scrollable frame for better coverage
+    scrollable_frame.bind_all("<MouseWheel>", _on_mousewheel)
+    scrollable_frame.bind_all("<Button-4>", _on_mousewheel)
+    scrollable_frame.bind_all("<Button-5>", _on_mousewheel)
+
+    # Hall Collins Logo - filled in once Pillow has loaded in the background
+    header_frame = tk.Frame(scrollable_frame, bg='#f0f0f0')
+    header_frame.pack()
+
+    def show_header():
+        """Show the logo, or the text title if it can't be loaded"""
+        logo_loaded = False
+        print(f"DEBUG: Starting logo loading - PIL_AVAILABLE: {PIL_AVAILABLE}")
+
+        try:
+            if PIL_AVAILABLE:  # Only try if PIL is available
+                logo_path = "templates/hall_collins_logo.png"
+                logo_full_path = os.path.join(os.getcwd(), logo_path)
             
-            # Resize to fit nicely (width=200, maintain aspect ratio)
-            logo_width = 200
-            logo_height = int(logo_image.height * (logo_width / logo_image.width))
-            logo_image = logo_image.resize((logo_width, logo_height), Image.Resampling.LANCZOS)
-            print("DEBUG: Logo image resized successfully")
+                print(f"DEBUG: Looking for logo at: {logo_full_path}")
+                print(f"DEBUG: Logo exists: {os.path.exists(logo_full_path)}")
             
-            logo_photo = ImageTk.PhotoImage(logo_image)
-            print("DEBUG: Logo converted to PhotoImage successfully")
+                if os.path.exists(logo_full_path):
+                    print("DEBUG: Attempting to load logo image...")
+                    # Load and resize logo
+                    logo_image = Image.open(logo_full_path)
+                    print("DEBUG: Logo image opened successfully")
+                
+                    # Resize to fit nicely (width=200, maintain aspect ratio)
+                    logo_width = 200
+                    logo_height = int(logo_image.height * (logo_width / logo_image.width))
+                    logo_image = logo_image.resize((logo_width, logo_height), Image.Resampling.LANCZOS)
+                    print("DEBUG: Logo image resized successfully")
+                
+                    logo_photo = ImageTk.PhotoImage(logo_image)
+                    print("DEBUG: Logo converted to PhotoImage successfully")
+                
+                    # Create logo label
+                    logo_label = tk.Label(header_frame, image=logo_photo, bg='#f0f0f0')
+                    logo_label.image = logo_photo  # Keep a reference
+                    logo_label.pack(pady=(20, 10))
+                    logo_loaded = True
+                    print("DEBUG: Hall Collins logo loaded and displayed successfully")
+                else:
+                    print("DEBUG: Logo file not found")
+            else:
+                print("DEBUG: PIL not available for logo loading")
             
-            # Create logo label
-            logo_label = tk.Label(scrollable_frame, image=logo_photo, bg='#f0f0f0')
-            logo_label.image = logo_photo  # Keep a reference
-            logo_label.pack(pady=(20, 10))
-            logo_loaded = True
-            print("DEBUG: Hall Collins logo loaded and displayed successfully")
-        else:
-            print("DEBUG: Logo file not found")
-    else:
-        print("DEBUG: PIL not available for logo loading")
-        
-except Exception as e:
-    print(f"DEBUG: Logo loading failed with exception: {e}")
-    import traceback
-    traceback.print_exc()
-    logo_loaded = False
-
-print(f"DEBUG: Logo loading result: {logo_loaded}")
-
-# Always show title - either logo failed or PIL not available
-if not logo_loaded:
-    print("DEBUG: Creating fallback title")
-    tk.Label(scrollable_frame, text="📄 Hall Collins Listing Packet Combiner",
-             font=('System', 18, 'bold'), bg='#f0f0f0', fg='#2C3E50').pack(pady=20)
-
-# Subtitle
-tk.Label(scrollable_frame, text="Professional Real Estate Listing Packet Creator",
-         font=('System', 12), bg='#f0f0f0', fg='#666').pack(pady=(0, 2))
-
-# Version note
-tk.Label(scrollable_frame, text="v1.4.0  •  Instagram posts now use same font as cover sheet",
-         font=('System', 9), bg='#f0f0f0', fg='#999999').pack(pady=(0, 16))
-
-# Select button
-tk.Button(scrollable_frame, text="📁 Select PDF, JPG or ZIP Files", command=select_and_process_files,
-         font=('System', 14), bg='#2C3E50', fg='black', width=25, height=2,
-         relief='flat', bd=0).pack(pady=10)
-
-# Recent Downloads section
-recent_frame = tk.Frame(scrollable_frame, bg='#f8f9fa', relief='solid', bd=1)
-recent_frame.pack(pady=10, fill='x', padx=20)
-
-# Recent Downloads header with refresh button
-recent_header_frame = tk.Frame(recent_frame, bg='#f8f9fa')
-recent_header_frame.pack(fill='x', pady=(10, 5))
-
-tk.Label(recent_header_frame, text="📥 Recent Downloads (click to select):", 
-         font=('System', 12, 'bold'), bg='#f8f9fa', fg='#2C3E50').pack(side='left')
-
-tk.Button(recent_header_frame, text="🔄", command=lambda: refresh_recent_downloads(),
-         font=('System', 10), bg='#6c757d', fg='white', width=3, height=1,
-         relief='flat', bd=0).pack(side='right', padx=(5, 10))
-
-# Recent downloads listbox
-recent_downloads_listbox = tk.Listbox(recent_frame, height=4, width=70, font=('System', 9), 
-                                     bg='white', relief='solid', bd=1, selectmode='single')
-recent_downloads_listbox.pack(pady=(0, 10), padx=10, fill='x')
-recent_downloads_listbox.bind('<Double-Button-1>', on_recent_file_select)
-recent_downloads_listbox.bind('<Return>', on_recent_file_select)
-
-# Populate recent downloads on startup
-refresh_recent_downloads()
-
-# File list - ALWAYS SHOWN
-tk.Label(scrollable_frame, text="Selected Files:", font=('System', 12, 'bold'), bg='#f0f0f0').pack(pady=(20, 5))
-file_listbox = tk.Listbox(scrollable_frame, height=8, width=70, font=('System', 10), 
-                         bg='white', relief='solid', bd=1)
-file_listbox.pack(pady=5, padx=20, fill='x')
-
-# Address fields - ALWAYS SHOWN (needed for basic functionality)
-tk.Label(scrollable_frame, text="Street Address (optional for basic PDF combining):", 
-         font=('System', 12, 'bold'), bg='#f0f0f0', fg='#2C3E50').pack(pady=(20, 5))
-street_entry = tk.Entry(scrollable_frame, font=('System', 12), width=50, relief='solid', bd=1, 
-                       highlightthickness=1, highlightcolor='#E91E63', bg='white')
-street_entry.pack(pady=5)
-
-tk.Label(scrollable_frame, text="City, State (optional for basic PDF combining):", 
-         font=('System', 12, 'bold'), bg='#f0f0f0', fg='#2C3E50').pack(pady=(10, 5))
-city_state_entry = tk.Entry(scrollable_frame, font=('System', 12), width=50, relief='solid', bd=1,
+        except Exception as e:
+            print(f"DEBUG: Logo loading failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            logo_loaded = False
+
+        print(f"DEBUG: Logo loading result: {logo_loaded}")
+
+        # Always show title - either logo failed or PIL not available
+        if not logo_loaded:
+            print("DEBUG: Creating fallback title")
+            tk.Label(header_frame, text="📄 Hall Collins Listing Packet Combiner",
+                     font=('System', 18, 'bold'), bg='#f0f0f0', fg='#2C3E50').pack(pady=20)
+
+    # Subtitle
+    tk.Label(scrollable_frame, text="Professional Real Estate Listing Packet Creator",
+             font=('System', 12), bg='#f0f0f0', fg='#666').pack(pady=(0, 2))
+
+    # Version note
+    tk.Label(scrollable_frame, text="v1.4.0  •  Instagram posts now use same font as cover sheet",
+             font=('System', 9), bg='#f0f0f0', fg='#999999').pack(pady=(0, 16))
+
+    # Select button
+    tk.Button(scrollable_frame, text="📁 Select PDF, JPG or ZIP Files", command=select_and_process_files,
+             font=('System', 14), bg='#2C3E50', fg='black', width=25, height=2,
+             relief='flat', bd=0).pack(pady=10)
+
+    # Recent Downloads section
+    recent_frame = tk.Frame(scrollable_frame, bg='#f8f9fa', relief='solid', bd=1)
+    recent_frame.pack(pady=10, fill='x', padx=20)
+
+    # Recent Downloads header with refresh button
+    recent_header_frame = tk.Frame(recent_frame, bg='#f8f9fa')
+    recent_header_frame.pack(fill='x', pady=(10, 5))
+
+    tk.Label(recent_header_frame, text="📥 Recent Downloads (click to select):", 
+             font=('System', 12, 'bold'), bg='#f8f9fa', fg='#2C3E50').pack(side='left')
+
+    tk.Button(recent_header_frame, text="🔄", command=lambda: refresh_recent_downloads(),
+             font=('System', 10), bg='#6c757d', fg='white', width=3, height=1,
+             relief='flat', bd=0).pack(side='right', padx=(5, 10))
+
+    # Recent downloads listbox
+    recent_downloads_listbox = tk.Listbox(recent_frame, height=4, width=70, font=('System', 9), 
+                                         bg='white', relief='solid', bd=1, selectmode='single')
+    recent_downloads_listbox.pack(pady=(0, 10), padx=10, fill='x')
+    recent_downloads_listbox.bind('<Double-Button-1>', on_recent_file_select)
+    recent_downloads_listbox.bind('<Return>', on_recent_file_select)
+
+    # Populate recent downloads on startup
+    refresh_recent_downloads()
+
+    # File list - ALWAYS SHOWN
+    tk.Label(scrollable_frame, text="Selected Files:", font=('System', 12, 'bold'), bg='#f0f0f0').pack(pady=(20, 5))
+    file_listbox = tk.Listbox(scrollable_frame, height=8, width=70, font=('System', 10), 
+                             bg='white', relief='solid', bd=1)
+    file_listbox.pack(pady=5, padx=20, fill='x')
+
+    # Address fields - ALWAYS SHOWN (needed for basic functionality)
+    tk.Label(scrollable_frame, text="Street Address (optional for basic PDF combining):", 
+             font=('System', 12, 'bold'), bg='#f0f0f0', fg='#2C3E50').pack(pady=(20, 5))
+    street_entry = tk.Entry(scrollable_frame, font=('System', 12), width=50, relief='solid', bd=1, 
                            highlightthickness=1, highlightcolor='#E91E63', bg='white')
-city_state_entry.pack(pady=5)
-
-# Cover page section - ALWAYS SHOWN with full interface
-print(f"DEBUG: About to create GUI section - COVER_AVAILABLE: {COVER_AVAILABLE}")
-
-cover_frame = tk.Frame(scrollable_frame, bg='#f0f0f0', relief='solid', bd=1)
-cover_frame.pack(pady=15, fill='x', padx=20)
-
-# ALWAYS create the full interface - just change colors/text based on availability
-print("DEBUG: Creating full cover page section - interface always visible")
-
-# Cover page checkbox with Hall Collins styling - ALWAYS SHOWN
-cover_var = tk.BooleanVar()
-if COVER_AVAILABLE:
-    checkbox_text = "📄 Include Hall Collins Cover Page"
-    checkbox_color = '#2C3E50'
-else:
-    checkbox_text = "📄 Include Hall Collins Cover Page (requires library installation)"
-    checkbox_color = '#999999'
-
-cover_checkbox = tk.Checkbutton(cover_frame, text=checkbox_text, 
-                               variable=cover_var, font=('System', 12, 'bold'), 
-                               bg='#f0f0f0', fg=checkbox_color, selectcolor='#f0f0f0',
-                               activebackground='#f0f0f0', activeforeground='#E91E63')
-cover_checkbox.pack(side='left', padx=10, pady=10)
-
-# Cover photo button with Hall Collins styling - ALWAYS SHOWN
-if COVER_AVAILABLE:
-    button_text = "📸 Select Property Photo"
-    button_bg = '#E91E63'
-else:
-    button_text = "📸 Select Property Photo (install libraries first)"
-    button_bg = '#CCCCCC'
-
-cover_photo_btn = tk.Button(cover_frame, text=button_text, 
-                           command=select_cover_photo, bg=button_bg, fg='black', 
-                           font=('System', 10, 'bold'), relief='raised', bd=2)
-cover_photo_btn.pack(side='right', padx=10, pady=10)
-
-# Instagram posts section - ALWAYS SHOWN
-instagram_frame = tk.Frame(scrollable_frame, bg='#f0f0f0', relief='solid', bd=1)
-instagram_frame.pack(pady=10, fill='x', padx=20)
-
-# Instagram posts checkbox with Hall Collins styling - ALWAYS SHOWN
-instagram_var = tk.BooleanVar()
-if COVER_AVAILABLE:
-    instagram_text = "📱 Create Instagram Posts (New Listing, Under Contract, Sold)"
-    instagram_color = '#2C3E50'
-else:
-    instagram_text = "📱 Create Instagram Posts (requires library installation)"
-    instagram_color = '#999999'
-
-instagram_checkbox = tk.Checkbutton(instagram_frame, text=instagram_text, 
-                                   variable=instagram_var, font=('System', 12, 'bold'), 
-                                   bg='#f0f0f0', fg=instagram_color, selectcolor='#f0f0f0',
+    street_entry.pack(pady=5)
+
+    tk.Label(scrollable_frame, text="City, State (optional for basic PDF combining):", 
+             font=('System', 12, 'bold'), bg='#f0f0f0', fg='#2C3E50').pack(pady=(10, 5))
+    city_state_entry = tk.Entry(scrollable_frame, font=('System', 12), width=50, relief='solid', bd=1,
+                               highlightthickness=1, highlightcolor='#E91E63', bg='white')
+    city_state_entry.pack(pady=5)
+    
+    # Redraw the preview as the address is typed
+    street_entry.bind('<KeyRelease>', schedule_preview)
+    city_state_entry.bind('<KeyRelease>', schedule_preview)
+
+    # Cover page section - ALWAYS SHOWN with full interface
+    # Built with the "available" look; apply_capabilities() greys it out if
+    # the background library check comes back negative
+    cover_frame = tk.Frame(scrollable_frame, bg='#f0f0f0', relief='solid', bd=1)
+    cover_frame.pack(pady=15, fill='x', padx=20)
+
+    # Cover page checkbox with Hall Collins styling - ALWAYS SHOWN
+    cover_var = tk.BooleanVar()
+    cover_checkbox = tk.Checkbutton(cover_frame, text="📄 Include Hall Collins Cover Page", 
+                                   variable=cover_var, command=schedule_preview, font=('System', 12, 'bold'), 
+                                   bg='#f0f0f0', fg='#2C3E50', selectcolor='#f0f0f0',
                                    activebackground='#f0f0f0', activeforeground='#E91E63')
-instagram_checkbox.pack(padx=10, pady=10)
+    cover_checkbox.pack(side='left', padx=10, pady=10)
 
-# Show library status message if needed
-if not COVER_AVAILABLE:
-    status_frame = tk.Frame(scrollable_frame, bg='#FFF3CD', relief='solid', bd=1)
-    status_frame.pack(pady=10, fill='x', padx=20)
+    # Cover photo button with Hall Collins styling - ALWAYS SHOWN
+    cover_photo_btn = tk.Button(cover_frame, text="📸 Select Property Photo", 
+                               command=select_cover_photo, bg='#E91E63', fg='black', 
+                               font=('System', 10, 'bold'), relief='raised', bd=2)
+    cover_photo_btn.pack(side='right', padx=10, pady=10)
+
+    # Instagram posts section - ALWAYS SHOWN
+    instagram_frame = tk.Frame(scrollable_frame, bg='#f0f0f0', relief='solid', bd=1)
+    instagram_frame.pack(pady=10, fill='x', padx=20)
+
+    # Instagram posts checkbox with Hall Collins styling - ALWAYS SHOWN
+    instagram_var = tk.BooleanVar()
+    instagram_checkbox = tk.Checkbutton(instagram_frame, text="📱 Create Instagram Posts (New Listing, Under Contract, Sold)", 
+                                       variable=instagram_var, command=schedule_preview, font=('System', 12, 'bold'), 
+                                       bg='#f0f0f0', fg='#2C3E50', selectcolor='#f0f0f0',
+                                       activebackground='#f0f0f0', activeforeground='#E91E63')
+    instagram_checkbox.pack(padx=10, pady=10)
+
+    print("DEBUG: Full GUI interface created - all elements always visible")
+
+    # Create button with Hall Collins styling
+    create_btn = tk.Button(scrollable_frame, text="🔗 Create Listing Packet", command=create_packet,
+             font=('System', 14, 'bold'), bg='#E91E63', fg='black', width=25, height=2,
+             relief='flat', bd=0)
+    create_btn.pack(pady=20)
     
-    status_label = tk.Label(status_frame, text="💡 To enable cover page features, run: INSTALL_REQUIREMENTS.command", 
-             font=('System', 11, 'bold'), bg='#FFF3CD', fg='#856404')
-    status_label.pack(pady=10)
+    # Preview - packed above the create button once there is something to show
+    preview_frame = tk.Frame(scrollable_frame, bg='#f0f0f0')
+    tk.Label(preview_frame, text="👁️ Preview", font=('System', 12, 'bold'), bg='#f0f0f0', fg='#2C3E50').pack()
+    preview_images_frame = tk.Frame(preview_frame, bg='#f0f0f0')
+    preview_images_frame.pack()
+    preview_status = tk.Label(preview_frame, text="", font=('System', 9), bg='#f0f0f0', fg='#666')
+    preview_status.pack()
+
+    def apply_capabilities():
+        """Update the window once the background library check has finished"""
+        wait_for_libraries()
+        print_startup_report(window_seconds)
+        show_header()
 
-print("DEBUG: Full GUI interface created - all elements always visible")
+        if not COVER_AVAILABLE:
+            cover_checkbox.config(text="📄 Include Hall Collins Cover Page (requires library installation)", fg='#999999')
+            cover_photo_btn.config(text="📸 Select Property Photo (install libraries first)", bg='#CCCCCC')
+            instagram_checkbox.config(text="📱 Create Instagram Posts (requires library installation)", fg='#999999')
 
-# Create button with Hall Collins styling
-tk.Button(scrollable_frame, text="🔗 Create Listing Packet", command=create_packet,
-         font=('System', 14, 'bold'), bg='#E91E63', fg='black', width=25, height=2,
-         relief='flat', bd=0).pack(pady=20)
+            # Show library status message
+            library_frame = tk.Frame(scrollable_frame, bg='#FFF3CD', relief='solid', bd=1)
+            library_frame.pack(pady=10, fill='x', padx=20, before=create_btn)
+            tk.Label(library_frame, text="💡 To enable cover page features, run: INSTALL_REQUIREMENTS.command", 
+                     font=('System', 11, 'bold'), bg='#FFF3CD', fg='#856404').pack(pady=10)
 
-# Refresh button for new property
-def refresh_app():
-    """Reset the application for a new property"""
-    global all_pdf_paths, temp_dir, cover_photo_path
+    def poll_capabilities():
+        if capabilities.done():
+            apply_capabilities()
+        else:
+            root.after(25, poll_capabilities)
+
+    # Refresh button for new property
+    def refresh_app():
+        """Reset the application for a new property"""
+        global all_pdf_sources, cover_photo_path, ingest_trace, ingest_budget
     
-    # Clear file list
-    file_listbox.delete(0, tk.END)
+        # Clear file list
+        file_listbox.delete(0, tk.END)
     
-    # Reset PDF paths
-    all_pdf_paths = []
+        # Reset PDF sources, closing any held in memory and dropping queued conversions
+        packet_engine.close_sources(all_pdf_sources)
+        all_pdf_sources = []
+        ingest_trace = None
+        ingest_budget = None
     
-    # Clear temp directory
-    if temp_dir and os.path.exists(temp_dir):
-        shutil.rmtree(temp_dir)
-        temp_dir = None
+        # Reset cover photo
+        cover_photo_path = None
+        if COVER_AVAILABLE:
+            cover_photo_btn.config(text="📸 Select Property Photo")
+        else:
+            cover_photo_btn.config(text="📸 Select Property Photo (install libraries first)")
     
-    # Reset cover photo
-    cover_photo_path = None
-    if COVER_AVAILABLE:
-        cover_photo_btn.config(text="📸 Select Property Photo")
-    else:
-        cover_photo_btn.config(text="📸 Select Property Photo (install libraries first)")
+        # Clear address fields
+        street_entry.delete(0, tk.END)
+        city_state_entry.delete(0, tk.END)
     
-    # Clear address fields
-    street_entry.delete(0, tk.END)
-    city_state_entry.delete(0, tk.END)
+        # Reset checkboxes
+        if cover_var:
+            cover_var.set(False)
+        if instagram_var:
+            instagram_var.set(False)
     
-    # Reset checkboxes
-    if cover_var:
-        cover_var.set(False)
-    if instagram_var:
-        instagram_var.set(False)
+        # Hide the preview until a new photo is chosen
+        schedule_preview()
     
-    # Refresh recent downloads list
-    refresh_recent_downloads()
+        # Refresh recent downloads list
+        refresh_recent_downloads()
     
-    # Reset status
-    status_label.config(text="Ready for new property", fg="green")
+        # Reset status
+        status_label.config(text="Ready for new property", fg="green")
     
-    print("DEBUG: App refreshed for new property")
+        print("DEBUG: App refreshed for new property")
 
-tk.Button(scrollable_frame, text="🔄 New Property", command=refresh_app,
-         font=('System', 12), bg='#95A5A6', fg='black', width=15, height=1,
-         relief='flat', bd=0).pack(pady=(5, 15))
+    tk.Button(scrollable_frame, text="🔄 New Property", command=refresh_app,
+             font=('System', 12), bg='#95A5A6', fg='black', width=15, height=1,
+             relief='flat', bd=0).pack(pady=(5, 15))
+
+    # Status
+    status_label = tk.Label(scrollable_frame, text="Ready to select files", 
+                           font=('System', 11), bg='#f0f0f0', fg='blue')
+    status_label.pack(pady=10)
 
-# Status
-status_label = tk.Label(scrollable_frame, text="Ready to select files", 
-                       font=('System', 11), bg='#f0f0f0', fg='blue')
-status_label.pack(pady=10)
+    # Timing details - collapsed until a packet has been created
+    timing_toggle_btn = tk.Button(scrollable_frame, text="▶ Timing Details", command=toggle_timing,
+                                  font=('System', 10), bg='#f0f0f0', fg='#666', relief='flat', bd=0,
+                                  state='disabled')
+    timing_toggle_btn.pack(pady=(0, 5))
+    timing_frame = tk.Frame(scrollable_frame, bg='#f0f0f0')
+    timing_text = tk.Text(timing_frame, height=10, width=70, font=('Courier', 10),
+                          bg='white', relief='solid', bd=1, state='disabled')
+    timing_text.pack(fill='x')
+    tk.Button(timing_frame, text="💾 Save as JSON", command=save_trace_json,
+             font=('System', 10), bg='#95A5A6', fg='black', relief='flat', bd=0).pack(pady=5)
 
-print("Ultra Simple PDF Combiner ready")
-root.mainloop()
+    print("Ultra Simple PDF Combiner ready")
+    window_seconds = time.perf_counter() - _STARTUP_START
+    root.after(25, poll_capabilities)
+    root.mainloop()
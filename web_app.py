@@ -5,19 +5,15 @@ Streamlit version for web browser access
 """
 
 import streamlit as st
+import functools
 import os
-import tempfile
-import zipfile
-import shutil
-from io import BytesIO
+import time
 import base64
-from PyPDF2 import PdfMerger
-import PyPDF2
+import archive_ingest
+import packet_engine
+import packet_trace
+import resource_budget
 
-# Enhanced error handling for optional libraries
-COVER_AVAILABLE = False
-PIL_AVAILABLE = False
-REPORTLAB_AVAILABLE = False
 INSTAGRAM_VERSION = "3.8"  # Increment this when Instagram code changes
 APP_VERSION = "2.5.8"  # Main app version
 UPDATE_NOTES = "Instagram posts now use same Times New Roman font as the cover sheet for consistent branding"  # Brief note about what was updated
@@ -52,581 +48,208 @@ VERSION_HISTORY = {
     "1.0.0": "Initial desktop application with basic PDF combining functionality"
 }
 
-# Test ReportLab
-try:
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import letter
-    from reportlab.lib.units import inch
-    from reportlab.lib import colors
-    REPORTLAB_AVAILABLE = True
-except Exception:
-    REPORTLAB_AVAILABLE = False
+# Rendering lives in listing_render so the batch tool can share it
+from listing_render import COVER_AVAILABLE, PIL_AVAILABLE
+import listing_render
 
-# Test PIL/Pillow
-try:
-    from PIL import Image
-    PIL_AVAILABLE = True
-except Exception:
-    PIL_AVAILABLE = False
-
-# Final determination
-COVER_AVAILABLE = REPORTLAB_AVAILABLE and PIL_AVAILABLE
-
-def parse_address(full_address):
-    """Parse full address into street address and city/state"""
-    parts = [part.strip() for part in full_address.split(',')]
-    
-    if len(parts) >= 3:
-        street = parts[0]
-        city_state = f"{parts[1]}, {parts[2]}"
-    elif len(parts) == 2:
-        street = parts[0]
-        city_state = parts[1]
-    else:
-        words = full_address.split()
-        if len(words) >= 2:
-            street = ' '.join(words[:-1])
-            city_state = words[-1]
-        else:
-            street = full_address
-            city_state = ""
-    
-    return street, city_state
-
-def create_cover_page(photo_bytes, street_address, city_state, output_path):
+def create_cover_page(photo, street_address, city_state, output_path):
     """Create custom cover page matching the original desktop app design"""
-    if not COVER_AVAILABLE:
-        return False
-    
-    try:
-        # Use standard letter size - 8.5" x 11"
-        page_width = 8.5 * inch
-        page_height = 11 * inch
-        
-        # Create the PDF
-        c = canvas.Canvas(output_path, pagesize=(page_width, page_height))
-        
-        # First, draw the Hall Collins template as the base (full page)
-        template_image_path = "templates/1) HC -  Template Bottom Photo.png"
-        if os.path.exists(template_image_path):
-            try:
-                # Draw the complete template first - covers entire page
-                c.drawImage(template_image_path, 0, 0, width=page_width, height=page_height)
-            except Exception as e:
-                st.warning(f"Could not add template base: {e}")
-        else:
-            st.warning(f"Template file not found: {template_image_path}")
-        
-        # Add property photo overlay (covers the photo area of the template)
-        if photo_bytes:
-            temp_photo = tempfile.mktemp(suffix='.jpg')
-            temp_cropped_photo = tempfile.mktemp(suffix='_cropped.jpg')
-            try:
-                with open(temp_photo, 'wb') as f:
-                    f.write(photo_bytes)
-                
-                # Define target dimensions for photo area
-                target_width = page_width  # Full page width
-                target_height = 7.12 * inch  # Exactly 7.12 inches tall
-                target_aspect = target_width / target_height
-                
-                # Load and process the image to maintain aspect ratio
-                if PIL_AVAILABLE:
-                    img = Image.open(temp_photo)
-                    img_width, img_height = img.size
-                    img_aspect = img_width / img_height
-                    
-                    # Determine how to crop the image to fit the target aspect ratio
-                    if img_aspect > target_aspect:
-                        # Image is wider than target - crop the width
-                        new_height = img_height
-                        new_width = int(new_height * target_aspect)
-                        left = (img_width - new_width) // 2
-                        crop_box = (left, 0, left + new_width, new_height)
-                    else:
-                        # Image is taller than target - crop the height
-                        new_width = img_width
-                        new_height = int(new_width / target_aspect)
-                        top = (img_height - new_height) // 2
-                        crop_box = (0, top, new_width, top + new_height)
-                    
-                    # Crop and save the processed image
-                    cropped_img = img.crop(crop_box)
-                    cropped_img.save(temp_cropped_photo, 'JPEG', quality=95)
-                    
-                    # Use the cropped image
-                    final_photo_path = temp_cropped_photo
-                else:
-                    # Fallback to original image if PIL not available
-                    final_photo_path = temp_photo
-                
-                # Position for photo area
-                photo_x = 0  # Start at absolute left edge
-                photo_y = page_height - target_height  # Position from top: 11" - 7.12" = 3.88" from bottom
-                
-                # Draw the properly cropped photo over the template
-                c.drawImage(final_photo_path, photo_x, photo_y, width=target_width, height=target_height)
-                
-            except Exception as e:
-                st.warning(f"Could not add photo overlay: {e}")
-            finally:
-                # Clean up temporary files
-                for temp_file in [temp_photo, temp_cropped_photo]:
-                    if os.path.exists(temp_file):
-                        os.unlink(temp_file)
-        
-        # Add Hall Collins white logo overlay on the photo
-        logo_overlay_path = "templates/HC_Solid White Logo_Transparent Back.png"
-        if os.path.exists(logo_overlay_path):
-            try:
-                # Size the logo 50% larger (5.75" * 1.5 = 8.625" wide)
-                logo_width = 8.625 * inch
-                logo_img = PIL_AVAILABLE and Image.open(logo_overlay_path)
-                if logo_img:
-                    logo_height = logo_img.height * (logo_width / logo_img.width)
-                    
-                    # Position logo centered horizontally, with CENTER 1" from top
-                    logo_x = (page_width - logo_width) / 2
-                    logo_y = page_height - (1.0 * inch) - (logo_height / 2)
-                    
-                    c.drawImage(logo_overlay_path, logo_x, logo_y, width=logo_width, height=logo_height, mask='auto')
-                
-            except Exception as logo_e:
-                st.warning(f"Could not add logo overlay: {logo_e}")
-        
-        # Add address text overlays on the photo
-        if street_address:
-            try:
-                # Try fonts in order of preference - using regular (non-bold) fonts
-                font_name = "Times-Roman"
-                for font_option in ["PlayfairDisplay-Regular", "EBGaramond-Regular", "Times-Roman"]:
-                    try:
-                        c.setFont(font_option, 36)
-                        font_name = font_option
-                        break
-                    except:
-                        continue
-                
-                c.setFillColor(colors.white)
-                # Position street address text on the photo - convert to uppercase
-                street_address_upper = street_address.upper()
-                text_width = c.stringWidth(street_address_upper, font_name, 36)
-                x_position = (page_width - text_width) / 2
-                c.drawString(x_position, 3.21 * inch, street_address_upper)
-            except Exception as text_e:
-                st.warning(f"Could not add street address: {text_e}")
-        
-        if city_state:
-            try:
-                # Try fonts in order of preference - using regular (non-bold) fonts  
-                font_name = "Times-Roman"
-                for font_option in ["PlayfairDisplay-Regular", "EBGaramond-Regular", "Times-Roman"]:
-                    try:
-                        c.setFont(font_option, 24)
-                        font_name = font_option
-                        break
-                    except:
-                        continue
-                
-                c.setFillColor(colors.white)
-                # Position city/state text on the photo - convert to uppercase
-                city_state_upper = city_state.upper()
-                text_width = c.stringWidth(city_state_upper, font_name, 24)
-                x_position = (page_width - text_width) / 2
-                c.drawString(x_position, 2.58 * inch, city_state_upper)
-            except Exception as text_e:
-                st.warning(f"Could not add city/state: {text_e}")
-        
-        # Save the PDF
-        c.save()
-        return True
-        
-    except Exception as e:
-        st.error(f"Error creating cover page: {e}")
-        return False
-
-def extract_pdfs_from_zip(zip_bytes):
-    """Extract PDF files from ZIP archive"""
-    pdf_files = []
-    
-    try:
-        with zipfile.ZipFile(BytesIO(zip_bytes), 'r') as zip_ref:
-            for file_info in zip_ref.filelist:
-                if file_info.filename.lower().endswith('.pdf'):
-                    pdf_content = zip_ref.read(file_info.filename)
-                    pdf_files.append({
-                        'name': file_info.filename,
-                        'content': pdf_content
-                    })
-        return pdf_files
-    except Exception as e:
-        st.error(f"Error extracting ZIP: {e}")
-        return []
+    return listing_render.create_cover_page(photo, street_address, city_state, output_path, warn=st.warning)
 
-def create_instagram_posts(photo_bytes, street_address, city_state):
+def create_instagram_posts(photo, street_address, city_state, encoder=listing_render.DEFAULT_POST_ENCODER):
     """Create 3 Instagram posts using template PNG files and property photo"""
     if not PIL_AVAILABLE:
         return []
-        
-    created_files = []
     
-    # Instagram post specifications
-    post_width = 1080  # pixels
-    post_height = 1350  # pixels
-    photo_width = 1080  # Match post width for proper aspect ratio
-    photo_height = int(1085.2)  # pixels - reduced by 5 pixels to avoid covering colored banner
+    fonts = listing_render.load_instagram_fonts()
+    main_font_details, small_font_details = fonts[2], fonts[3]
     
-    # Template files with specific positioning and colors for each type
-    templates = [
-        ("templates/Instagram New Post Template.png", "New Listing", "centered_offset", 100, 1206, "white"),
-        ("templates/Instagram Under Contract Post Template.png", "Under Contract", "centered_offset", 100, 1206, "#173348"),
-        ("templates/Instagram Sold Post Template.png", "Sold", "centered_offset", 100, 1206, "#173348")
-    ]
+    # Log font loading results
+    st.success(f"✅ Main font loaded: {main_font_details}")
+    st.success(f"✅ Small font loaded: {small_font_details}")
     
-    try:
-        from PIL import ImageDraw, ImageFont
-        
-        # Load fonts once at the beginning for consistency across all posts
-        main_font = None
-        small_font = None
-        main_font_details = ""
-        small_font_details = ""
-        
-        # Load main font (65pt) - Try prettier fonts first, then fall back to universals
-        main_font_loaded = False
-        
-        # Try prettier, more elegant fonts first
-        elegant_fonts = [
-            # Microsoft fonts (if available)
-            ("/usr/share/fonts/truetype/msttcorefonts/cambria.ttf", "Cambria"),
-            ("/usr/share/fonts/truetype/msttcorefonts/georgia.ttf", "Georgia"),
-            ("/usr/share/fonts/truetype/msttcorefonts/times.ttf", "Times New Roman"),
-            # Google Fonts (sometimes available)
-            ("/usr/share/fonts/truetype/lato/Lato-Regular.ttf", "Lato"),
-            ("/usr/share/fonts/truetype/opensans/OpenSans-Regular.ttf", "Open Sans"),
-            # Linux serif alternatives
-            ("/usr/share/fonts/truetype/liberation/LiberationSerif-Regular.ttf", "Liberation Serif"),
-            ("/usr/share/fonts/truetype/libertinus/LibertinusSerif-Regular.otf", "Libertinus Serif"),
-            # Standard but clean fonts
-            ("/usr/share/fonts/truetype/dejavu/DejaVuSerif.ttf", "DejaVu Serif"),
-            ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "DejaVu Sans"),
-        ]
-        
-        for font_path, font_name in elegant_fonts:
-            try:
-                main_font = ImageFont.truetype(font_path, 65)
-                main_font_details = f"{font_name} at 65pt - FOUND at {font_path}"
-                main_font_loaded = True
-                break
-            except Exception as e:
-                continue
-        
-        if not main_font_loaded:
-            try:
-                # Try macOS fonts for local development - Times New Roman.ttf is most reliable
-                for font_path, font_name in [
-                    ("/System/Library/Fonts/Supplemental/Times New Roman.ttf", "Times New Roman (macOS)"),
-                    ("/System/Library/Fonts/Cambria.ttc", "Cambria (macOS)"),
-                    ("/System/Library/Fonts/Georgia.ttf", "Georgia (macOS)"),
-                    ("/System/Library/Fonts/Times.ttc", "Times (macOS)"),
-                    ("/System/Library/Fonts/Helvetica.ttc", "Helvetica (macOS)")
-                ]:
-                    try:
-                        main_font = ImageFont.truetype(font_path, 65)
-                        main_font_details = f"{font_name} at 65pt"
-                        main_font_loaded = True
-                        break
-                    except:
-                        continue
-            except:
-                pass
-        
-        if not main_font_loaded:
-            # Last resort - default font
-            main_font = ImageFont.load_default()
-            main_font_details = "LAST RESORT: Basic default font - no system fonts found"
-        
-        # Load small font (45pt) - Match the elegant main font
-        small_font_loaded = False
-        
-        # If we successfully loaded an elegant font for main font, use same for small font
-        if main_font_loaded and not "default" in main_font_details.lower():
-            for font_path, font_name in elegant_fonts:
-                try:
-                    small_font = ImageFont.truetype(font_path, 45)
-                    small_font_details = f"{font_name} at 45pt - FOUND at {font_path}"
-                    small_font_loaded = True
-                    break
-                except:
-                    continue
-        
-        if not small_font_loaded:
-            try:
-                # Try macOS fonts for local development - Times New Roman.ttf is most reliable
-                for font_path, font_name in [
-                    ("/System/Library/Fonts/Supplemental/Times New Roman.ttf", "Times New Roman (macOS)"),
-                    ("/System/Library/Fonts/Cambria.ttc", "Cambria (macOS)"),
-                    ("/System/Library/Fonts/Georgia.ttf", "Georgia (macOS)"),
-                    ("/System/Library/Fonts/Times.ttc", "Times (macOS)"),
-                    ("/System/Library/Fonts/Helvetica.ttc", "Helvetica (macOS)")
-                ]:
-                    try:
-                        small_font = ImageFont.truetype(font_path, 45)
-                        small_font_details = f"{font_name} at 45pt"
-                        small_font_loaded = True
-                        break
-                    except:
-                        continue
-            except:
-                pass
-        
-        if not small_font_loaded:
-            # Use the main font as fallback
-            small_font = main_font
-            small_font_details = "Using main font as fallback"
-        
-        # Log font loading results with detailed debugging
-        st.success(f"✅ Main font loaded: {main_font_details}")
-        st.success(f"✅ Small font loaded: {small_font_details}")
-        
-        # Show font quality level
-        if any(elegant in main_font_details for elegant in ["Cambria", "Georgia", "Times New Roman", "Lato", "Open Sans"]):
-            st.success("🎨 PREMIUM FONT: Using elegant typography!")
-        elif any(good in main_font_details for good in ["Liberation Serif", "Libertinus", "DejaVu Serif"]):
-            st.info("✨ GOOD FONT: Using professional serif font")
-        elif "DejaVu Sans" in main_font_details:
-            st.info("📝 STANDARD FONT: Using clean sans-serif")
-        elif "macOS" in main_font_details:
-            st.info("🍎 Using macOS system font - testing locally")
-        elif "default" in main_font_details.lower():
-            st.error("⚠️ BASIC FONT: No system fonts available - text may be small")
-        
-        for template_file, post_type, text_alignment, text_x, text_y, text_color in templates:
-            if not os.path.exists(template_file):
-                st.warning(f"Template not found: {template_file}")
-                continue
-                
-            try:
-                # Create new image with Instagram dimensions
-                instagram_post = Image.new('RGB', (post_width, post_height), 'white')
-                
-                # Load and apply template as background
-                template_img = Image.open(template_file)
-                template_img = template_img.resize((post_width, post_height), Image.Resampling.LANCZOS)
-                
-                if template_img.mode == 'RGBA':
-                    instagram_post.paste(template_img, (0, 0), template_img)
-                else:
-                    instagram_post.paste(template_img, (0, 0))
-                
-                # Overlay property photo
-                if photo_bytes:
-                    property_photo = Image.open(BytesIO(photo_bytes))
-                    
-                    # Calculate proper cropping to maintain aspect ratio
-                    original_width, original_height = property_photo.size
-                    target_aspect = photo_width / photo_height
-                    original_aspect = original_width / original_height
-                    
-                    if original_aspect > target_aspect:
-                        # Photo is wider than needed, crop width
-                        new_height = original_height
-                        new_width = int(new_height * target_aspect)
-                        left = (original_width - new_width) // 2
-                        crop_box = (left, 0, left + new_width, new_height)
-                    else:
-                        # Photo is taller than needed, crop height
-                        new_width = original_width
-                        new_height = int(new_width / target_aspect)
-                        top = (original_height - new_height) // 2
-                        crop_box = (0, top, new_width, top + new_height)
-                    
-                    # Crop and resize to exact specifications
-                    property_photo = property_photo.crop(crop_box)
-                    property_photo = property_photo.resize((photo_width, photo_height), Image.Resampling.LANCZOS)
-                    
-                    # Paste photo at top center
-                    photo_x = (post_width - photo_width) // 2
-                    photo_y = 0
-                    instagram_post.paste(property_photo, (photo_x, photo_y))
-                
-                # Add address text overlay
-                if street_address:
-                    try:
-                        draw = ImageDraw.Draw(instagram_post)
-                        
-                        # Use pre-loaded font
-                        font = main_font
-                        st.info(f"🔍 {post_type} - Using font: {main_font_details}")
-                        
-                        # Convert street address to uppercase for consistent branding
-                        street_address_upper = street_address.upper()
-                        
-                        # Calculate text positioning based on post type - exact logic from original
-                        if text_alignment == "centered_offset":
-                            # For Under Contract: center text with offset
-                            text_width = draw.textbbox((0, 0), street_address_upper, font=font)[2]
-                            text_x_final = (post_width // 2) - (text_width // 2) + text_x  # Center and offset by text_x
-                        elif text_alignment == "centered":
-                            # For New Listing and Sold: center text perfectly
-                            text_width = draw.textbbox((0, 0), street_address_upper, font=font)[2]
-                            text_x_final = (post_width - text_width) // 2  # Perfect center
-                        else:
-                            # For other cases: use absolute positioning
-                            text_x_final = text_x
-                        
-                        text_position = (text_x_final, text_y)
-                        
-                        # Add street address text with specified color
-                        text_bbox = draw.textbbox((0, 0), street_address_upper, font=font)
-                        rendered_text_height = text_bbox[3] - text_bbox[1]
-                        st.info(f"🔍 {post_type} - Street address height: {rendered_text_height}px (expected ~70px for 70pt font)")
-                        draw.text(text_position, street_address_upper, fill=text_color, font=font)
-                        
-                        # Add city/state below street address if available
-                        if city_state:
-                            try:
-                                # Use pre-loaded small font and reduce spacing
-                                city_font = small_font
-                                st.info(f"🔍 {post_type} - Using small font: {small_font_details}")
-                                
-                                # Convert city/state to uppercase for consistent branding
-                                city_state_upper = city_state.upper()
-                                
-                                # Position city/state below street address with same alignment
-                                if text_alignment == "centered_offset":
-                                    city_text_width = draw.textbbox((0, 0), city_state_upper, font=city_font)[2]
-                                    city_x_final = (post_width // 2) - (city_text_width // 2) + text_x
-                                elif text_alignment == "centered":
-                                    city_text_width = draw.textbbox((0, 0), city_state_upper, font=city_font)[2]
-                                    city_x_final = (post_width - city_text_width) // 2  # Perfect center
-                                else:
-                                    city_x_final = text_x
-                                
-                                # Reduced spacing: 75px between lines (was 90px) to bring city/state closer
-                                city_position = (city_x_final, text_y + 75)
-                                draw.text(city_position, city_state_upper, fill=text_color, font=city_font)
-                            except Exception as city_e:
-                                st.warning(f"Could not add city/state text: {city_e}")
-                        
-                    except Exception as text_e:
-                        st.warning(f"Could not add address text to {post_type}: {text_e}")
-                
-                # Convert to bytes for download
-                output_buffer = BytesIO()
-                instagram_post.save(output_buffer, format='PNG', quality=95)
-                
-                created_files.append({
-                    'name': f"Instagram - {post_type} - {street_address}.png",
-                    'data': output_buffer.getvalue(),
-                    'type': post_type
-                })
-                
-            except Exception as e:
-                st.warning(f"Could not create {post_type} Instagram post: {e}")
-                continue
-                
-    except Exception as e:
-        st.error(f"Error creating Instagram posts: {e}")
+    # Show font quality level
+    if any(elegant in main_font_details for elegant in ["Cambria", "Georgia", "Times New Roman", "Lato", "Open Sans"]):
+        st.success("🎨 PREMIUM FONT: Using elegant typography!")
+    elif any(good in main_font_details for good in ["Liberation Serif", "Libertinus", "DejaVu Serif"]):
+        st.info("✨ GOOD FONT: Using professional serif font")
+    elif "DejaVu Sans" in main_font_details:
+        st.info("📝 STANDARD FONT: Using clean sans-serif")
+    elif "macOS" in main_font_details:
+        st.info("🍎 Using macOS system font - testing locally")
+    elif "default" in main_font_details.lower():
+        st.error("⚠️ BASIC FONT: No system fonts available - text may be small")
     
-    return created_files
+    return listing_render.create_instagram_posts(photo, street_address, city_state, warn=st.warning, fonts=fonts, encoder=encoder)
 
-def convert_jpg_to_pdf(jpg_bytes, filename):
-    """Convert JPG to PDF"""
-    if not PIL_AVAILABLE:
-        return None
-    
-    try:
-        # Create PDF from JPG
-        img = Image.open(BytesIO(jpg_bytes))
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        pdf_bytes = BytesIO()
-        img.save(pdf_bytes, format='PDF')
-        
-        return {
-            'name': filename.replace('.jpg', '.pdf').replace('.jpeg', '.pdf'),
-            'content': pdf_bytes.getvalue()
-        }
-    except Exception as e:
-        st.error(f"Error converting JPG to PDF: {e}")
+def show_compression_report(report):
+    """Show which size-governor step a packet stopped at and what each cost"""
+    if report['met']:
+        st.info(f"🎯 {packet_engine.format_compression_report(report)}")
+    else:
+        st.warning(f"⚠️ Still over budget: {packet_engine.format_compression_report(report)}")
+
+def prepare_photo_traced(photo_bytes, trace, budget=None):
+    """Decode the property photo once for the cover and every post, as the 'photo decode' stage"""
+    if not photo_bytes or not PIL_AVAILABLE:
         return None
+    with trace.span('photo decode', bytes_in=len(photo_bytes)) as span:
+        try:
+            photo = listing_render.PropertyPhoto(photo_bytes, budget=budget)
+        except Exception as e:
+            st.warning(f"Could not read property photo: {e}")
+            return None
+        span.detail = f"{photo.original_size[0]}x{photo.original_size[1]} decoded at {photo.decoded_size[0]}x{photo.decoded_size[1]}"
+    return photo
+
+def preview_photo(photo_bytes):
+    """PropertyPhoto for previews, decoded once per uploaded photo and kept in the session.
 
-def compress_pdf(pdf_bytes, target_size_mb=20):
-    """Compress PDF to reduce file size"""
+    Previewing a photo is a job of its own: it is decoded under a Budget kept
+    with it, so an oversized photo is downscaled or refused here too and the
+    notes say so.
+    """
+    digest = listing_render.render_cache.photo_digest(photo_bytes)
+    held = st.session_state.get('preview_photo')
+    if not held or held[0] != digest:
+        budget = resource_budget.Budget()
+        st.session_state.preview_photo = (digest, listing_render.PropertyPhoto(photo_bytes, budget=budget))
+    return st.session_state.preview_photo[1]
+
+def show_preview(photo_bytes, street_address, city_state, include_cover, include_instagram):
+    """Low-resolution cover and post previews, redrawn from cached assets on every address change"""
+    start = time.perf_counter()
+    messages = []
     try:
-        from PyPDF2 import PdfReader, PdfWriter
-        
-        # Read the PDF
-        reader = PdfReader(BytesIO(pdf_bytes))
-        writer = PdfWriter()
-        
-        # Add all pages with compression
-        for page in reader.pages:
-            # Compress page content
-            page.compress_content_streams()
-            writer.add_page(page)
-        
-        # Set compression level
-        writer.add_metadata(reader.metadata)
-        
-        # Write compressed PDF
-        output_buffer = BytesIO()
-        writer.write(output_buffer)
-        compressed_bytes = output_buffer.getvalue()
-        
-        # Check if we achieved target size
-        original_size_mb = len(pdf_bytes) / (1024 * 1024)
-        compressed_size_mb = len(compressed_bytes) / (1024 * 1024)
-        
-        st.info(f"📊 PDF Compression: {original_size_mb:.1f} MB → {compressed_size_mb:.1f} MB ({(1 - compressed_size_mb/original_size_mb)*100:.1f}% reduction)")
-        
-        return compressed_bytes
-        
+        photo = preview_photo(photo_bytes)
     except Exception as e:
-        st.warning(f"Could not compress PDF: {e}. Using original file.")
-        return pdf_bytes
+        st.warning(f"Could not read property photo: {e}")
+        return
+    
+    images = []
+    if include_cover and COVER_AVAILABLE:
+        cover = listing_render.preview_cover(photo, street_address, city_state, warn=messages.append)
+        if cover:
+            images.append(("Cover Page", cover))
+    if include_instagram:
+        for preview in listing_render.preview_posts(photo, street_address, city_state, warn=messages.append):
+            images.append((preview['type'], preview['image']))
+    
+    with st.expander("👁️ Preview", expanded=True):
+        if images:
+            for column, (caption, image) in zip(st.columns(len(images)), images):
+                column.image(image, caption=caption)
+        for message in messages:
+            st.warning(f"⚠️ {message}")
+        for note in photo.budget.notes:
+            st.info(f"🛡️ {note}")
+        st.caption(f"Low-resolution preview drawn in {(time.perf_counter() - start) * 1000:.0f} ms - "
+                   f"check the crop and that the address fits before creating the full files")
 
-def create_packet(pdf_files, street_address, city_state, cover_photo_bytes, include_cover, compress_pdf_option=True):
-    """Create the final PDF packet"""
+def create_packet(pdf_files, street_address, city_state, cover_photo, include_cover, compress_pdf_option=True, trace=None,
+                  budget=None):
+    """Create the final PDF packet on disk and return (path, merge summary)
+    
+    Sources are merged one object at a time straight into a temp file, so
+    memory use does not grow with the size of the packet. Compression runs
+    while pages are copied rather than as a second parse of the output, and
+    larger packets are normalized document-by-document in a process pool.
+    Cover, merge and compress stages are recorded in trace when given.
+    cover_photo is a listing_render.PropertyPhoto (or raw photo bytes).
+    Documents past the budget's page cap are refused and shown as warnings.
+    Both are None when the packet could not be created.
+    """
+    trace = trace or packet_trace.PacketTrace(street_address)
+    cover_path = None
+    packet_path = None
     try:
-        merger = PdfMerger()
+        packet_sources = []
         
         # Add cover page if requested
-        if include_cover and cover_photo_bytes and COVER_AVAILABLE:
-            cover_path = tempfile.mktemp(suffix='_cover.pdf')
-            if create_cover_page(cover_photo_bytes, street_address, city_state, cover_path):
-                with open(cover_path, 'rb') as f:
-                    merger.append(f)
-                os.unlink(cover_path)
+        if include_cover and cover_photo and COVER_AVAILABLE:
+            cover_path = packet_engine.new_temp_path('_cover.pdf')
+            with trace.span('cover render') as span:
+                if create_cover_page(cover_photo, street_address, city_state, cover_path):
+                    packet_sources.append({'name': 'Cover Page', 'path': cover_path, 'cache': False})
+                    span.bytes_out = os.path.getsize(cover_path)
         
         # Add all PDFs
-        for pdf_file in pdf_files:
-            try:
-                # Create a BytesIO object from the PDF content
-                pdf_stream = BytesIO(pdf_file['content'])
-                merger.append(pdf_stream)
-            except Exception as e:
-                st.warning(f"Could not process {pdf_file['name']}: {e}")
-                continue
-        
-        # Create output
-        output_buffer = BytesIO()
-        merger.write(output_buffer)
-        merger.close()
-        
-        pdf_bytes = output_buffer.getvalue()
-        
-        # Apply compression if requested
-        if compress_pdf_option:
-            pdf_bytes = compress_pdf(pdf_bytes)
-        
-        return pdf_bytes
+        packet_sources.extend(pdf_files)
+        
+        # Merge (and compress if requested) in a single pass to disk
+        packet_path = packet_engine.new_temp_path('_packet.pdf')
+        with trace.span('merge', detail=f"{len(packet_sources)} documents") as span:
+            summary = packet_engine.build_packet(packet_sources, packet_path, compress_streams=compress_pdf_option,
+                                                 budget=budget)
+            span.bytes_in = summary['input_bytes']
+            span.bytes_out = summary['bytes_written']
+        for name, error in summary['failed']:
+            st.warning(f"Could not process {name}: {error}")
+        
+        if summary['cache_hits'] or summary['cache_misses']:
+            st.info(f"♻️ Document cache: {summary['cache_hits']} reused, {summary['cache_misses']} processed")
+        
+        # Streams were compressed during the merge; escalate only if still over budget
+        if compress_pdf_option and summary['documents']:
+            with trace.span('compress', bytes_in=summary['bytes_written']) as span:
+                report = packet_engine.compress_to_target(packet_path, packet_engine.DEFAULT_TARGET_SIZE_MB, streams_done=True)
+                span.bytes_out = report['final_bytes']
+                span.detail = f"stopped at {report['stopped_at']}" if report['stopped_at'] else "already under target"
+            if summary['input_bytes']:
+                original_size_mb = summary['input_bytes'] / (1024 * 1024)
+                compressed_size_mb = report['final_bytes'] / (1024 * 1024)
+                st.info(f"📊 PDF Compression: {original_size_mb:.1f} MB → {compressed_size_mb:.1f} MB ({(1 - compressed_size_mb/original_size_mb)*100:.1f}% reduction)")
+            show_compression_report(report)
+        
+        return packet_path, summary
         
     except Exception as e:
         st.error(f"Error creating packet: {e}")
-        return None
+        # Don't leave a half-written packet behind
+        if packet_path and os.path.exists(packet_path):
+            os.unlink(packet_path)
+        return None, None
+    finally:
+        if cover_path and os.path.exists(cover_path):
+            os.unlink(cover_path)
+
+def create_instagram_posts_traced(photo, street_address, city_state, trace, encoder=listing_render.DEFAULT_POST_ENCODER):
+    """create_instagram_posts, recorded as the 'instagram render' stage with encode time"""
+    with trace.span('instagram render') as span:
+        instagram_files = create_instagram_posts(photo, street_address, city_state, encoder)
+        span.bytes_out = sum(len(post['data']) for post in instagram_files)
+        encode_seconds = sum(post['encode']['seconds'] for post in instagram_files)
+        span.detail = f"{len(instagram_files)} posts, {encoder} encode {encode_seconds:.2f}s"
+    return instagram_files
+
+def finish_trace(trace):
+    """Keep the trace for the timing table and write it to HC_TRACE_DIR if set"""
+    st.session_state.packet_trace = trace
+    trace.save_to_trace_dir()
+
+def show_trace(trace):
+    """Collapsible per-stage timing table with a JSON download"""
+    with st.expander(f"⏱️ Timing details ({trace.total_seconds():.1f}s)", expanded=False):
+        st.table(trace.rows())
+        st.download_button(
+            label="Download trace (JSON)",
+            data=trace.to_json(),
+            file_name=f"{trace.label or 'packet'} - trace.json",
+            mime="application/json",
+            key="download_trace"
+        )
+
+def read_packet_file(path):
+    """Packet bytes for the download button, read from disk only when it is clicked"""
+    with open(path, 'rb') as packet_file:
+        return packet_file.read()
+
+def clear_packet_file():
+    """Delete the packet from the previous run, if any"""
+    packet_path = st.session_state.get('packet_path')
+    if packet_path and os.path.exists(packet_path):
+        os.unlink(packet_path)
+    st.session_state.packet_path = None
 
 def get_hall_collins_logo():
     """Get Hall Collins logo as base64 for display in web app"""
@@ -651,8 +274,8 @@ def main():
     )
     
     # Initialize session state
-    if 'packet_data' not in st.session_state:
-        st.session_state.packet_data = None
+    if 'packet_path' not in st.session_state:
+        st.session_state.packet_path = None
     if 'instagram_files' not in st.session_state:
         st.session_state.instagram_files = []
     if 'packet_filename' not in st.session_state:
@@ -661,6 +284,8 @@ def main():
         st.session_state.processing_complete = False
     if 'packet_summary' not in st.session_state:
         st.session_state.packet_summary = ""
+    if 'packet_trace' not in st.session_state:
+        st.session_state.packet_trace = None
     if 'instagram_version' not in st.session_state:
         st.session_state.instagram_version = ""
     
@@ -670,6 +295,7 @@ def main():
             st.session_state.instagram_files = []
             st.session_state.processing_complete = False
             st.session_state.packet_summary = ""
+            st.session_state.packet_trace = None
         st.session_state.instagram_version = INSTAGRAM_VERSION
     
     # Custom CSS for Hall Collins branding
@@ -735,21 +361,40 @@ def main():
         
         st.markdown("**📄 PDF Combining**\nMerge multiple PDFs into one professional packet")
         st.markdown("**🗜️ PDF Compression**\nReduces file sizes under 20MB for easy sharing")
-        st.markdown("**📁 ZIP Support**\nAutomatically extracts PDFs from ZIP files")
+        st.markdown("**📁 ZIP Support**\nAutomatically extracts PDFs and JPGs from ZIP files, including ZIPs inside ZIPs")
         st.markdown("**�️ JPG to PDF**\nConvert JPG images to PDF format")
         st.markdown("**🏠 Custom Covers**\nAdd branded cover pages with property photos")
         st.markdown("**📱 Instagram Posts**\nCreate 3 social media posts (New, Under Contract, Sold)")
         st.markdown("**🎨 Hall Collins Branding**\nProfessional templates with company colors")
         st.markdown("**☁️ Web Based**\nNo software installation required")
         
+        # Document cache stats for this server process
+        try:
+            cache_stats = packet_engine.document_cache().stats()
+            st.caption(f"♻️ Document cache: {cache_stats['hits']} hits • {cache_stats['misses']} misses • "
+                       f"{cache_stats['entries']} files ({cache_stats['bytes'] / (1024 * 1024):.0f} of {cache_stats['max_bytes'] / (1024 * 1024):.0f} MB)")
+        except OSError:
+            pass
+        try:
+            render_stats = listing_render.render_cache.stats()
+            st.caption(f"🎨 Render cache: {render_stats['hits']} hits • {render_stats['misses']} misses • "
+                       f"{render_stats['entries']} covers/posts ({render_stats['bytes'] / (1024 * 1024):.0f} MB)")
+        except OSError:
+            pass
+        asset_stats = listing_render.template_assets.stats()
+        st.caption(f"🖼️ Template cache: {asset_stats['entries']} assets • {asset_stats['hits']} hits • "
+                   f"{asset_stats['misses'] + asset_stats['reloads']} loads")
+        st.caption(f"🛡️ Resource budget: {resource_budget.format_stats()}")
+        
         # Reset button
         st.markdown("---")
         if st.button("🔄 Reset All", help="Clear all generated files and start fresh"):
-            st.session_state.packet_data = None
+            clear_packet_file()
             st.session_state.instagram_files = []
             st.session_state.packet_filename = ""
             st.session_state.processing_complete = False
             st.session_state.packet_summary = ""
+            st.session_state.packet_trace = None
             st.rerun()
     
     # Main content area
@@ -777,6 +422,15 @@ def main():
         elif include_instagram:
             st.info("📸 Will create 3 Instagram posts: New Listing, Under Contract, Sold")
         
+        # Post image format - progressive JPEG is smallest and fastest for Instagram
+        post_encoder = listing_render.DEFAULT_POST_ENCODER
+        if include_instagram:
+            post_encoder = st.selectbox("🖼️ Post Format", list(listing_render.POST_ENCODERS),
+                                        format_func=lambda name: {'jpeg': "JPEG (recommended for Instagram)",
+                                                                  'png': "PNG (lossless, larger)",
+                                                                  'webp': "WebP (smallest, not accepted everywhere)"}[name],
+                                        help="Image format for the downloaded posts")
+        
         # Property photo upload - shown only when cover page or Instagram posts are needed
         cover_photo = None
         if (include_cover and COVER_AVAILABLE) or include_instagram:
@@ -789,6 +443,10 @@ def main():
         if compress_pdf_option:
             st.info("📉 Will compress PDFs to reduce file size")
     
+    # Preview follows the address fields - Streamlit reruns when either changes
+    if cover_photo and (include_cover or include_instagram):
+        show_preview(cover_photo.getvalue(), street_address, city_state, include_cover, include_instagram)
+    
     st.markdown("---")
     
     # File processing area
@@ -801,11 +459,12 @@ def main():
         # Refresh button for new property
         if st.button("🔄 New Property", help="Clear all inputs and start fresh with a new property", use_container_width=True, type="secondary"):
             # Clear all session state
-            st.session_state.packet_data = None
+            clear_packet_file()
             st.session_state.instagram_files = []
             st.session_state.packet_filename = ""
             st.session_state.processing_complete = False
             st.session_state.packet_summary = ""
+            st.session_state.packet_trace = None
             st.success("✨ Ready for new property!")
             st.rerun()
         
@@ -823,7 +482,7 @@ def main():
             **💡 Pro Tips for File Organization:**
             • Upload files in the order you want them in the packet
             • Use descriptive filenames for better organization  
-            • ZIP files will be automatically extracted
+            • ZIP files will be automatically extracted (ZIPs inside ZIPs too)
             • JPG images will be converted to PDF format
             • Multiple files can be selected at once
             
@@ -838,7 +497,7 @@ def main():
         if uploaded_files:
             st.markdown("#### 📋 Selected Files")
             for file in uploaded_files:
-                file_size = len(file.getvalue()) / 1024  # KB
+                file_size = file.size / 1024  # KB
                 st.write(f"• {file.name} ({file_size:.1f} KB)")
         
         # Instagram-only button (when photo and address are provided but no files uploaded)
@@ -847,12 +506,15 @@ def main():
             st.info("📸 Upload property photo and enter address to create social media posts without documents")
             if st.button("🎨 Create Instagram Posts", type="secondary", use_container_width=True):
                 with st.spinner("Creating Instagram posts..."):
-                    cover_photo_bytes = cover_photo.getvalue()
-                    instagram_files = create_instagram_posts(cover_photo_bytes, street_address, city_state)
+                    trace = packet_trace.PacketTrace(street_address)
+                    property_photo = prepare_photo_traced(cover_photo.getvalue(), trace)
+                    instagram_files = []
+                    if property_photo:
+                        instagram_files = create_instagram_posts_traced(property_photo, street_address, city_state, trace, post_encoder)
                     
                     if instagram_files:
                         # Store only Instagram results in session state
-                        st.session_state.packet_data = None
+                        clear_packet_file()
                         st.session_state.packet_filename = ""
                         st.session_state.instagram_files = instagram_files
                         
@@ -863,8 +525,10 @@ def main():
                         • Property: {street_address}
                         • Location: {city_state}
                         • Posts: New Listing, Under Contract, Sold
+                        • Format: {listing_render.format_encode_report(instagram_files)}
                         """
                         st.session_state.packet_summary = summary
+                        finish_trace(trace)
                         st.session_state.processing_complete = True
                         
                         # Rerun to show download buttons
@@ -887,11 +551,13 @@ def main():
             download_col1, download_col2 = st.columns(2)
             
             # PDF download button
-            if st.session_state.packet_data:
+            if st.session_state.packet_path and os.path.exists(st.session_state.packet_path):
                 with download_col1:
+                    # Packet lives on disk and is read only when the button is clicked -
+                    # a file or bytes here would be loaded into memory on every rerun
                     st.download_button(
                         label="📥 Download Listing Packet",
-                        data=st.session_state.packet_data,
+                        data=functools.partial(read_packet_file, st.session_state.packet_path),
                         file_name=st.session_state.packet_filename,
                         mime="application/pdf",
                         use_container_width=True
@@ -907,7 +573,7 @@ def main():
                         label=f"📱 Download {instagram_file['type']} Post",
                         data=instagram_file['data'],
                         file_name=instagram_file['name'],
-                        mime="image/png",
+                        mime=instagram_file.get('mime', "image/png"),
                         key=f"persistent_download_{instagram_file['type']}",
                         use_container_width=True
                     )
@@ -916,13 +582,17 @@ def main():
             if st.session_state.packet_summary:
                 st.info(st.session_state.packet_summary)
             
+            if st.session_state.packet_trace:
+                show_trace(st.session_state.packet_trace)
+            
             # Add reprocess button for users who want to make changes
             if st.button("🔄 Create New Files", help="Clear results and start over with new files or settings"):
-                st.session_state.packet_data = None
+                clear_packet_file()
                 st.session_state.instagram_files = []
                 st.session_state.packet_filename = ""
                 st.session_state.processing_complete = False
                 st.session_state.packet_summary = ""
+                st.session_state.packet_trace = None
                 st.rerun()
             
             st.markdown("---")
@@ -934,79 +604,115 @@ def main():
                 with st.spinner("Processing files..."):
                     # Process uploaded files
                     pdf_files = []
+                    trace = packet_trace.PacketTrace(street_address)
+                    # Caps on what this packet may unzip, merge, decode and hold in memory
+                    budget = resource_budget.Budget()
                     
-                    for uploaded_file in uploaded_files:
-                        file_bytes = uploaded_file.getvalue()
-                        file_name = uploaded_file.name.lower()
+                    try:
+                        for uploaded_file in uploaded_files:
+                            file_name = uploaded_file.name.lower()
                         
-                        if file_name.endswith('.pdf'):
-                            pdf_files.append({
-                                'name': uploaded_file.name,
-                                'content': file_bytes
-                            })
-                        elif file_name.endswith('.zip'):
-                            extracted_pdfs = extract_pdfs_from_zip(file_bytes)
-                            pdf_files.extend(extracted_pdfs)
-                            st.success(f"Extracted {len(extracted_pdfs)} PDFs from {uploaded_file.name}")
-                        elif file_name.endswith(('.jpg', '.jpeg')):
-                            converted_pdf = convert_jpg_to_pdf(file_bytes, uploaded_file.name)
-                            if converted_pdf:
-                                pdf_files.append(converted_pdf)
-                                st.success(f"Converted {uploaded_file.name} to PDF")
+                            if file_name.endswith('.pdf'):
+                                # Spool to a temp file so large PDFs don't sit in RAM twice
+                                with trace.span('ingest', bytes_in=uploaded_file.size, detail=uploaded_file.name) as span:
+                                    spool_size = budget.spool_size(uploaded_file.size, packet_engine.SPOOL_MAX_BYTES)
+                                    pdf_files.append({
+                                        'name': uploaded_file.name,
+                                        'stream': packet_engine.spool_stream(uploaded_file, spool_size)
+                                    })
+                                    span.bytes_out = uploaded_file.size
+                            elif file_name.endswith('.zip'):
+                                with trace.span('zip extraction', bytes_in=uploaded_file.size, detail=uploaded_file.name) as span:
+                                    # Read straight from the upload - no second copy of the archive
+                                    members = []
+                                    extracted_pdfs = listing_render.extract_pdfs_from_zip(
+                                        uploaded_file, warn=lambda msg: st.warning(f"⚠️ {msg}"),
+                                        budget=budget, report=members)
+                                    span.bytes_out = sum(pdf['size'] for pdf in extracted_pdfs)
+                                    span.detail = f"{uploaded_file.name}: {archive_ingest.summarize(members)}"
+                                pdf_files.extend(extracted_pdfs)
+                                st.success(f"Extracted {len(extracted_pdfs)} documents from {uploaded_file.name}")
+                                if members:
+                                    with st.expander(f"📦 {uploaded_file.name}: {archive_ingest.summarize(members)}", expanded=False):
+                                        st.code(archive_ingest.format_report(members))
+                            elif file_name.endswith(('.jpg', '.jpeg')):
+                                # Converted on the shared threads while the rest is read and merged, each
+                                # timed in the trace as it finishes; the merge takes pages in upload order
+                                pdf_files.extend(listing_render.convert_images([(uploaded_file.name, uploaded_file.getvalue())],
+                                                                               budget, trace=trace))
+                                st.success(f"Converting {uploaded_file.name} to a PDF page")
                     
-                    if pdf_files:
-                        # Get cover photo bytes
-                        cover_photo_bytes = cover_photo.getvalue() if cover_photo else None
+                        if pdf_files:
+                            # Get cover photo bytes
+                            cover_photo_bytes = cover_photo.getvalue() if cover_photo else None
+                        
+                            # Check if address is required for cover page or Instagram posts
+                            if (include_cover or include_instagram) and cover_photo_bytes:
+                                if not street_address or not city_state:
+                                    st.error("⚠️ Please enter both street address and city/state for cover page and Instagram posts!")
+                                    st.stop()
                         
-                        # Check if address is required for cover page or Instagram posts
-                        if (include_cover or include_instagram) and cover_photo_bytes:
-                            if not street_address or not city_state:
-                                st.error("⚠️ Please enter both street address and city/state for cover page and Instagram posts!")
-                                st.stop()
+                            # Decode the photo once for the cover page and all posts
+                            property_photo = None
+                            if (include_cover or include_instagram) and cover_photo_bytes:
+                                property_photo = prepare_photo_traced(cover_photo_bytes, trace, budget)
                         
-                        # Create packet
-                        packet_bytes = create_packet(
-                            pdf_files, 
-                            street_address, 
-                            city_state, 
-                            cover_photo_bytes, 
-                            include_cover,
-                            compress_pdf_option
-                        )
+                            # Create packet
+                            packet_path, merge_summary = create_packet(
+                                pdf_files, 
+                                street_address, 
+                                city_state, 
+                                property_photo, 
+                                include_cover,
+                                compress_pdf_option,
+                                trace,
+                                budget
+                            )
+                            for note in budget.notes:
+                                st.info(f"🛡️ {note}")
                         
-                        # Create Instagram posts if requested
-                        instagram_files = []
-                        if include_instagram and cover_photo_bytes and PIL_AVAILABLE and street_address and city_state:
-                            with st.spinner("Creating Instagram posts..."):
-                                instagram_files = create_instagram_posts(cover_photo_bytes, street_address, city_state)
+                            # Create Instagram posts if requested
+                            instagram_files = []
+                            if include_instagram and property_photo and street_address and city_state:
+                                with st.spinner("Creating Instagram posts..."):
+                                    instagram_files = create_instagram_posts_traced(property_photo, street_address, city_state, trace, post_encoder)
                         
-                        if packet_bytes:
-                            # Store results in session state
-                            if street_address:
-                                filename = f"1) {street_address} - Packet.pdf"
-                            else:
-                                filename = "1) Listing Packet.pdf"
+                            if packet_path:
+                                # Store results in session state
+                                if street_address:
+                                    filename = f"1) {street_address} - Packet.pdf"
+                                else:
+                                    filename = "1) Listing Packet.pdf"
                             
-                            st.session_state.packet_data = packet_bytes
-                            st.session_state.packet_filename = filename
-                            st.session_state.instagram_files = instagram_files
+                                clear_packet_file()
+                                st.session_state.packet_path = packet_path
+                                st.session_state.packet_filename = filename
+                                st.session_state.instagram_files = instagram_files
                             
-                            # Create summary
-                            summary = f"""
-                            **Packet Summary:**
-                            • Combined {len(pdf_files)} files
-                            • Cover page: {'✅ Included' if include_cover and cover_photo_bytes else '❌ Not included'}
-                            • Instagram posts: {'✅ Created ' + str(len(instagram_files)) + ' posts' if instagram_files else '❌ Not created'}
-                            • Property: {street_address or 'No address specified'}
-                            • Location: {city_state or 'No location specified'}
-                            """
-                            st.session_state.packet_summary = summary
-                            st.session_state.processing_complete = True
+                                # Create summary
+                                summary = f"""
+                                **Packet Summary:**
+                                • Combined {len(pdf_files)} files
+                                • Cover page: {'✅ Included' if include_cover and cover_photo_bytes else '❌ Not included'}
+                                • Instagram posts: {'✅ Created ' + str(len(instagram_files)) + ' posts (' + listing_render.format_encode_report(instagram_files) + ')' if instagram_files else '❌ Not created'}
+                                • Property: {street_address or 'No address specified'}
+                                • Location: {city_state or 'No location specified'}
+                                """
+                                if merge_summary['duplicate_streams']:
+                                    summary += (f"• Shared resources: {merge_summary['duplicate_streams']} duplicate fonts/images "
+                                                f"stored once ({merge_summary['dedup_bytes_saved'] / (1024 * 1024):.1f} MB saved)\n")
+                                st.session_state.packet_summary = summary
+                                st.session_state.processing_complete = True
+                                finish_trace(trace)
                             
-                            # Rerun to show persistent download buttons
-                            st.rerun()
-                    else:
-                        st.error("No valid PDF files found to process")
+                                # Rerun to show persistent download buttons
+                                st.rerun()
+                        else:
+                            st.error("No valid PDF files found to process")
+                    finally:
+                        # Spools and queued conversions are released even when the run
+                        # stops early (st.stop, st.rerun) or fails
+                        packet_engine.close_sources(pdf_files)
         
         elif not st.session_state.processing_complete:
             if cover_photo and PIL_AVAILABLE: